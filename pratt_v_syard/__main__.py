@@ -1,7 +1,24 @@
 """
-Simple main for interactive parser testing
+Simple main for interactive parser testing, and a batch mode for pushing
+files of expressions through one parser.
+
+With no files and a terminal on stdin, every parser is run on each line
+typed. Otherwise every line of the files given (or of stdin, for "-" or
+no files) is an expression for the one parser picked with --parser. One
+line is printed per expression, in order: its value, its S expression,
+or "ok", or else "file:line: error". A throughput and latency summary goes
+to stderr at the end, and the exit status is 1 if any expression failed.
 """
+import argparse
+from collections import deque
+import contextlib
+import json
 import readline  # noqa pylint:disable=unused-import
+import sys
+
+from .batch import OUTPUT_MODES, BatchSummary, output_many
+from .disk_cache import DiskCache, error_name
+from .limits import DEFAULT_LIMITS, Limits
 from .parsers import PARSERS, drive_parse
 from .op_base import EvalVisitor, Lispish
 
@@ -15,10 +32,122 @@ def display(parse_name, parse_func, exprstr):
         print(f"{parse_name} errored: {err}")
 
 
-try:
-    while True:
-        instr = input("> ")
-        for (nom, func) in PARSERS:
-            display(nom, func, instr)
-except EOFError:
-    print()
+def interact():
+    try:
+        while True:
+            instr = input("> ")
+            for nom, func in PARSERS:
+                display(nom, func, instr)
+    except EOFError:
+        print()
+
+
+def read_lines(paths, positions):
+    """
+    Yield the lines of the files at paths ("-" is stdin) without their
+    line endings, appending (name, line number, length) for each to
+    positions
+    """
+    for path in paths:
+        if path == "-":
+            name, opener = "<stdin>", contextlib.nullcontext(sys.stdin)
+        else:
+            name, opener = path, open(path, encoding="utf-8")
+        with opener as source:
+            for lineno, line in enumerate(source, 1):
+                line = line.rstrip("\r\n")
+                positions.append((name, lineno, len(line)))
+                yield line
+
+
+def run_batch(args, out, err):
+    """
+    Write one line per expression to out and the summary to err; return
+    the number of expressions that failed
+    """
+    positions = deque()
+    summary = BatchSummary()
+    cache = None
+    if args.cache:
+        cache = DiskCache(args.cache, int(args.cache_size * 1e6))
+    results = output_many(
+        read_lines(args.files or ["-"], positions),
+        dict(PARSERS)[args.parser],
+        args.mode,
+        args.workers,
+        args.chunksize,
+        args.env,
+        Limits(max_bits=args.max_bits, timeout=args.timeout),
+        cache,
+    )
+    pending = []
+    for result in results:
+        name, lineno, length = positions.popleft()
+        summary.add(length, result)
+        if result.error is None:
+            pending.append(result.output)
+        else:
+            error = result.error
+            pending.append(f"{name}:{lineno}: {error_name(error)}: {error}")
+        if len(pending) >= args.chunksize:
+            out.write("\n".join(pending) + "\n")
+            pending.clear()
+    if pending:
+        out.write("\n".join(pending) + "\n")
+    out.flush()
+    if cache is not None:
+        cache.close()
+    print(summary.format(), file=err)
+    return summary.errors
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    argparser.add_argument(
+        "files", nargs="*", help='files of expressions, "-" is stdin'
+    )
+    argparser.add_argument(
+        "--parser", choices=dict(PARSERS), default=PARSERS[0][0], metavar="NAME"
+    )
+    argparser.add_argument(
+        "--mode",
+        choices=OUTPUT_MODES,
+        default="value",
+        help="what to print per expression; validate only checks the syntax",
+    )
+    argparser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes; 0 means one per CPU",
+    )
+    argparser.add_argument("--chunksize", type=int, default=256)
+    argparser.add_argument(
+        "--env", type=json.loads, help="variable bindings as a JSON object"
+    )
+    argparser.add_argument("--max-bits", type=int, default=DEFAULT_LIMITS.max_bits)
+    argparser.add_argument(
+        "--timeout", type=float, help="seconds to evaluate one expression in"
+    )
+    argparser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="SQLite file to keep outputs in between runs, created if need be",
+    )
+    argparser.add_argument(
+        "--cache-size", type=float, default=256, help="cache size bound in MB"
+    )
+    args = argparser.parse_args()
+    if args.workers == 0:
+        args.workers = None
+
+    if not args.files and sys.stdin.isatty():
+        interact()
+    elif run_batch(args, sys.stdout, sys.stderr):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
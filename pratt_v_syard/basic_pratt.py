@@ -1,28 +1,30 @@
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
-def parse(tokstream):
-    retval = prattparse_expr(tokstream, MIN_PRECEDENCE - 1)
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    min_precedence = grammar.min_precedence
+    retval = prattparse_expr(tokstream, min_precedence - 1, nodes, grammar)
     tok = tokstream.poll()
     if tok is not None:
         raise ValueError(f"Expected operator at {tok.start()}")
     return retval
 
 
-def prattparse_expr(tokstream, min_prec):
+def prattparse_expr(tokstream, min_prec, nodes, grammar):
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
     tok = tokstream.poll()
     if tok is None:
         raise ValueError("Unexpected EOF")
     if tok.group("num"):
-        lhs = ValNode(int(tok.group("num")))
+        lhs = nodes.val(int(tok.group("num")))
+    elif tok.group("name"):
+        lhs = nodes.var(tok.group("name"))
     elif tok.group("paren") and tok.group("paren") == "(":
-        lhs = prattparse_expr(tokstream, MIN_PRECEDENCE - 1)
+        lhs = prattparse_expr(tokstream, min_precedence - 1, nodes, grammar)
         if tokstream:
             tok = tokstream.peek()
             if tok.group("paren") == ")":
@@ -36,24 +38,24 @@ def prattparse_expr(tokstream, min_prec):
     elif tok.group("op"):
         # better be a uniop
         opname = "_" + tok.group("op")
-        if opname not in OPERATORS:
+        if opname not in operators:
             raise ValueError(
                 "Unknown unary operator %s at %d" % (tok.group("op"), tok.start("op"))
             )
-        opinfo = OPERATORS[opname]
-        rhs = prattparse_expr(tokstream, opinfo.right_precedence)
-        lhs = UniopNode(opname, opinfo.func, rhs)
+        opinfo = operators[opname]
+        rhs = prattparse_expr(tokstream, opinfo.right_precedence, nodes, grammar)
+        lhs = nodes.uniop(opname, opinfo.func, rhs)
 
     while tokstream:
         tok = tokstream.peek()
         if not tok.group("op"):
             break
         opname = tok.group("op")
-        opinfo = OPERATORS[opname]
+        opinfo = operators[opname]
         if opinfo.left_precedence < min_prec:
             break
         tokstream.poll()
-        rhs = prattparse_expr(tokstream, opinfo.right_precedence)
-        lhs = BinopNode(opname, opinfo.func, lhs, rhs)
+        rhs = prattparse_expr(tokstream, opinfo.right_precedence, nodes, grammar)
+        lhs = nodes.binop(opname, opinfo.func, lhs, rhs)
 
     return lhs
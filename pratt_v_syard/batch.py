@@ -0,0 +1,228 @@
+"""
+Parse or evaluate large batches of expressions across a pool of worker
+processes.
+
+Expressions are sent to the workers in chunks, and trees come back as
+FlatTrees, which pickle as a few flat byte strings rather than as a graph
+of Node objects. Results are yielded in input order, and an expression
+that fails yields its exception instead of stopping the batch.
+
+output_many is the same for the command line's batch mode: each result is
+the text to print (a value, an S expression, or "ok" for a valid
+expression) and how long the expression took, and BatchSummary adds up
+throughput and latency.
+"""
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import time
+
+from .flat_tree import parse_flat
+from .limits import DEFAULT_LIMITS, BoundedEvalVisitor, LimitExceeded
+from .op_base import Lispish
+from .parsers import drive_parse
+from .shunting_yard import parse as sy_parse, validate
+from .walker import walk
+
+ParseResult = namedtuple("ParseResult", ["tree", "error"])
+EvalResult = namedtuple("EvalResult", ["value", "error"])
+OutputResult = namedtuple("OutputResult", ["output", "error", "seconds"])
+OUTPUT_MODES = ("value", "lispish", "validate")
+
+# Everything an expression can raise that is its own fault, rather than
+# the batch's. The parsers raise KeyError for a unary-only operator where a
+# binary one belongs.
+ITEM_ERRORS = (
+    ArithmeticError,
+    KeyError,
+    LimitExceeded,
+    RecursionError,
+    TypeError,
+    ValueError,
+)
+
+
+def parse_chunk(exprstrs, strategy):
+    results = []
+    for exprstr in exprstrs:
+        try:
+            results.append(ParseResult(parse_flat(strategy, exprstr), None))
+        except ITEM_ERRORS as err:
+            results.append(ParseResult(None, err))
+    return results
+
+
+def eval_chunk(exprstrs, strategy, env, limits):
+    results = []
+    for exprstr in exprstrs:
+        try:
+            tree = drive_parse(strategy, exprstr)
+            results.append(
+                EvalResult(walk(tree, BoundedEvalVisitor(env, limits)), None)
+            )
+        except ITEM_ERRORS as err:
+            results.append(EvalResult(None, err))
+    return results
+
+
+def output_chunk(exprstrs, strategy, mode, env, limits, cache=None):
+    if cache is not None:
+        return cache.outputs(exprstrs, strategy, mode, env, limits)
+    results = []
+    for exprstr in exprstrs:
+        start = time.perf_counter()
+        try:
+            if mode == "validate":
+                validate(exprstr)
+                output = "ok"
+            else:
+                tree = drive_parse(strategy, exprstr)
+                if mode == "lispish":
+                    output = tree.accept(Lispish())
+                else:
+                    output = str(walk(tree, BoundedEvalVisitor(env, limits)))
+        except ITEM_ERRORS as err:
+            results.append(OutputResult(None, err, time.perf_counter() - start))
+        else:
+            results.append(OutputResult(output, None, time.perf_counter() - start))
+    return results
+
+
+def chunked(iterable, chunksize):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_chunks(func, expressions, workers, chunksize, *args):
+    """
+    Yield the results of func(chunk, *args) for each chunk of expressions,
+    flattened and in order. At most two chunks per worker are in flight, so
+    the input is only read as fast as it is used.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = chunked(expressions, chunksize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from func(chunk, *args)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, *args))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def parse_many(expressions, strategy=sy_parse, workers=None, chunksize=256):
+    """
+    Yield a ParseResult(FlatTree or None, exception or None) for each
+    expression, in order. workers defaults to the CPU count; with 1 or
+    fewer everything runs in this process.
+    """
+    return run_chunks(parse_chunk, expressions, workers, chunksize, strategy)
+
+
+def eval_many(
+    expressions,
+    strategy=sy_parse,
+    workers=None,
+    chunksize=256,
+    env=None,
+    limits=DEFAULT_LIMITS,
+):
+    """
+    Like parse_many, but yield an EvalResult(value or None, exception or
+    None) for each expression, evaluated within limits with variables
+    from env
+    """
+    return run_chunks(
+        eval_chunk, expressions, workers, chunksize, strategy, env, limits
+    )
+
+
+def output_many(
+    expressions,
+    strategy=sy_parse,
+    mode="value",
+    workers=None,
+    chunksize=256,
+    env=None,
+    limits=DEFAULT_LIMITS,
+    cache=None,
+):
+    """
+    Like parse_many, but yield an OutputResult(text or None, exception or
+    None, seconds) for each expression, where mode (one of OUTPUT_MODES)
+    picks what the text is. Values are computed within limits; "validate"
+    only checks the syntax, with shunting_yard.validate, whatever strategy
+    is. With a disk_cache.DiskCache, each chunk's results come from it
+    where they can, and errors from it are disk_cache.CachedErrors.
+    """
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown mode {mode}")
+    return run_chunks(
+        output_chunk,
+        expressions,
+        workers,
+        chunksize,
+        strategy,
+        mode,
+        env,
+        limits,
+        cache,
+    )
+
+
+class BatchSummary:
+    """
+    Counts, input size and per-expression times of a batch, from when the
+    summary was made
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.errors = 0
+        self.chars = 0
+        self.seconds = array("d")
+        self.start = time.perf_counter()
+
+    def add(self, chars, result):
+        """
+        Count an OutputResult for an expression chars long
+        """
+        self.lines += 1
+        self.chars += chars
+        if result.error is not None:
+            self.errors += 1
+        self.seconds.append(result.seconds)
+
+    def latencies(self, *fractions):
+        """
+        For each fraction, the time within which that fraction of the
+        expressions finished
+        """
+        ordered = sorted(self.seconds) or [0.0]
+        return [
+            ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+            for fraction in fractions
+        ]
+
+    def format(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        p50, p99, p100 = self.latencies(0.5, 0.99, 1.0)
+        return (
+            f"{self.lines} lines, {self.errors} errors in {elapsed:.3f} s:"
+            f" {self.lines / elapsed:.0f} lines/s,"
+            f" {self.chars / elapsed / 1e6:.2f} Mchars/s;"
+            f" latency p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us,"
+            f" max {p100 * 1e6:.0f} us"
+        )
@@ -0,0 +1,20 @@
+"""
+Benchmarks for the parsers and the things built around them.
+
+Each module here is runnable, e.g. `python -m pratt_v_syard.benchmarks.tokens`.
+"""
+import time
+
+
+def best_time(func, repeat=5):
+    """
+    Run func repeat times and return the fastest wall-clock time in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
@@ -0,0 +1,52 @@
+"""
+Throughput of batch.parse_many and batch.eval_many as the number of worker
+processes grows, against a plain loop in this process.
+"""
+import argparse
+import os
+import time
+
+from .shapes import int_mix
+from ..batch import eval_many, parse_many
+from ..flat_tree import parse_flat
+from ..parsers import PARSERS
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--exprs", type=int, default=20000)
+    argparser.add_argument("--ops", type=int, default=20)
+    argparser.add_argument("--chunksize", type=int, default=256)
+    argparser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    args = argparser.parse_args()
+
+    strategy = dict(PARSERS)["Shunting Yard"]
+    corpus = [int_mix(args.ops, seed) for seed in range(args.exprs)]
+    loop_time = timed(lambda: [parse_flat(strategy, exprstr) for exprstr in corpus])
+
+    print(f"{args.exprs} expressions of {args.ops} operators, {os.cpu_count()} CPUs")
+    print(f"{'':10} {'parse/s':>10} {'eval/s':>10}")
+    print(f"{'loop':10} {args.exprs / loop_time:10.0f} {'':>10}")
+    for workers in sorted(set(args.workers)):
+        parse_time = timed(
+            lambda: list(parse_many(corpus, strategy, workers, args.chunksize))
+        )
+        eval_time = timed(
+            lambda: list(eval_many(corpus, strategy, workers, args.chunksize))
+        )
+        print(
+            f"{workers:>2} workers {args.exprs / parse_time:10.0f}"
+            f" {args.exprs / eval_time:10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
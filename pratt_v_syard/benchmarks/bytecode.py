@@ -0,0 +1,77 @@
+"""
+Repeated evaluation of bytecode programs versus EvalVisitor, the walker
+and FlatTree.evaluate on the same trees, and the cost of getting a
+program compared with a shunting yard parse.
+"""
+import argparse
+import pickle
+
+from . import best_time
+from .shapes import balanced, int_mix, left_chain, pow_tower
+from ..bytecode import compile_program
+from ..flat_tree import parse_flat
+from ..op_base import EvalVisitor
+from ..parsers import PARSERS, drive_parse
+from ..walker import walk
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--evals", type=int, default=200)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    # EvalVisitor recurses, so keep the trees well inside the recursion limit
+    shapes = (
+        ("deep (chain of 400)", left_chain(400)),
+        ("wide (balanced, 1024 leaves)", balanced(10)),
+        ("** tower of 300", pow_tower(300)),
+        ("int_mix 300", int_mix(300)),
+    )
+    strategy = dict(PARSERS)["Shunting Yard"]
+    print(f"{args.evals} evaluations, best of {args.repeat}, ms")
+    print(
+        f"{'':30} {'EvalVisitor':>12} {'walk':>8} {'FlatTree':>9} {'program':>8}"
+        f" {'speedup':>8}"
+    )
+    for name, exprstr in shapes:
+        tree = drive_parse(strategy, exprstr)
+        flat = parse_flat(strategy, exprstr)
+        program = compile_program.__wrapped__(exprstr)
+        assert program.run() == tree.accept(EvalVisitor())
+
+        def repeated(func):
+            def run_all():
+                for _ in range(args.evals):
+                    func()
+
+            return best_time(run_all, args.repeat)
+
+        visit_time = repeated(lambda: tree.accept(EvalVisitor()))
+        walk_time = repeated(lambda: walk(tree, EvalVisitor()))
+        flat_time = repeated(flat.evaluate)
+        program_time = repeated(program.run)
+        print(
+            f"{name:30} {visit_time * 1e3:12.2f} {walk_time * 1e3:8.2f}"
+            f" {flat_time * 1e3:9.2f} {program_time * 1e3:8.2f}"
+            f" {visit_time / program_time:7.1f}x"
+        )
+
+    print()
+    print(f"best of {args.repeat}, ms; pickled size, bytes")
+    print(f"{'':30} {'parse':>8} {'compile':>8} {'tree':>8} {'program':>8}")
+    for name, exprstr in shapes:
+        parse_time = best_time(lambda: drive_parse(strategy, exprstr), args.repeat)
+        compile_time = best_time(
+            lambda: compile_program.__wrapped__(exprstr), args.repeat
+        )
+        tree_size = len(pickle.dumps(parse_flat(strategy, exprstr)))
+        program_size = len(pickle.dumps(compile_program.__wrapped__(exprstr)))
+        print(
+            f"{name:30} {parse_time * 1e3:8.2f} {compile_time * 1e3:8.2f}"
+            f" {tree_size:8} {program_size:8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Repeated evaluation of compiled trees versus EvalVisitor, on deep, wide
+and right-associative ** trees.
+"""
+import argparse
+
+from . import best_time
+from .shapes import balanced, left_chain, pow_tower
+from ..compiled import build_function, tree_source
+from ..op_base import EvalVisitor
+from ..parsers import PARSERS, drive_parse
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--evals", type=int, default=1000)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    # EvalVisitor recurses, so keep the trees well inside the recursion limit
+    shapes = (
+        ("deep (chain of 400)", left_chain(400)),
+        ("wide (balanced, 1024 leaves)", balanced(10)),
+        ("** tower of 300", pow_tower(300)),
+    )
+    strategy = dict(PARSERS)["Shunting Yard"]
+    print(f"{args.evals} evaluations, best of {args.repeat}, ms")
+    print(
+        f"{'':30} {'EvalVisitor':>12} {'compile':>10} {'compiled':>10} {'speedup':>8}"
+    )
+    for name, exprstr in shapes:
+        tree = drive_parse(strategy, exprstr)
+        compiled = build_function(*tree_source(tree))
+        assert compiled() == tree.accept(EvalVisitor())
+
+        def visit_all(tree=tree):
+            for _ in range(args.evals):
+                tree.accept(EvalVisitor())
+
+        def call_all(compiled=compiled):
+            for _ in range(args.evals):
+                compiled()
+
+        visit_time = best_time(visit_all, args.repeat)
+        compile_time = best_time(
+            lambda tree=tree: build_function(*tree_source(tree)), args.repeat
+        )
+        call_time = best_time(call_all, args.repeat)
+        print(
+            f"{name:30} {visit_time * 1e3:12.2f} {compile_time * 1e3:10.2f}"
+            f" {call_time * 1e3:10.2f} {visit_time / call_time:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
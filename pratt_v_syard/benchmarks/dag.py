@@ -0,0 +1,68 @@
+"""
+Memory and evaluation time of ordinary trees versus hash-consed DAGs on a
+corpus of expressions made mostly of repeated sub-expressions.
+"""
+import argparse
+import tracemalloc
+
+from . import best_time
+from .shapes import repeated_subexprs
+from ..dag import MemoEvalVisitor, NodeInterner, parse_dag
+from ..op_base import EvalVisitor
+from ..parsers import PARSERS, drive_parse
+
+
+def retained_bytes(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--exprs", type=int, default=200)
+    argparser.add_argument("--terms", type=int, default=40)
+    argparser.add_argument("--distinct", type=int, default=8)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    corpus = [
+        repeated_subexprs(args.terms, args.distinct, seed) for seed in range(args.exprs)
+    ]
+    strategy = dict(PARSERS)["Shunting Yard"]
+    trees, tree_bytes = retained_bytes(
+        lambda: [drive_parse(strategy, exprstr) for exprstr in corpus]
+    )
+    interner = NodeInterner()
+    dags, dag_bytes = retained_bytes(
+        lambda: [parse_dag(strategy, exprstr, interner=interner) for exprstr in corpus]
+    )
+
+    def eval_all(roots, visitor):
+        return [root.accept(visitor) for root in roots]
+
+    # The DAGs share one interner, so they can share one memo as well
+    tree_time = best_time(lambda: eval_all(trees, EvalVisitor()), args.repeat)
+    dag_time = best_time(lambda: eval_all(dags, MemoEvalVisitor()), args.repeat)
+    assert eval_all(trees, EvalVisitor()) == eval_all(dags, MemoEvalVisitor())
+
+    print(
+        f"{args.exprs} expressions of {args.terms} terms"
+        f" over {args.distinct} distinct sub-expressions"
+    )
+    print(f"{'':12} {'tree':>12} {'DAG':>12} {'saving':>8}")
+    print(
+        f"{'memory (B)':12} {tree_bytes:12d} {dag_bytes:12d}"
+        f" {tree_bytes / dag_bytes:7.1f}x"
+    )
+    print(
+        f"{'eval (ms)':12} {tree_time * 1e3:12.2f} {dag_time * 1e3:12.2f}"
+        f" {tree_time / dag_time:7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+A nightly-style batch through batch.output_many with and without a
+disk_cache.DiskCache: no cache, a cold cache (every expression a miss and
+stored), and a warm one after a run over a corpus that overlaps by
+--overlap. Also counts the SELECTs and write transactions each run makes.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .shapes import int_mix
+from ..batch import output_many
+from ..disk_cache import DiskCache
+from ..parsers import PARSERS
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--exprs", type=int, default=10000)
+    argparser.add_argument("--ops", type=int, default=20)
+    argparser.add_argument("--chunksize", type=int, default=256)
+    argparser.add_argument("--workers", type=int, default=1)
+    argparser.add_argument("--overlap", type=float, default=0.9)
+    argparser.add_argument("--mode", default="value")
+    args = argparser.parse_args()
+
+    strategy = dict(PARSERS)["Shunting Yard"]
+    corpus = [int_mix(args.ops, seed) for seed in range(args.exprs)]
+    new_seeds = range(args.exprs, args.exprs + int(args.exprs * (1 - args.overlap)))
+    nightly = corpus[len(new_seeds) :] + [int_mix(args.ops, seed) for seed in new_seeds]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = DiskCache(os.path.join(tmpdir, "cache.sqlite"))
+        statements = []
+        cache._connect().set_trace_callback(statements.append)
+
+        def run(exprs, use_cache=True):
+            statements.clear()
+            seconds = timed(
+                lambda: list(
+                    output_many(
+                        exprs,
+                        strategy,
+                        args.mode,
+                        args.workers,
+                        args.chunksize,
+                        cache=cache if use_cache else None,
+                    )
+                )
+            )
+            selects = sum(sql.startswith("SELECT key") for sql in statements)
+            writes = statements.count("BEGIN IMMEDIATE")
+            return seconds, f"{selects}/{writes}"
+
+        print(f"{args.exprs} expressions of {args.ops} operators, mode {args.mode}")
+        print(f"{'':14} {'exprs/s':>10} {'select/write':>12}")
+        for name, exprs, use_cache in (
+            ("no cache", corpus, False),
+            ("cold", corpus, True),
+            ("warm", corpus, True),
+            (f"{args.overlap:.0%} overlap", nightly, True),
+        ):
+            seconds, count = run(exprs, use_cache)
+            # Workers have their own connections, so only count in process
+            counted = count if args.workers <= 1 else "-"
+            print(f"{name:14} {len(exprs) / seconds:10.0f} {counted:>12}")
+        stats = cache.stats()
+        size = os.path.getsize(cache.path) + os.path.getsize(cache.path + "-wal")
+        print(
+            f"{stats.entries} entries, {stats.payload_bytes / 1e6:.2f} MB payload,"
+            f" {size / 1e6:.2f} MB on disk"
+        )
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Parse time of the generated, table-specialized parsers against
+shunting_yard.parse and basic_pratt.parse, on every benchmark shape.
+"""
+import argparse
+
+from . import best_time
+from .suite import SHAPES
+from ..basic_pratt import parse as pratt_parse
+from ..generated import pratt_parse as gen_pratt_parse, sy_parse as gen_sy_parse
+from ..op_base import LEX_RE, Lexer
+from ..shunting_yard import parse as sy_parse
+
+CONTENDERS = (
+    ("shunting_yard", sy_parse),
+    ("generated sy", gen_sy_parse),
+    ("basic_pratt", pratt_parse),
+    ("generated pratt", gen_pratt_parse),
+)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--size", type=int, default=200)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    print(f"size {args.size}, best of {args.repeat}, ns/token")
+    print(f"{'':14}" + "".join(f" {name:>16}" for (name, _) in CONTENDERS))
+    for shape, generate in SHAPES.items():
+        exprstr = generate(args.size, 0)
+        ntokens = sum(1 for _ in LEX_RE.finditer(exprstr))
+        costs = []
+        for _, parse in CONTENDERS:
+            # Lex up front so only the parse is timed
+            lexers = [Lexer(exprstr) for _ in range(args.repeat)]
+            try:
+                seconds = best_time(lambda p=parse, l=lexers: p(l.pop()), args.repeat)
+                costs.append(f"{seconds * 1e9 / ntokens:16.1f}")
+            except RecursionError:
+                costs.append(f"{'-':>16}")
+        print(f"{shape:14}" + "".join(f" {cost}" for cost in costs))
+
+
+if __name__ == "__main__":
+    main()
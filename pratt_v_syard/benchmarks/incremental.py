@@ -0,0 +1,78 @@
+"""
+Latency of one small edit to a large document: incremental.Document
+against lexing, parsing and evaluating the new text from scratch.
+
+Each edit replaces one number literal with another, at a random place.
+How much evaluation can be skipped depends on the shape: the changed
+nodes are the edited literal and all its ancestors, which for a long
+left-associative chain is every operator to its right.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from .shapes import int_mix, left_chain
+from ..incremental import Document
+from ..op_base import EvalVisitor, LEX_RE
+from ..parsers import PARSERS, drive_parse
+from ..walker import walk
+
+SHAPES = {"int_mix": int_mix, "left_chain": left_chain}
+
+
+def number_spans(text):
+    return [match.span() for match in LEX_RE.finditer(text) if match.lastgroup == "num"]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--ops", type=int, default=50000)
+    argparser.add_argument("--edits", type=int, default=20)
+    argparser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    args = argparser.parse_args()
+
+    strategy = dict(PARSERS)["Shunting Yard"]
+    rng = random.Random(0)
+    print(f"median ms per edit over {args.edits} edits")
+    print(
+        f"{'shape':12} {'tokens':>8} {'fresh':>10} {'incremental':>12} {'speedup':>8}"
+    )
+    for shape in args.shapes:
+        text = SHAPES[shape](args.ops, 0)
+        ntokens = sum(1 for _ in LEX_RE.finditer(text))
+        document = Document(text)
+        document.evaluate()
+        fresh_times = []
+        incremental_times = []
+        for _ in range(args.edits):
+            start, end = rng.choice(number_spans(document.text))
+            literal = str(rng.randrange(1, 4))
+            seconds, value = timed(
+                lambda: (
+                    document.edit(start, end - start, literal),
+                    document.evaluate(),
+                )
+            )
+            incremental_times.append(seconds)
+            seconds, expected = timed(
+                lambda: walk(drive_parse(strategy, document.text), EvalVisitor())
+            )
+            fresh_times.append(seconds)
+            assert value[1] == expected
+        fresh = statistics.median(fresh_times) * 1e3
+        incremental = statistics.median(incremental_times) * 1e3
+        print(
+            f"{shape:12} {ntokens:8d} {fresh:10.2f} {incremental:12.2f}"
+            f" {fresh / incremental:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
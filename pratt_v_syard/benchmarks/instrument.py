@@ -0,0 +1,55 @@
+"""
+Count what every parser in parsers.PARSERS does per token (peeks, polls,
+nodes and closures) and how deep it gets (recursion and stacks), over a
+corpus of generated expressions; see instrument.py.
+"""
+import argparse
+import sys
+
+from .suite import SHAPES
+from ..instrument import STACK_NAMES, summaries_json, summarize
+from ..parsers import PARSERS
+
+
+def print_summaries(summaries, out):
+    print(f"{'':42} {'per token':>34}   max depth", file=out)
+    print(
+        f"{'parser':42} {'peeks':>8} {'polls':>8} {'nodes':>8} {'closures':>8}"
+        f" {'recursion':>10}" + "".join(f" {name:>11}" for name in STACK_NAMES),
+        file=out,
+    )
+    for summary in summaries:
+        cells = [
+            f"{summary.per_token(name):8.2f}"
+            for name in ("peeks", "polls", "nodes", "closures")
+        ]
+        depths = summary.max_depths
+        print(
+            f"{summary.parser:42} {' '.join(cells)} {depths['recursion']:10}"
+            + "".join(f" {depths[name]:11}" for name in STACK_NAMES)
+            + (f"  {summary.errors} errors" if summary.errors else ""),
+            file=out,
+        )
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    argparser.add_argument("--size", type=int, default=100)
+    argparser.add_argument("--seeds", type=int, default=3)
+    argparser.add_argument("--output", help="write the summaries to this JSON file")
+    args = argparser.parse_args()
+
+    for shape in args.shapes:
+        exprstrs = [SHAPES[shape](args.size, seed) for seed in range(args.seeds)]
+        summaries = summarize(PARSERS, exprstrs)
+        print(f"{shape}, size {args.size}, {args.seeds} seeds")
+        print_summaries(summaries, sys.stdout)
+        print()
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as output:
+                output.write(summaries_json(summaries) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Measure with tracemalloc the peak and retained memory of lexing, parsing
+and evaluation for every entry in parsers.PARSERS over a range of input
+shapes and sizes, and the bytes each kind of op_base node takes.
+
+Peak is the high-water mark of memory allocated during a phase, retained
+is what is still allocated when it returns (the lexer's tokens, the tree,
+the value). Results are written as JSON, optionally appended to a
+JSON-lines history file, and optionally compared with a baseline from an
+earlier run, as in suite.py: a phase that needs more than the threshold
+more memory is a regression and makes the run exit with status 1.
+"""
+import argparse
+import gc
+import operator
+import platform
+import sys
+import time
+import tracemalloc
+
+from .suite import SHAPES, bench_main, lex
+from ..compiled import postorder
+from ..op_base import EvalVisitor, FROZEN_NODES, LEX_RE, NODES
+from ..parsers import PARSERS
+from ..walker import walk
+
+PHASES = ("lex", "parse", "eval")
+MEASURES = tuple(f"{phase}_{kind}" for phase in PHASES for kind in ("peak", "retained"))
+
+
+def traced(func):
+    """
+    (result, peak bytes, retained bytes) of calling func; garbage cycles
+    are collected before the retained bytes are read
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+        gc.collect()
+        return result, peak, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(record, phase, func):
+    result, record[f"{phase}_peak"], record[f"{phase}_retained"] = traced(func)
+    return result
+
+
+def run_case(pname, strategy, shape, size, exprstr):
+    """
+    One result record; a phase that raises is recorded by exception name
+    and the later phases are skipped
+    """
+    record = {
+        "parser": pname,
+        "shape": shape,
+        "size": size,
+        "tokens": sum(1 for _ in LEX_RE.finditer(exprstr)),
+    }
+    tokens = measure(record, "lex", lambda: lex(exprstr))
+    try:
+        tree = measure(record, "parse", lambda: strategy(tokens))
+    except (RecursionError, ValueError) as err:
+        record["error"] = f"parse: {type(err).__name__}"
+        return record
+    record["nodes"] = sum(1 for _ in postorder(tree))
+    try:
+        measure(record, "eval", lambda: walk(tree, EvalVisitor()))
+    except (ArithmeticError, TypeError, ValueError) as err:
+        record["error"] = f"eval: {type(err).__name__}"
+    return record
+
+
+def node_bytes(nodes=NODES, count=10_000):
+    """
+    {class name: (sys.getsizeof, traced bytes per node)} for the classes
+    nodes builds; the traced bytes are averaged over count nodes that
+    share their children and values, so they count the node alone
+    """
+    leaf = nodes.val(7)
+    makers = (
+        lambda: nodes.binop("+", operator.add, leaf, leaf),
+        lambda: nodes.uniop("-", operator.neg, leaf),
+        lambda: nodes.val(7),
+        lambda: nodes.var("x"),
+    )
+    sizes = {}
+    for make in makers:
+        built = [None] * count
+
+        def build_all():
+            for i in range(count):
+                built[i] = make()
+
+        retained = traced(build_all)[2]
+        sizes[type(built[0]).__name__] = (sys.getsizeof(built[0]), retained / count)
+    return sizes
+
+
+def run_memory(sizes, shapes=tuple(SHAPES), parsers=PARSERS, seed=0):
+    results = []
+    for shape in shapes:
+        for size in sizes:
+            exprstr = SHAPES[shape](size, seed)
+            for pname, strategy in parsers:
+                results.append(run_case(pname, strategy, shape, size, exprstr))
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "sizes": list(sizes),
+            "seed": seed,
+        },
+        "node_bytes": {**node_bytes(NODES), **node_bytes(FROZEN_NODES)},
+        "results": results,
+    }
+
+
+def print_results(run, out):
+    print(f"{'node':16} {'sizeof':>7} {'traced':>7}", file=out)
+    for name, (sizeof, traced_bytes) in run["node_bytes"].items():
+        print(f"{name:16} {sizeof:7} {traced_bytes:7.1f}", file=out)
+    print(file=out)
+    print(
+        f"{'':42} {'shape':>14} {'size':>6} {'bytes/token, peak/retained':^41}"
+        f" {'bytes/node':>10}",
+        file=out,
+    )
+    print(
+        f"{'parser':42} {'':>14} {'':>6} {'lex':>13} {'parse':>13} {'eval':>13}"
+        f" {'parse':>10}",
+        file=out,
+    )
+    for record in run["results"]:
+        cells = []
+        for phase in PHASES:
+            if f"{phase}_peak" in record:
+                peak = record[f"{phase}_peak"] / record["tokens"]
+                retained = record[f"{phase}_retained"] / record["tokens"]
+                cells.append(f"{peak:6.0f}/{retained:<6.0f}")
+            else:
+                cells.append(f"{'-':>13}")
+        if "nodes" in record:
+            cells.append(f"{record['parse_retained'] / record['nodes']:10.1f}")
+        error = f"  {record['error']}" if "error" in record else ""
+        print(
+            f"{record['parser']:42} {record['shape']:>14} {record['size']:>6}"
+            f" {' '.join(cells)}{error}",
+            file=out,
+        )
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="growth (as a fraction) that counts as a regression",
+    )
+    bench_main(
+        argparser,
+        lambda args: run_memory(args.sizes, args.shapes),
+        print_results,
+        MEASURES,
+        lambda size: f"{size} bytes",
+        lambda old, new: f"{new - old:+}",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Evaluation time of trees before and after optimize.optimize, on inputs the
+rewrites were made for (big modular powers, big ints times or modulo
+powers of two, runs of unary operators on big ints) and on ordinary ones
+where they rarely fire.
+"""
+import argparse
+
+from . import best_time
+from .shapes import int_mix, unary_runs
+from ..op_base import EvalVisitor
+from ..optimize import optimize
+from ..parsers import PARSERS, drive_parse
+from ..walker import walk
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--bits", type=int, default=200_000)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    bits = args.bits
+    big = f"(3 ** {bits * 10 // 16})"
+    cases = (
+        ("x ** e % m", f"x ** {bits // 16} % 1000000007"),
+        ("big ** e % big", f"{big} ** 3 % ({big} - 2)"),
+        ("big * 2 ** k", f"{big} * 2 ** {bits}"),
+        ("big % 2 ** k", f"{big} % 2 ** 64"),
+        ("~~-- runs on big", "~~--" * 50 + big),
+        ("int_mix 2000", int_mix(2000)),
+        ("unary_runs 2000", unary_runs(2000)),
+    )
+    strategy = dict(PARSERS)["Shunting Yard"]
+    env = {"x": 123456789}
+    print(f"best of {args.repeat}, ms")
+    print(f"{'':18} {'optimize':>10} {'eval':>10} {'optimized':>10} {'speedup':>8}")
+    for name, exprstr in cases:
+        tree = drive_parse(strategy, exprstr)
+        optimized = optimize(tree)
+        assert walk(optimized, EvalVisitor(env)) == walk(tree, EvalVisitor(env))
+        optimize_time = best_time(lambda: optimize(tree), args.repeat)
+        before = best_time(lambda: walk(tree, EvalVisitor(env)), args.repeat)
+        after = best_time(lambda: walk(optimized, EvalVisitor(env)), args.repeat)
+        print(
+            f"{name:18} {optimize_time * 1e3:10.2f} {before * 1e3:10.2f}"
+            f" {after * 1e3:10.2f} {before / after:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Parsing a file of newline-delimited expressions read as str lines versus
+parsed in place from an mmap with records.parse_file, and lexing alone
+with Lexer on each line versus BytesLexer on the mapped buffer (which
+builds a Token per token).
+"""
+import argparse
+import mmap
+import os
+import tempfile
+
+from . import best_time
+from .shapes import int_mix
+from ..op_base import BytesLexer, Lexer
+from ..parsers import PARSERS, drive_parse
+from ..records import parse_file, record_spans
+
+
+def parse_lines(strategy, path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            drive_parse(strategy, line.rstrip("\n"))
+
+
+def parse_mapped(strategy, path):
+    for _ in parse_file(strategy, path):
+        pass
+
+
+def lex_lines(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            Lexer(line.rstrip("\n")).clear_for_error()
+
+
+def lex_mapped(path):
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for start, end in record_spans(buffer):
+                BytesLexer(buffer, start, end).clear_for_error()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--lines", type=int, default=20000)
+    argparser.add_argument("--size", type=int, default=20, help="operators per line")
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    strategy = dict(PARSERS)["Shunting Yard"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "exprs.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            for seed in range(args.lines):
+                file.write(int_mix(args.size, seed) + "\n")
+        megabytes = os.path.getsize(path) / 1e6
+
+        print(f"{args.lines} lines, {megabytes:.1f} MB; MB/s, best of {args.repeat}")
+        lex_times = [
+            best_time(func, args.repeat)
+            for func in (
+                lambda: lex_lines(path),
+                lambda: lex_mapped(path),
+            )
+        ]
+        print(f"{'':6} {'Lexer':>8} {'mmap':>8}")
+        print(f"{'lex':6} " + " ".join(f"{megabytes / t:8.2f}" for t in lex_times))
+        parse_times = [
+            best_time(func, args.repeat)
+            for func in (
+                lambda: parse_lines(strategy, path),
+                lambda: parse_mapped(strategy, path),
+            )
+        ]
+        print(f"{'parse':6} " + " ".join(f"{megabytes / t:8.2f}" for t in parse_times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Size and speed of the binary tree format in serialize.py versus pickling
+the same Node trees, and the cost of indexing a tree with LazyTree.
+"""
+import argparse
+import pickle
+
+from . import best_time
+from .shapes import balanced, int_mix, left_chain, pow_tower, repeated_subexprs
+from ..parsers import PARSERS, drive_parse
+from ..serialize import LazyTree, dumps, loads
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    # Pickle recurses, so all but the last are kept inside the recursion limit
+    shapes = (
+        ("chain of 200", left_chain(200)),
+        ("balanced, 1024 leaves", balanced(10)),
+        ("** tower of 150", pow_tower(150)),
+        ("int_mix 150", int_mix(150)),
+        ("big literals", repeated_subexprs(40, 8)),
+        ("chain of 20000", left_chain(20000)),
+    )
+    strategy = dict(PARSERS)["Shunting Yard"]
+    protocol = pickle.HIGHEST_PROTOCOL
+    print(f"size in bytes; best of {args.repeat}, ms")
+    print(
+        f"{'':22} {'pickle':>8} {'binary':>8}   {'dump':>7} {'dumps':>7}"
+        f"   {'load':>7} {'loads':>7} {'lazy':>7}"
+    )
+    for name, exprstr in shapes:
+        tree = drive_parse(strategy, exprstr)
+        data = dumps(tree)
+        binary_cells = (
+            f"{best_time(lambda: dumps(tree), args.repeat) * 1e3:7.2f}",
+            f"{best_time(lambda: loads(data), args.repeat) * 1e3:7.2f}",
+            f"{best_time(lambda: LazyTree(data), args.repeat) * 1e3:7.2f}",
+        )
+        try:
+            pickled = pickle.dumps(tree, protocol)
+        except RecursionError:
+            pickle_cells = ("-", "-", "-")
+        else:
+            pickle_cells = (
+                len(pickled),
+                f"{best_time(lambda: pickle.dumps(tree, protocol), args.repeat) * 1e3:.2f}",
+                f"{best_time(lambda: pickle.loads(pickled), args.repeat) * 1e3:.2f}",
+            )
+        print(
+            f"{name:22} {pickle_cells[0]:>8} {len(data):8}"
+            f"   {pickle_cells[1]:>7} {binary_cells[0]}"
+            f"   {pickle_cells[2]:>7} {binary_cells[1]} {binary_cells[2]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Load generator for the parse/evaluate server: several clients, each with a
+fixed number of requests outstanding, against a server started in this
+process. Reports throughput and p50/p99 request latency.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from .shapes import int_mix
+from ..server import Client, add_workers_option, make_executor, start_server
+
+
+def percentile(sorted_times, fraction):
+    return sorted_times[min(len(sorted_times) - 1, int(fraction * len(sorted_times)))]
+
+
+def describe_workers(workers):
+    if workers is None:
+        return "the event loop's thread pool"
+    return f"a pool of {workers or os.cpu_count()} processes"
+
+
+async def client_load(address, corpus, outstanding, latencies):
+    async with await Client.connect(**address) as client:
+        exprs = iter(corpus)
+
+        async def worker():
+            for exprstr in exprs:
+                start = time.perf_counter()
+                await client.request(exprstr, mode="value")
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(outstanding)))
+
+
+async def run_load(args, executor):
+    server = await start_server(
+        "127.0.0.1", 0, max_concurrent=args.max_concurrent, executor=executor
+    )
+    address = {"host": "127.0.0.1", "port": server.sockets[0].getsockname()[1]}
+    corpus = [int_mix(args.ops, seed) for seed in range(args.requests)]
+    latencies = []
+    async with server:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client_load(address, corpus, args.outstanding, latencies)
+                for _ in range(args.clients)
+            )
+        )
+        elapsed = time.perf_counter() - start
+        # Let the server's connection handlers see the clients hang up;
+        # before Python 3.12 closing the server doesn't wait for them
+        await asyncio.wait(asyncio.all_tasks() - {asyncio.current_task()})
+    latencies.sort()
+    print(
+        f"{args.clients} clients x {args.requests} requests of {args.ops} operators,"
+        f" {args.outstanding} outstanding per client,"
+        f" server limit {args.max_concurrent} per connection,"
+        f" evaluating in {describe_workers(args.workers)}"
+    )
+    print(f"throughput  {len(latencies) / elapsed:10.0f} requests/s")
+    print(f"mean        {statistics.mean(latencies) * 1e3:10.3f} ms")
+    print(f"p50         {percentile(latencies, 0.50) * 1e3:10.3f} ms")
+    print(f"p99         {percentile(latencies, 0.99) * 1e3:10.3f} ms")
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--clients", type=int, default=4)
+    argparser.add_argument("--requests", type=int, default=2000, help="per client")
+    argparser.add_argument("--outstanding", type=int, default=16)
+    argparser.add_argument("--max-concurrent", type=int, default=8)
+    argparser.add_argument("--ops", type=int, default=20)
+    add_workers_option(argparser)
+    args = argparser.parse_args()
+    executor = make_executor(args.workers)
+    try:
+        asyncio.run(run_load(args, executor))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
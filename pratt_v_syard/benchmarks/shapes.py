@@ -0,0 +1,149 @@
+"""
+Generators for benchmark input expressions
+"""
+import random
+
+from ..op_base import OPERATORS
+
+BINOPS = tuple(name for name in OPERATORS if not name.startswith("_"))
+UNIOPS = tuple(name[1:] for name in OPERATORS if name.startswith("_"))
+# True division makes floats, which the bitwise operators and shifts reject
+INT_BINOPS = tuple(name for name in BINOPS if name != "/")
+
+# For the operators whose right operand random_mix keeps small, the
+# operators that may follow that operand without extending it
+BOUNDED_RIGHT = {
+    opname: tuple(
+        name
+        for name in BINOPS
+        if OPERATORS[name].left_precedence < OPERATORS[opname].right_precedence
+    )
+    for opname in ("**", "<<", ">>", "%")
+}
+
+
+def random_mix(n_ops, seed=0, ops=INT_BINOPS):
+    """
+    n_ops binary operators drawn from ops (by default every one but /, so
+    the result evaluates to an int), with the occasional unary operator and
+    parenthesized group mixed in.
+
+    So that evaluating the result stays cheap and well defined, the right
+    operand of **, %, and shifts is always a small literal that nothing of
+    higher precedence follows, as long as ops has an operator that may
+    follow it.
+    """
+    rng = random.Random(seed)
+    parts = []
+    depth = 0
+    op = None
+    for _ in range(n_ops):
+        if op in BOUNDED_RIGHT:
+            parts.append(str(rng.randint(1, 3)))
+            followers = [name for name in BOUNDED_RIGHT[op] if name in ops]
+            op = rng.choice(followers or ops)
+        else:
+            if rng.random() < 0.1:
+                parts.append("(")
+                depth += 1
+            if rng.random() < 0.1:
+                parts.append(rng.choice(UNIOPS))
+            parts.append(str(rng.randint(1, 99)))
+            if depth and rng.random() < 0.1:
+                parts.append(")")
+                depth -= 1
+            op = rng.choice(ops)
+        parts.append(op)
+    parts.append(str(rng.randint(1, 3) if op in BOUNDED_RIGHT else rng.randint(1, 99)))
+    parts.append(")" * depth)
+    return " ".join(parts)
+
+
+def repeated_subexprs(n_terms, n_distinct=8, seed=0):
+    """
+    n_terms terms joined by binary operators, each drawn from n_distinct
+    masking sub-expressions like "(2 ** 64 - 1)", so that most of the
+    expression is made of repeats
+    """
+    rng = random.Random(seed)
+    distinct = [
+        f"((2 ** {rng.randint(64, 4096)} - 1) % ({rng.randint(3, 999)} ** {i + 5}))"
+        for i in range(n_distinct)
+    ]
+    parts = [rng.choice(distinct)]
+    for _ in range(n_terms - 1):
+        parts.append(rng.choice(("+", "^", "|")))
+        parts.append(rng.choice(distinct))
+    return " ".join(parts)
+
+
+def left_chain(n_ops, seed=0, ops=("+", "-")):
+    """
+    A flat left-associative chain: 1 + 2 - 3 + ...
+    """
+    rng = random.Random(seed)
+    parts = [str(rng.randint(1, 99))]
+    for _ in range(n_ops):
+        parts.append(rng.choice(ops))
+        parts.append(str(rng.randint(1, 99)))
+    return " ".join(parts)
+
+
+def pow_tower(n_ops, seed=0):
+    """
+    A right-associative ** tower. All exponents but the first are 1 so the
+    value stays small however tall the tower.
+    """
+    rng = random.Random(seed)
+    return " ** ".join([str(rng.randint(2, 9))] + ["1"] * n_ops)
+
+
+def balanced(depth, seed=0):
+    """
+    A fully parenthesized balanced tree with 2 ** depth leaves
+    """
+    rng = random.Random(seed)
+    level = [str(rng.randint(1, 99)) for _ in range(2**depth)]
+    while len(level) > 1:
+        level = [
+            f"({level[i]} {rng.choice(('+', '-', '*', '^'))} {level[i + 1]})"
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
+
+
+def nested_parens(depth, seed=0):
+    """
+    Right-nested parentheses: 1 + (2 * (3 - (...)))
+    """
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(depth):
+        parts.append(f"{rng.randint(1, 99)} {rng.choice(('+', '-', '*'))} (")
+    parts.append(str(rng.randint(1, 99)))
+    parts.append(")" * depth)
+    return "".join(parts)
+
+
+def int_mix(n_ops, seed=0):
+    """
+    A random_mix without true division, so it evaluates to an int (barring
+    the odd ZeroDivisionError). That is random_mix's default; this name is
+    for callers that depend on it.
+    """
+    return random_mix(n_ops, seed, INT_BINOPS)
+
+
+def unary_runs(n_ops, seed=0, max_run=5):
+    """
+    n_ops binary operators, each operand preceded by a run of up to max_run
+    unary operators: - ~ -5 + ~ + 3 ...
+    """
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(n_ops + 1):
+        parts.extend(rng.choice(UNIOPS) for _ in range(rng.randint(1, max_run)))
+        parts.append(str(rng.randint(1, 99)))
+        parts.append(rng.choice(("+", "-", "*", "&", "|", "^")))
+    parts.pop()
+    return " ".join(parts)
@@ -0,0 +1,200 @@
+"""
+Time lexing, parsing and evaluation separately for every entry in
+parsers.PARSERS over a range of input shapes and sizes.
+
+Results are written as JSON, optionally appended to a JSON-lines history
+file, and optionally compared with a baseline from an earlier run: any
+phase that got slower by more than the threshold is reported as a
+regression and makes the run exit with status 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from . import best_time
+from .shapes import left_chain, nested_parens, pow_tower, random_mix
+from .shapes import unary_runs
+from ..op_base import EvalVisitor, LEX_RE, Lexer
+from ..parsers import PARSERS
+from ..walker import walk
+
+SHAPES = {
+    "left_chain": left_chain,
+    "pow_tower": pow_tower,
+    "nested_parens": nested_parens,
+    "unary_runs": unary_runs,
+    "random_mix": random_mix,
+}
+PHASES = ("lex", "parse", "eval")
+
+
+def lex(exprstr):
+    tokens = Lexer(exprstr)
+    tokens.clear_for_error()
+    return tokens
+
+
+def run_case(pname, strategy, shape, size, exprstr, repeat):
+    """
+    One result record; a phase that raises is recorded by exception name
+    and the later phases are skipped
+    """
+    record = {
+        "parser": pname,
+        "shape": shape,
+        "size": size,
+        "tokens": sum(1 for _ in LEX_RE.finditer(exprstr)),
+    }
+    record["lex"] = best_time(lambda: lex(exprstr), repeat)
+    try:
+        tree = strategy(lex(exprstr))
+        # Lex up front so only the parse is timed
+        lexers = [lex(exprstr) for _ in range(repeat)]
+        record["parse"] = best_time(lambda: strategy(lexers.pop()), repeat)
+    except (RecursionError, ValueError) as err:
+        record["error"] = f"parse: {type(err).__name__}"
+        return record
+    try:
+        walk(tree, EvalVisitor())
+        record["eval"] = best_time(lambda: walk(tree, EvalVisitor()), repeat)
+    except (ArithmeticError, TypeError, ValueError) as err:
+        record["error"] = f"eval: {type(err).__name__}"
+    return record
+
+
+def run_suite(sizes, repeat, shapes=tuple(SHAPES), parsers=PARSERS, seed=0):
+    results = []
+    for shape in shapes:
+        for size in sizes:
+            exprstr = SHAPES[shape](size, seed)
+            for pname, strategy in parsers:
+                results.append(run_case(pname, strategy, shape, size, exprstr, repeat))
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def case_key(record):
+    return (record["parser"], record["shape"], record["size"])
+
+
+def find_regressions(run, baseline, threshold, phases=PHASES):
+    """
+    (record, phase, old value, new value) for every one of phases in run
+    that is more than threshold (a fraction) bigger, that is slower, than
+    the same case in baseline. A phase the baseline has but run doesn't,
+    because it errored or wasn't measured, is one too, with None as its
+    new value.
+    """
+    old_records = {case_key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in run["results"]:
+        old = old_records.get(case_key(record))
+        if old is None:
+            continue
+        for phase in phases:
+            if phase not in old:
+                continue
+            if phase not in record:
+                regressions.append((record, phase, old[phase], None))
+            elif record[phase] > old[phase] * (1 + threshold):
+                regressions.append((record, phase, old[phase], record[phase]))
+    return regressions
+
+
+def print_results(run, out):
+    print(f"{'':42} {'shape':>14} {'size':>6}  ns/token", file=out)
+    print(
+        f"{'parser':42} {'':>14} {'':>6} {'lex':>8} {'parse':>8} {'eval':>8}", file=out
+    )
+    for record in run["results"]:
+        cells = []
+        for phase in PHASES:
+            if phase in record:
+                cells.append(f"{record[phase] * 1e9 / record['tokens']:8.0f}")
+            else:
+                cells.append(f"{'-':>8}")
+        error = f"  {record['error']}" if "error" in record else ""
+        print(
+            f"{record['parser']:42} {record['shape']:>14} {record['size']:>6}"
+            f" {' '.join(cells)}{error}",
+            file=out,
+        )
+
+
+def bench_main(argparser, run, print_run, phases, fmt, change):
+    """
+    The command line suite.py and memory.py share. argparser has the
+    script's own arguments, --threshold among them; this adds the shapes
+    and sizes, where to save the run and what to compare it with. It runs
+    run(args), prints the result with print_run, writes it to --output and
+    appends it to --history. Regressions in phases against --baseline go to
+    stderr, with values shown by fmt and growth by change(old, new), and
+    make it exit with status 1.
+    """
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    argparser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    argparser.add_argument("--output", help="write the results to this JSON file")
+    argparser.add_argument(
+        "--history", help="append the results to this JSON-lines file"
+    )
+    argparser.add_argument("--baseline", help="compare against this results file")
+    args = argparser.parse_args()
+
+    run = run(args)
+    print_run(run, sys.stdout)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(run, output, indent=1)
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as history:
+            history.write(json.dumps(run) + "\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(run, baseline, args.threshold, phases)
+        for record, phase, old, new in regressions:
+            if new is None:
+                new_cell = record.get("error", "missing")
+            else:
+                new_cell = f"{fmt(new)} ({change(old, new)})"
+            print(
+                f"REGRESSION {record['parser']} {record['shape']} {record['size']}"
+                f" {phase}: {fmt(old)} -> {new_cell}",
+                file=sys.stderr,
+            )
+        if regressions:
+            sys.exit(1)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--repeat", type=int, default=3)
+    argparser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown (as a fraction) that counts as a regression",
+    )
+    bench_main(
+        argparser,
+        lambda args: run_suite(args.sizes, args.repeat, args.shapes),
+        print_results,
+        PHASES,
+        lambda seconds: f"{seconds * 1e3:.3f} ms",
+        lambda old, new: f"+{(new / old - 1) * 100:.0f}%",
+    )
+
+
+if __name__ == "__main__":
+    main()
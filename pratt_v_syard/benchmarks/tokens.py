@@ -0,0 +1,43 @@
+"""
+Per-token cost of lexing and parsing with regex matches (Lexer) versus
+Token objects (BytesLexer, over the encoded text), for every parser.
+"""
+import argparse
+
+from . import best_time
+from .shapes import random_mix
+from ..op_base import LEX_RE, BytesLexer, Lexer
+from ..parsers import PARSERS
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--ops", type=int, default=20000)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    exprstr = random_mix(args.ops)
+    ntokens = sum(1 for _ in LEX_RE.finditer(exprstr))
+    print(f"{ntokens} tokens, best of {args.repeat}, ns/token")
+    print(f"{'':45} {'Lexer':>10} {'BytesLexer':>10}")
+
+    def per_token(func):
+        return best_time(func, args.repeat) * 1e9 / ntokens
+
+    data = exprstr.encode()
+    lex_costs = [
+        per_token(lambda: Lexer(exprstr)),
+        per_token(lambda: BytesLexer(data)),
+    ]
+    print(f"{'lex':45} {lex_costs[0]:10.1f} {lex_costs[1]:10.1f}")
+    for pname, pfunc in PARSERS:
+        costs = []
+        for lexer_class, source in ((Lexer, exprstr), (BytesLexer, data)):
+            # Lex up front so only the parse is timed
+            lexers = [lexer_class(source) for _ in range(args.repeat)]
+            costs.append(per_token(lambda p=pfunc, l=lexers: p(l.pop())))
+        print(f"{pname:45} {costs[0]:10.1f} {costs[1]:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
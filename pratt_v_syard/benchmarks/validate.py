@@ -0,0 +1,63 @@
+"""
+Throughput and peak memory of shunting_yard.validate against a full parse
+(lexing included in both) of the same inputs.
+"""
+import argparse
+import tracemalloc
+
+from . import best_time
+from .shapes import int_mix, left_chain, nested_parens, unary_runs
+from ..op_base import LEX_RE
+from ..parsers import PARSERS, drive_parse
+from ..shunting_yard import validate
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--size", type=int, default=20_000)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    size = args.size
+    shapes = (
+        ("left_chain", left_chain(size)),
+        ("int_mix", int_mix(size)),
+        ("unary_runs", unary_runs(size)),
+        ("nested_parens", nested_parens(size)),
+    )
+    strategies = dict(PARSERS)
+    contenders = (
+        ("validate", validate),
+        (
+            "Shunting Yard",
+            lambda exprstr: drive_parse(strategies["Shunting Yard"], exprstr),
+        ),
+        (
+            "Generated Shunting Yard",
+            lambda exprstr: drive_parse(strategies["Generated Shunting Yard"], exprstr),
+        ),
+    )
+    print(f"best of {args.repeat}")
+    print(f"{'':14} {'':24} {'Mtok/s':>8} {'peak KiB':>9}")
+    for shape, exprstr in shapes:
+        tokens = sum(1 for _ in LEX_RE.finditer(exprstr))
+        for name, func in contenders:
+            elapsed = best_time(lambda: func(exprstr), args.repeat)
+            peak = peak_bytes(lambda: func(exprstr))
+            print(
+                f"{shape:14} {name:24} {tokens / elapsed / 1e6:8.2f}"
+                f" {peak / 1024:9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+The explicit-stack walker versus the recursive accept() visitors: what
+walking trees of any depth costs on the trees accept() can handle
+"""
+import argparse
+
+from . import best_time
+from .shapes import balanced, left_chain, nested_parens, pow_tower
+from ..op_base import EvalVisitor, Lispish, NodeVisitor
+from ..parsers import PARSERS, drive_parse
+from ..walker import walk
+
+
+class CountVisitor(NodeVisitor):
+    """
+    A visitor with no fold methods, so the walker has to proxy it
+    """
+
+    def visit_binop(self, binop_node):
+        return binop_node.left.accept(self) + binop_node.right.accept(self) + 1
+
+    def visit_uniop(self, uniop_node):
+        return uniop_node.right.accept(self) + 1
+
+    def visit_val(self, val_node):
+        return 1
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    shapes = (
+        ("chain of 400", left_chain(400)),
+        ("balanced, 4096 leaves", balanced(12)),
+        ("** tower of 400", pow_tower(400)),
+        ("parens nested 5000 deep", nested_parens(5000)),
+    )
+    strategy = dict(PARSERS)["Shunting Yard"]
+    print(f"best of {args.repeat}, ms")
+    print(f"{'':24} {'visitor':>12} {'recursive':>10} {'walk':>10}")
+    for name, exprstr in shapes:
+        tree = drive_parse(strategy, exprstr)
+        for visitor_class in (EvalVisitor, Lispish, CountVisitor):
+            try:
+                recursive = tree.accept(visitor_class())
+            except RecursionError:
+                recursive_cell = "RecursionError"
+            else:
+                assert recursive == walk(tree, visitor_class())
+                recursive_time = best_time(
+                    lambda: tree.accept(visitor_class()), args.repeat
+                )
+                recursive_cell = f"{recursive_time * 1e3:.2f}"
+            walk_time = best_time(lambda: walk(tree, visitor_class()), args.repeat)
+            print(
+                f"{name:24} {visitor_class.__name__:>12} {recursive_cell:>10}"
+                f" {walk_time * 1e3:10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+A backend that compiles expressions to flat postfix programs instead of
+trees, and a stack machine that runs them.
+
+A Program is an array of instruction words and a pool of slots. A word
+w >= 0 applies operator w (its id in the grammar: its position in the
+operator table) to the top of the stack; a word w < 0 pushes the value in
+slot ~w. Slots hold the literals, and one slot per distinct variable is
+filled in from env each time the program runs.
+
+parse_program is shunting_yard.parse as the output-queue algorithm it
+really is: atoms go straight to the program and operators follow as they
+leave the operator stack, so there are no closures, stack tuples or
+nodes. It raises the same errors as the shunting yard parser.
+
+Programs pickle as raw array bytes, the slot pool and the grammar, and
+compile_program caches them on the source text.
+"""
+from array import array
+import functools
+
+from .compiled import postorder
+from .op_base import GRAMMAR, BinopNode, UniopNode, ValNode, VarNode, Lexer
+
+# The value of a variable slot whose variable isn't in env
+UNBOUND = object()
+
+
+class Program:
+    """
+    A postfix program for grammar, built through emit_val, emit_var and
+    emit_op
+    """
+
+    def __init__(self, grammar=GRAMMAR):
+        self.grammar = grammar
+        self.code = array("q")
+        # Literal values, and variable names in the variables' slots
+        self.slots = []
+        # (slot, name) for each variable
+        self.variables = []
+        self._literal_slots = {}
+        self._var_slots = {}
+        self._unary = tuple(name.startswith("_") for name in grammar.names)
+
+    def __len__(self):
+        return len(self.code)
+
+    def __getstate__(self):
+        return (self.code.tobytes(), self.slots, self.variables, self.grammar)
+
+    def __setstate__(self, state):
+        code, slots, variables, grammar = state
+        self.__init__(grammar)
+        self.code.frombytes(code)
+        self.slots = slots
+        self.variables = variables
+        variable_slots = set()
+        for slot, name in variables:
+            self._var_slots[name] = slot
+            variable_slots.add(slot)
+        for slot, val in enumerate(slots):
+            if slot not in variable_slots and type(val) is int:
+                self._literal_slots[val] = slot
+
+    def emit_val(self, val):
+        # Only ints are shared: 0, 0.0, -0.0 and False are equal as keys
+        slot = self._literal_slots.get(val) if type(val) is int else None
+        if slot is None:
+            slot = len(self.slots)
+            self.slots.append(val)
+            if type(val) is int:
+                self._literal_slots[val] = slot
+        self.code.append(~slot)
+
+    def emit_var(self, name):
+        slot = self._var_slots.get(name)
+        if slot is None:
+            slot = self._var_slots[name] = len(self.slots)
+            self.slots.append(name)
+            self.variables.append((slot, name))
+        self.code.append(~slot)
+
+    def emit_op(self, op):
+        self.code.append(op)
+
+    @classmethod
+    def from_node(cls, root, grammar=GRAMMAR):
+        """
+        Compile a Node tree from any parser, without recursion; operators are
+        looked up in grammar by name
+        """
+        program = cls(grammar)
+        ids = {name: op for (op, name) in enumerate(grammar.names)}
+        for node in postorder(root):
+            if isinstance(node, ValNode):
+                program.emit_val(node.val)
+            elif isinstance(node, VarNode):
+                program.emit_var(node.name)
+            else:
+                program.emit_op(ids[node.name])
+        return program
+
+    def run(self, env=None):
+        """
+        The equivalent of running EvalVisitor(env) over the tree, errors
+        included
+        """
+        values = self.slots.copy()
+        for slot, name in self.variables:
+            try:
+                values[slot] = env[name]
+            except (KeyError, TypeError):
+                values[slot] = UNBOUND
+        funcs = self.grammar.funcs
+        unary = self._unary
+        # The top of the stack is kept in top; the None underneath it is
+        # never looked at
+        top = None
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for word in self.code:
+            if word < 0:
+                push(top)
+                top = values[~word]
+                if top is UNBOUND:
+                    raise ValueError(f"Unbound variable {self.slots[~word]}")
+            elif unary[word]:
+                top = funcs[word](top)
+            else:
+                top = funcs[word](pop(), top)
+        return top
+
+    def lispish(self):
+        """
+        The equivalent of running Lispish over the tree
+        """
+        names = self.grammar.names
+        unary = self._unary
+        stack = []
+        for word in self.code:
+            if word < 0:
+                stack.append(str(self.slots[~word]))
+            elif unary[word]:
+                stack[-1] = f"({names[word]} {stack[-1]})"
+            else:
+                right = stack.pop()
+                stack[-1] = f"({names[word]} {stack[-1]} {right})"
+        return stack[0]
+
+
+def parse_program(tokstream, grammar=GRAMMAR):
+    """
+    Compile tokens to a Program, by shunting yard
+    """
+    program = Program(grammar)
+    emit_val = program.emit_val
+    emit_var = program.emit_var
+    emit_op = program.code.append
+    binop_ids = grammar.binop_ids
+    uniop_ids = grammar.uniop_ids
+    left_bp = grammar.left_bp
+    # A left paren on the operator stack has an id past the operators', and
+    # a binding power below all of theirs
+    lparen = len(grammar.names)
+    op_stack_bp = grammar.right_bp + (grammar.min_precedence - 1,)
+    op_stack = []
+    paren_starts = []
+    expect_atom = True
+    for tok in tokstream:
+        kind = tok.lastgroup
+        if expect_atom:
+            if kind == "num":
+                emit_val(int(tok.group()))
+                expect_atom = False
+                continue
+            if kind == "name":
+                emit_var(tok.group())
+                expect_atom = False
+                continue
+            if kind == "paren":
+                if tok.group() != "(":
+                    raise ValueError(f"Unexpected right paren at {tok.start()}")
+                op_stack.append(lparen)
+                paren_starts.append(tok.start())
+                continue
+            op = uniop_ids.get(tok.group())
+            if op is None:
+                raise ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+        elif kind == "op":
+            op = binop_ids[tok.group()]
+            expect_atom = True
+        else:
+            while op_stack:
+                top = op_stack.pop()
+                if top == lparen:
+                    paren_starts.pop()
+                    break
+                emit_op(top)
+            else:
+                raise ValueError(f"Expected operator at {tok.start()}")
+            if tok.group() == ")":
+                continue
+            raise ValueError(f"Expected operator or right paren at {tok.start()}")
+        new_prec = left_bp[op]
+        while op_stack and new_prec < op_stack_bp[op_stack[-1]]:
+            emit_op(op_stack.pop())
+        op_stack.append(op)
+    if expect_atom:
+        raise ValueError("Unexpected EOF")
+    while op_stack:
+        top = op_stack.pop()
+        if top == lparen:
+            raise ValueError(f"Unclosed left paren beginning at {paren_starts[-1]}")
+        emit_op(top)
+    return program
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_program(exprstr, lexer_class=Lexer, grammar=GRAMMAR):
+    """
+    Lex exprstr and compile it to a Program, cached on the source text;
+    the cached Program is shared, so leave it alone
+    """
+    tokens = lexer_class(exprstr, grammar=grammar)
+    tokens.clear_for_error()
+    return parse_program(tokens, grammar)
@@ -0,0 +1,153 @@
+"""
+Compile parsed trees into Python functions, for evaluating the same tree
+many times without walking it.
+
+The generated function is straight-line code: each operator node becomes
+one assignment to a local named after its slot on the evaluation stack,
+so neither generating nor compiling it recurses on the depth of the tree.
+It takes an optional mapping of variable values.
+"""
+import functools
+import operator
+
+from .op_base import GRAMMAR, BinopNode, UniopNode, ValNode, VarNode, Lexer
+from .parsers import drive_parse
+
+# Operators that can be written as Python syntax instead of a call
+BINOP_SYNTAX = {
+    operator.or_: "|",
+    operator.xor: "^",
+    operator.and_: "&",
+    operator.rshift: ">>",
+    operator.lshift: "<<",
+    operator.add: "+",
+    operator.sub: "-",
+    operator.mul: "*",
+    operator.truediv: "/",
+    operator.mod: "%",
+    operator.pow: "**",
+}
+UNIOP_SYNTAX = {
+    operator.pos: "+",
+    operator.neg: "-",
+    operator.inv: "~",
+}
+
+
+def postorder(root):
+    """
+    Yield the nodes of the tree in postfix order, without recursion
+    """
+    todo = [(root, False)]
+    while todo:
+        node, children_done = todo.pop()
+        if children_done or isinstance(node, (ValNode, VarNode)):
+            yield node
+        elif isinstance(node, UniopNode):
+            todo.append((node, True))
+            todo.append((node.right, False))
+        elif isinstance(node, BinopNode):
+            todo.append((node, True))
+            todo.append((node.right, False))
+            todo.append((node.left, False))
+        else:
+            raise ValueError(f"Can't compile {node}")
+
+
+def tree_source(root, name="compiled"):
+    """
+    The source of a function that evaluates the tree, and the namespace it
+    needs to be run in
+    """
+    namespace = {"_lookup_var": lookup_var}
+    lines = [f"def {name}(env=None):"]
+    operands = []
+    variables = {}
+
+    def add_global(value):
+        global_name = f"_g{len(namespace)}"
+        namespace[global_name] = value
+        return global_name
+
+    for node in postorder(root):
+        if isinstance(node, VarNode):
+            if node.name not in variables:
+                variables[node.name] = f"v{len(variables)}"
+                lines.append(
+                    f"    {variables[node.name]} = _lookup_var(env, {node.name!r})"
+                )
+            operands.append(variables[node.name])
+            continue
+        if isinstance(node, ValNode):
+            if isinstance(node.val, int) and node.val >= 0:
+                operands.append(repr(node.val))
+            else:
+                operands.append(add_global(node.val))
+            continue
+        if isinstance(node, UniopNode):
+            right = operands.pop()
+            if node.opfunc in UNIOP_SYNTAX:
+                expr = f"{UNIOP_SYNTAX[node.opfunc]}{right}"
+            else:
+                expr = f"{add_global(node.opfunc)}({right})"
+        else:
+            right = operands.pop()
+            left = operands.pop()
+            if node.opfunc in BINOP_SYNTAX:
+                expr = f"{left} {BINOP_SYNTAX[node.opfunc]} {right}"
+            else:
+                expr = f"{add_global(node.opfunc)}({left}, {right})"
+        target = f"s{len(operands)}"
+        lines.append(f"    {target} = {expr}")
+        operands.append(target)
+    lines.append(f"    return {operands.pop()}")
+    return "\n".join(lines) + "\n", namespace
+
+
+def lookup_var(env, name):
+    try:
+        return env[name]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unbound variable {name}") from None
+
+
+def build_function(source, namespace):
+    """
+    Run the source from tree_source in its namespace and return the
+    function it defines, without any caching
+    """
+    exec(compile(source, "<compiled tree>", "exec"), namespace)
+    return namespace["compiled"]
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_function(source, globals_key):
+    return build_function(source, {name: value for name, _, value in globals_key})
+
+
+def compile_tree(root):
+    """
+    Compile a tree into a function returning its value, taking a mapping of
+    variable values if the tree has any.
+
+    Cached on the generated source and the values it refers to, not on
+    root, so a tree edited in place is compiled again and the cache holds
+    no trees.
+    """
+    source, namespace = tree_source(root)
+    # The types keep 1 and 1.0, which hash the same, apart
+    return _cached_function(
+        source,
+        tuple((name, type(value), value) for name, value in namespace.items()),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_expr(strategy, exprstr, lexer_class=Lexer, grammar=GRAMMAR):
+    """
+    Parse exprstr with grammar and compile the result, cached on the
+    source text
+    """
+    return build_function(
+        *tree_source(drive_parse(strategy, exprstr, lexer_class, grammar=grammar))
+    )
@@ -0,0 +1,99 @@
+"""
+Hash-consed parse trees: structurally identical subtrees become one shared
+node, so a parse produces a DAG.
+"""
+from .op_base import FROZEN_NODES, GRAMMAR, EvalVisitor, Lexer, NodeFactory
+from .parsers import drive_parse
+
+
+class NodeInterner:
+    """
+    A node factory (self.nodes) that hands back the existing node whenever
+    it is asked for one it has already built.
+
+    Since children are interned before their parents, two interned nodes
+    are structurally equal exactly when they are the same object. The
+    interner can be shared across parses to share subtrees between them,
+    so the nodes it builds are frozen: changing one would change every
+    tree it is shared with.
+    """
+
+    def __init__(self):
+        self._binops = {}
+        self._uniops = {}
+        self._vals = {}
+        self._vars = {}
+        self.nodes = NodeFactory(self.binop, self.uniop, self.val, self.var)
+
+    def __len__(self):
+        return len(self._binops) + len(self._uniops) + len(self._vals) + len(self._vars)
+
+    def binop(self, name, opfunc, left, right):
+        key = (name, opfunc, left, right)
+        node = self._binops.get(key)
+        if node is None:
+            node = self._binops[key] = FROZEN_NODES.binop(name, opfunc, left, right)
+        return node
+
+    def uniop(self, name, opfunc, right):
+        key = (name, opfunc, right)
+        node = self._uniops.get(key)
+        if node is None:
+            node = self._uniops[key] = FROZEN_NODES.uniop(name, opfunc, right)
+        return node
+
+    def val(self, val):
+        # 1, 1.0 and True are equal keys, but not the same value
+        key = (type(val), val)
+        node = self._vals.get(key)
+        if node is None:
+            node = self._vals[key] = FROZEN_NODES.val(val)
+        return node
+
+    def var(self, name):
+        node = self._vars.get(name)
+        if node is None:
+            node = self._vars[name] = FROZEN_NODES.var(name)
+        return node
+
+
+class MemoEvalVisitor(EvalVisitor):
+    """
+    An EvalVisitor that evaluates each node object only once, so shared
+    subtrees of a DAG cost nothing after their first use. Reusing one
+    visitor across DAGs from the same NodeInterner shares work between them.
+    """
+
+    def __init__(self, env=None):
+        super().__init__(env)
+        self._memo = {}
+
+    def visit_binop(self, binop_node):
+        memo = self._memo
+        if binop_node in memo:
+            return memo[binop_node]
+        retval = memo[binop_node] = binop_node.opfunc(
+            binop_node.left.accept(self), binop_node.right.accept(self)
+        )
+        return retval
+
+    def visit_uniop(self, uniop_node):
+        memo = self._memo
+        if uniop_node in memo:
+            return memo[uniop_node]
+        retval = memo[uniop_node] = uniop_node.opfunc(uniop_node.right.accept(self))
+        return retval
+
+    # Under walker.walk(..., shared=True) the walker does the memoizing
+    fold_binop = EvalVisitor.fold_binop
+    fold_uniop = EvalVisitor.fold_uniop
+
+
+def parse_dag(strategy, exprstr, lexer_class=Lexer, interner=None, grammar=GRAMMAR):
+    """
+    Like parsers.drive_parse, but interns the nodes with interner (a fresh
+    NodeInterner by default)
+    """
+    if interner is None:
+        interner = NodeInterner()
+    return drive_parse(strategy, exprstr, lexer_class, interner.nodes, grammar=grammar)
@@ -0,0 +1,385 @@
+"""
+A persistent cache of parse trees and batch outputs in a SQLite file, for
+batch jobs that see mostly the same expressions run after run.
+
+Entries are keyed by a hash of the serialize header for the grammar
+(which covers the format version and the operator table), the parser's
+qualified name, a kind and the source text. The kind says what was
+stored: TREE for a parse tree, serialized with serialize.dumps, or
+anything else the caller picks for an output, such as batch's output
+text for one mode and environment. Each entry holds a tree, an output
+or an error (its type name and message), as a CachedResult.
+
+Every call works on a batch: get_many is one SELECT per MAX_PARAMS
+sources and put_many one transaction, so a chunk of a batch job costs a
+couple of queries whatever its size. Any number of processes can use the
+same file at once; it is in WAL mode, so readers never wait, and writers
+take the write lock up front and wait up to timeout seconds for it.
+
+Payload bytes (sources aren't stored, only their hashes) are counted as
+entries come and go, and once they pass max_bytes the least recently
+used entries are evicted down to LOW_WATER of it. Hits refresh an entry
+at most every TOUCH_AFTER seconds, so mostly-hit batches rarely write.
+The file itself doesn't shrink when entries go, but SQLite reuses the
+space. Keys don't change when a parser's code does: clear() the cache, or
+use a new file, after changing a parser.
+"""
+from collections import namedtuple
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from .batch import ITEM_ERRORS, OutputResult, ParseResult, output_chunk
+from .limits import DeadlineExceeded
+from .op_base import GRAMMAR, NODES
+from .parsers import drive_parse
+from .serialize import dumps, header, loads
+
+# tree is serialized bytes, output any str, and error an exception; all
+# but one are None
+CachedResult = namedtuple("CachedResult", ["tree", "output", "error"])
+CacheStats = namedtuple(
+    "CacheStats", ["hits", "misses", "evictions", "entries", "payload_bytes"]
+)
+
+TREE = "tree"
+SCHEMA_VERSION = 1
+MAX_PARAMS = 500
+LOW_WATER = 0.9
+TOUCH_AFTER = 60.0
+# Roughly what SQLite spends on a row besides its payload
+ROW_OVERHEAD = 40
+# Errors that depend on more than the expression (the deadline, or the
+# recursion limit and stack of the process), so aren't stored
+UNCACHED_ERRORS = (DeadlineExceeded, RecursionError)
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS entries (
+        key BLOB PRIMARY KEY,
+        tree BLOB,
+        output TEXT,
+        error_type TEXT,
+        error TEXT,
+        size INTEGER NOT NULL,
+        used REAL NOT NULL
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)",
+    """CREATE TABLE IF NOT EXISTS totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        payload_bytes INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO totals VALUES (0, 0)",
+    """CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+        UPDATE totals SET payload_bytes = payload_bytes + NEW.size;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+        UPDATE totals SET payload_bytes = payload_bytes - OLD.size;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+    BEGIN
+        UPDATE totals SET payload_bytes = payload_bytes + NEW.size - OLD.size;
+    END""",
+)
+
+
+class CachedError(Exception):
+    """
+    An error read back from the cache: the message of the original, and
+    the name of its type as type_name
+    """
+
+    def __init__(self, type_name, message):
+        super().__init__(message)
+        self.type_name = type_name
+
+    def __reduce__(self):
+        return (CachedError, (self.type_name, str(self)))
+
+
+def error_name(error):
+    """
+    The type name of error, or of the error it stands for if it came from
+    the cache
+    """
+    return getattr(error, "type_name", type(error).__name__)
+
+
+def parser_id(strategy):
+    return f"{strategy.__module__}.{strategy.__qualname__}"
+
+
+def output_kind(mode, env, limits):
+    """
+    The kind batch outputs are cached under: everything but the parser and
+    the source that a mode's output depends on
+    """
+    if mode != "value":
+        return mode
+    env = json.dumps(env, sort_keys=True, default=repr)
+    return f"value {limits.max_bits} {env}"
+
+
+def _schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _chunks(items, size=MAX_PARAMS):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class DiskCache:
+    """
+    The cache in the SQLite file at path, created if need be, for trees of
+    grammar. It pickles as its settings and connects again wherever it is
+    unpickled (or on first use after a fork), so it can be passed to
+    worker processes; its hit and miss counts are per process.
+    """
+
+    def __init__(self, path, max_bytes=256 << 20, grammar=GRAMMAR, timeout=30.0):
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self.grammar = grammar
+        self.timeout = timeout
+        self._prefix = header(grammar)
+        self._conn = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        return (self.path, self.max_bytes, self.grammar, self.timeout)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            self._use_wal(conn)
+            conn.execute("PRAGMA synchronous = NORMAL")
+            if _schema_version(conn) != SCHEMA_VERSION:
+                with _write(conn):
+                    # Another process may have got here first
+                    if _schema_version(conn) == 0:
+                        for statement in _SCHEMA:
+                            conn.execute(statement)
+                        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            version = _schema_version(conn)
+            if version != SCHEMA_VERSION:
+                raise ValueError(f"{self.path} is a cache of schema version {version}")
+        except BaseException:
+            conn.close()
+            raise
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _use_wal(self, conn):
+        """
+        Put the file in WAL mode. Processes switching a new file at once
+        each hold the read lock the others need, and SQLite fails all but
+        one straight away rather than wait, so retry until timeout.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                return
+            except sqlite3.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def key(self, strategy, source, kind=TREE):
+        data = "\0".join((parser_id(strategy), kind, source)).encode()
+        return hashlib.blake2b(self._prefix + data, digest_size=16).digest()
+
+    def get_many(self, strategy, sources, kind=TREE):
+        """
+        A CachedResult, or None for a miss, for each of sources
+        """
+        keys = [self.key(strategy, source, kind) for source in sources]
+        conn = self._connect()
+        found = {}
+        for chunk in _chunks(keys):
+            marks = ", ".join("?" * len(chunk))
+            found.update(
+                (row[0], row[1:])
+                for row in conn.execute(
+                    "SELECT key, tree, output, error_type, error, used FROM entries"
+                    f" WHERE key IN ({marks})",
+                    chunk,
+                )
+            )
+        now = time.time()
+        stale = [
+            (now, key) for key, row in found.items() if row[-1] < now - TOUCH_AFTER
+        ]
+        if stale:
+            with _write(conn):
+                conn.executemany("UPDATE entries SET used = ? WHERE key = ?", stale)
+        results = []
+        for key in keys:
+            row = found.get(key)
+            if row is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                tree, output, error_type, error, _ = row
+                if error_type is not None:
+                    error = CachedError(error_type, error)
+                results.append(CachedResult(tree, output, error))
+        return results
+
+    def put_many(self, strategy, items, kind=TREE):
+        """
+        Store (source, CachedResult) items, replacing any already there,
+        then evict if the cache has grown past max_bytes
+        """
+        now = time.time()
+        rows = []
+        for source, result in items:
+            key = self.key(strategy, source, kind)
+            error_type = error = None
+            if result.error is not None:
+                error_type, error = error_name(result.error), str(result.error)
+            size = ROW_OVERHEAD + len(key)
+            for value in (result.tree, result.output, error_type, error):
+                if value is not None:
+                    size += len(value)
+            rows.append((key, result.tree, result.output, error_type, error, size, now))
+        if not rows:
+            return
+        conn = self._connect()
+        with _write(conn):
+            conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET tree = excluded.tree,"
+                " output = excluded.output, error_type = excluded.error_type,"
+                " error = excluded.error, size = excluded.size, used = excluded.used",
+                rows,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT payload_bytes FROM totals").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * LOW_WATER)
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def get(self, strategy, source, kind=TREE):
+        return self.get_many(strategy, [source], kind)[0]
+
+    def put(self, strategy, source, result, kind=TREE):
+        self.put_many(strategy, [(source, result)], kind)
+
+    def parse_many(self, strategy, exprstrs, nodes=NODES):
+        """
+        A batch.ParseResult for each of exprstrs, parsed with strategy
+        unless its tree (or error) is in the cache, in which case the tree
+        is loaded with nodes; the new results are stored, but for
+        UNCACHED_ERRORS
+        """
+        exprstrs = list(exprstrs)
+        results = []
+        new = []
+        for exprstr, hit in zip(exprstrs, self.get_many(strategy, exprstrs)):
+            if hit is not None:
+                tree = (
+                    None if hit.tree is None else loads(hit.tree, nodes, self.grammar)
+                )
+                results.append(ParseResult(tree, hit.error))
+                continue
+            try:
+                tree = drive_parse(strategy, exprstr, nodes=nodes, grammar=self.grammar)
+            except ITEM_ERRORS as err:
+                results.append(ParseResult(None, err))
+                if not isinstance(err, UNCACHED_ERRORS):
+                    new.append((exprstr, CachedResult(None, None, err)))
+            else:
+                results.append(ParseResult(tree, None))
+                new.append(
+                    (exprstr, CachedResult(dumps(tree, self.grammar), None, None))
+                )
+        self.put_many(strategy, new)
+        return results
+
+    def outputs(self, exprstrs, strategy, mode, env, limits):
+        """
+        batch.output_chunk, with outputs and errors from the cache where it
+        has them; hits take an equal share of the time spent looking up.
+        UNCACHED_ERRORS aren't stored.
+        """
+        if not exprstrs:
+            return []
+        start = time.perf_counter()
+        kind = output_kind(mode, env, limits)
+        hits = self.get_many(strategy, exprstrs, kind)
+        hit_seconds = (time.perf_counter() - start) / len(exprstrs)
+        misses = [exprstr for exprstr, hit in zip(exprstrs, hits) if hit is None]
+        fresh = iter(output_chunk(misses, strategy, mode, env, limits))
+        results = []
+        new = []
+        for exprstr, hit in zip(exprstrs, hits):
+            if hit is not None:
+                results.append(OutputResult(hit.output, hit.error, hit_seconds))
+                continue
+            result = next(fresh)
+            results.append(result)
+            if not isinstance(result.error, UNCACHED_ERRORS):
+                new.append((exprstr, CachedResult(None, result.output, result.error)))
+        self.put_many(strategy, new, kind)
+        return results
+
+    def stats(self):
+        conn = self._connect()
+        entries = conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+        total = conn.execute("SELECT payload_bytes FROM totals").fetchone()[0]
+        return CacheStats(self.hits, self.misses, self.evictions, entries, total)
+
+    def clear(self):
+        conn = self._connect()
+        with _write(conn):
+            conn.execute("DELETE FROM entries")
+
+
+@contextlib.contextmanager
+def _write(conn):
+    """
+    A write transaction on conn, taking the write lock at the start so it
+    can't fail part way through for want of it
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,297 @@
+"""
+A parse target that stores the tree as parallel arrays in postfix order
+instead of as one Python object per node.
+
+Node i has an opcode (the operator's id in the tree's grammar, that is its
+index into grammar.names, VAL_OPCODE for a literal or VAR_OPCODE for a
+variable), and left/right entries holding the indices of
+its children. For a literal or variable, left holds its index into the
+literal or name pool; unused entries are -1. Every
+parser creates a node's children before the node itself, working left to
+right, so the nodes land in postfix order and the root is the last one.
+"""
+from array import array
+
+from .op_base import (
+    BinopNode,
+    UniopNode,
+    ValNode,
+    VarNode,
+    Lexer,
+    NodeFactory,
+    GRAMMAR,
+)
+from .parsers import drive_parse
+
+VAL_OPCODE = -1
+VAR_OPCODE = -2
+# Opcodes are signed bytes
+MAX_OPERATORS = 128
+
+
+class FlatTree:
+    """
+    A tree of opcodes and child indices for grammar's operators, built
+    through self.nodes
+    """
+
+    def __init__(self, grammar=GRAMMAR):
+        if len(grammar.names) > MAX_OPERATORS:
+            raise ValueError(f"Can't flatten more than {MAX_OPERATORS} operators")
+        self.grammar = grammar
+        self.opcodes = array("b")
+        self.left = array("q")
+        self.right = array("q")
+        self.literals = []
+        self._literal_ids = {}
+        self.names = []
+        self._name_ids = {}
+        self.nodes = NodeFactory(self._binop, self._uniop, self._val, self._var)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    # Pickle as the grammar (None for the default one, which is most of the
+    # size otherwise), raw array bytes and the two pools; the factory and
+    # the indexes are rebuilt on load
+    def __getstate__(self):
+        return (
+            None if self.grammar == GRAMMAR else self.grammar,
+            self.opcodes.tobytes(),
+            self.left.tobytes(),
+            self.right.tobytes(),
+            self.literals,
+            self.names,
+        )
+
+    def __setstate__(self, state):
+        grammar, opcodes, left, right, literals, names = state
+        self.__init__(GRAMMAR if grammar is None else grammar)
+        self.literals = literals
+        self.names = names
+        self.opcodes.frombytes(opcodes)
+        self.left.frombytes(left)
+        self.right.frombytes(right)
+        self._literal_ids = {val: i for (i, val) in enumerate(self.literals)}
+        self._name_ids = {name: i for (i, name) in enumerate(self.names)}
+
+    def _append(self, opcode, left, right):
+        self.opcodes.append(opcode)
+        self.left.append(left)
+        self.right.append(right)
+        return len(self.opcodes) - 1
+
+    def _binop(self, name, _opfunc, left, right):
+        try:
+            opcode = self.grammar.binop_ids[name]
+        except KeyError:
+            raise ValueError(f"Operator {name} isn't in the grammar") from None
+        return self._append(opcode, left, right)
+
+    def _uniop(self, name, _opfunc, right):
+        try:
+            opcode = self.grammar.uniop_ids[name[1:]]
+        except KeyError:
+            raise ValueError(f"Operator {name} isn't in the grammar") from None
+        return self._append(opcode, -1, right)
+
+    def _val(self, val):
+        literal_id = self._literal_ids.get(val)
+        if literal_id is None:
+            literal_id = self._literal_ids[val] = len(self.literals)
+            self.literals.append(val)
+        return self._append(VAL_OPCODE, literal_id, -1)
+
+    def _var(self, name):
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return self._append(VAR_OPCODE, name_id, -1)
+
+    @classmethod
+    def from_node(cls, root, grammar=GRAMMAR):
+        """
+        Flatten a Node tree of grammar's operators, without recursion
+        """
+        tree = cls(grammar)
+        # Entries are (node, index of its left child or None if not yet built)
+        todo = [(root, None)]
+        built = []
+        while todo:
+            node, left = todo.pop()
+            if isinstance(node, ValNode):
+                built.append(tree._val(node.val))
+            elif isinstance(node, VarNode):
+                built.append(tree._var(node.name))
+            elif isinstance(node, UniopNode):
+                if left is None:
+                    todo.append((node, -1))
+                    todo.append((node.right, None))
+                else:
+                    built.append(tree._uniop(node.name, None, built.pop()))
+            elif isinstance(node, BinopNode):
+                if left is None:
+                    todo.append((node, -1))
+                    todo.append((node.right, None))
+                    todo.append((node.left, None))
+                else:
+                    right = built.pop()
+                    built.append(tree._binop(node.name, None, built.pop(), right))
+            else:
+                raise ValueError(f"Can't flatten {node}")
+        return tree
+
+    def fold(self, binop, uniop, val, var):
+        """
+        Combine the tree bottom-up: each node's result is binop(name, left,
+        right), uniop(name, right) of its children's results, val(literal) or
+        var(name). Returns the root's result.
+        """
+        results = []
+        op_names = self.grammar.names
+        literals = self.literals
+        for opcode, left in zip(self.opcodes, self.left):
+            if opcode == VAL_OPCODE:
+                results.append(val(literals[left]))
+            elif opcode == VAR_OPCODE:
+                results.append(var(self.names[left]))
+            elif left < 0:
+                results[-1] = uniop(op_names[opcode], results[-1])
+            else:
+                right = results.pop()
+                results[-1] = binop(op_names[opcode], results[-1], right)
+        assert len(results) == 1, f"Results should have length 1, was {results}"
+        return results[0]
+
+    def evaluate(self, env=None):
+        """
+        The equivalent of running EvalVisitor(env) over the tree
+        """
+        funcs = self.grammar.funcs
+        literals = self.literals
+        if env is None:
+            env = {}
+        results = []
+        for opcode, left in zip(self.opcodes, self.left):
+            if opcode == VAL_OPCODE:
+                results.append(literals[left])
+            elif opcode == VAR_OPCODE:
+                name = self.names[left]
+                if name not in env:
+                    raise ValueError(f"Unbound variable {name}")
+                results.append(env[name])
+            elif left < 0:
+                results[-1] = funcs[opcode](results[-1])
+            else:
+                right = results.pop()
+                results[-1] = funcs[opcode](results[-1], right)
+        return results[0]
+
+    def lispish(self):
+        """
+        The equivalent of running Lispish over the tree
+        """
+        return self.fold(
+            lambda name, left, right: f"({name} {left} {right})",
+            lambda name, right: f"({name} {right})",
+            str,
+            str,
+        )
+
+    def node(self, index=-1):
+        """
+        A Node view of the subtree rooted at index (by default the root).
+        Children are only materialized as they are looked at.
+        """
+        if index < 0:
+            index += len(self.opcodes)
+        opcode = self.opcodes[index]
+        if opcode == VAL_OPCODE:
+            return FlatValView(self, index)
+        if opcode == VAR_OPCODE:
+            return FlatVarView(self, index)
+        if self.left[index] < 0:
+            return FlatUniopView(self, index)
+        return FlatBinopView(self, index)
+
+
+# The views don't call their base __init__; their attributes come from the tree
+# pylint:disable=super-init-not-called
+
+
+class FlatBinopView(BinopNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.grammar.names[self.tree.opcodes[self.index]]
+
+    @property
+    def opfunc(self):
+        return self.tree.grammar.funcs[self.tree.opcodes[self.index]]
+
+    @property
+    def left(self):
+        return self.tree.node(self.tree.left[self.index])
+
+    @property
+    def right(self):
+        return self.tree.node(self.tree.right[self.index])
+
+
+class FlatUniopView(UniopNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.grammar.names[self.tree.opcodes[self.index]]
+
+    @property
+    def opfunc(self):
+        return self.tree.grammar.funcs[self.tree.opcodes[self.index]]
+
+    @property
+    def right(self):
+        return self.tree.node(self.tree.right[self.index])
+
+
+class FlatValView(ValNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def val(self):
+        return self.tree.literals[self.tree.left[self.index]]
+
+
+class FlatVarView(VarNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.names[self.tree.left[self.index]]
+
+
+def parse_flat(strategy, exprstr, lexer_class=Lexer, grammar=GRAMMAR):
+    """
+    Like parsers.drive_parse, but builds a FlatTree
+    """
+    tree = FlatTree(grammar)
+    drive_parse(strategy, exprstr, lexer_class, tree.nodes, grammar=grammar)
+    return tree
@@ -0,0 +1,285 @@
+"""
+Generate generated.py: a Pratt parser and a shunting yard parser
+specialized to op_base.OPERATORS.
+
+The generated parsers never touch OPERATORS or OpInfo while parsing. An
+operator token's text is looked up once, in BINOP_IDS or UNIOP_IDS, to
+get its operator id (its position in OPERATORS, the same ids flat_tree
+uses), and everything else about it comes from tuples indexed by that id.
+Unary operator names are in the tables already, so no "_" + op strings
+are built, and values that are the same for every unary operator are
+written into the code as constants.
+
+Run `python -m pratt_v_syard.gen_parsers` after changing OPERATORS;
+--check only reports whether generated.py is up to date.
+"""
+import argparse
+import json
+import os
+import string
+import sys
+
+from .op_base import MAX_PRECEDENCE, MIN_PRECEDENCE, OPERATORS
+
+GENERATED_PATH = os.path.join(os.path.dirname(__file__), "generated.py")
+
+HEADER = string.Template('''"""
+Pratt and shunting yard parsers specialized to op_base.OPERATORS.
+
+Generated by `python -m pratt_v_syard.gen_parsers`; do not edit.
+"""
+from .op_base import GRAMMAR, NODES, OPERATORS
+
+# Indexed by operator id, which is the operator's position in OPERATORS
+NAMES = $names
+LEFT_BP = $left_bp
+RIGHT_BP = $right_bp
+# False once OPERATORS has changed since this file was generated, in which
+# case parsers.PARSERS leaves these parsers out and they refuse to parse
+FRESH = NAMES == tuple(OPERATORS) and all(
+    (OPERATORS[name].left_precedence, OPERATORS[name].right_precedence)
+    == (LEFT_BP[op], RIGHT_BP[op])
+    for (op, name) in enumerate(NAMES)
+)
+FUNCS = tuple(OPERATORS[name].func for name in NAMES) if FRESH else ()
+BINOP_IDS = $binop_ids
+UNIOP_IDS = $uniop_ids
+# On the shunting yard operator stack, with the lowest binding power
+LPAREN = $lparen
+OP_STACK_BP = RIGHT_BP + ($paren_bp,)
+STALE_MESSAGE = "OPERATORS has changed; rerun python -m pratt_v_syard.gen_parsers"
+
+
+def check_grammar(grammar):
+    if not FRESH:
+        raise ValueError(STALE_MESSAGE)
+    if grammar != GRAMMAR:
+        raise ValueError(f"Generated parsers can't parse {grammar}, only {GRAMMAR}")
+''')
+
+PRATT = string.Template('''
+
+def pratt_parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    """
+    Parse by recursive Pratt parsing, like basic_pratt.parse
+    """
+    check_grammar(grammar)
+    make_binop, make_uniop, make_val, make_var = nodes
+
+    def parse_expr(min_prec):
+        tok = tokstream.poll()
+        if tok is None:
+            raise ValueError("Unexpected EOF")
+        kind = tok.lastgroup
+        if kind == "num":
+            lhs = make_val(int(tok.group()))
+        elif kind == "name":
+            lhs = make_var(tok.group())
+        elif kind == "paren":
+            if tok.group() != "(":
+                raise ValueError(f"Unexpected right paren at {tok.start()}")
+            lhs = parse_expr($paren_bp)
+            if not tokstream:
+                raise ValueError(f"Unclosed left paren beginning at {tok.start()}")
+            tok = tokstream.poll()
+            if tok.group() != ")":
+                raise ValueError(f"Expected operator or right paren at {tok.start()}")
+        else:
+            op = UNIOP_IDS.get(tok.group())
+            if op is None:
+                raise ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+            lhs = make_uniop(NAMES[op], FUNCS[op], parse_expr($uniop_right_bp))
+
+        while tokstream:
+            tok = tokstream.peek()
+            if tok.lastgroup != "op":
+                break
+            op = BINOP_IDS[tok.group()]
+            if LEFT_BP[op] < min_prec:
+                break
+            tokstream.poll()
+            lhs = make_binop(NAMES[op], FUNCS[op], lhs, parse_expr(RIGHT_BP[op]))
+        return lhs
+
+    retval = parse_expr($paren_bp)
+    tok = tokstream.poll()
+    if tok is not None:
+        raise ValueError(f"Expected operator at {tok.start()}")
+    return retval
+''')
+
+SHUNTING_YARD = string.Template('''
+
+def sy_parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    """
+    Parse by the shunting yard algorithm, like shunting_yard.parse, with
+    operator ids on the operator stack instead of closures. Atoms can
+    never be reduced before the operator after them arrives, so they go
+    straight onto the value stack.
+    """
+    check_grammar(grammar)
+    make_binop, make_uniop, make_val, make_var = nodes
+    val_stack = []
+    op_stack = []
+    paren_starts = []
+    expect_atom = True
+    for tok in tokstream:
+        kind = tok.lastgroup
+        if expect_atom:
+            if kind == "num":
+                val_stack.append(make_val(int(tok.group())))
+                expect_atom = False
+                continue
+            if kind == "name":
+                val_stack.append(make_var(tok.group()))
+                expect_atom = False
+                continue
+            if kind == "paren":
+                if tok.group() != "(":
+                    raise ValueError(f"Unexpected right paren at {tok.start()}")
+                op_stack.append(LPAREN)
+                paren_starts.append(tok.start())
+                continue
+            op = UNIOP_IDS.get(tok.group())
+            if op is None:
+                raise ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+            new_prec = $uniop_left_bp
+        elif kind == "op":
+            op = BINOP_IDS[tok.group()]
+            new_prec = LEFT_BP[op]
+            expect_atom = True
+        else:
+            while op_stack:
+                top = op_stack.pop()
+                if top == LPAREN:
+                    paren_starts.pop()
+                    break
+$reduce_error
+            else:
+                raise ValueError(f"Expected operator at {tok.start()}")
+            if tok.group() == ")":
+                continue
+            raise ValueError(f"Expected operator or right paren at {tok.start()}")
+        while op_stack and new_prec < OP_STACK_BP[op_stack[-1]]:
+            top = op_stack.pop()
+$reduce_loop
+        op_stack.append(op)
+    if expect_atom:
+        raise ValueError("Unexpected EOF")
+    while op_stack:
+        top = op_stack.pop()
+        if top == LPAREN:
+            raise ValueError(f"Unclosed left paren beginning at {paren_starts[-1]}")
+$reduce_end
+    assert len(val_stack) == 1, f"Val stack should have length 1, was {val_stack}"
+    return val_stack[0]
+''')
+
+REDUCE = """\
+if top in $unary_ids:
+    val_stack[-1] = make_uniop(NAMES[top], FUNCS[top], val_stack[-1])
+else:
+    right = val_stack.pop()
+    left = val_stack.pop()
+    val_stack.append(make_binop(NAMES[top], FUNCS[top], left, right))"""
+
+
+def literal(pairs, opener, closer):
+    """
+    Source for a tuple (from strings) or dict (from pairs), one item to a
+    line, the way black would lay it out
+    """
+    items = [
+        (
+            f"{json.dumps(item[0])}: {item[1]}"
+            if isinstance(item, tuple)
+            else json.dumps(item)
+        )
+        for item in pairs
+    ]
+    return opener + "\n" + "".join(f"    {item},\n" for item in items) + closer
+
+
+def uniform(values, fallback):
+    """
+    The one value in values as source text, or fallback if they differ
+    """
+    values = set(values)
+    if len(values) == 1:
+        return repr(values.pop())
+    return fallback
+
+
+def generate():
+    """
+    The source of generated.py for the current OPERATORS
+    """
+    names = tuple(OPERATORS)
+    unary = [op for (op, name) in enumerate(names) if name.startswith("_")]
+    binary = [op for (op, name) in enumerate(names) if not name.startswith("_")]
+    unary_ids = "{" + ", ".join(map(str, unary)) + "}"
+    # Every binding power has to be above that of a left paren
+    assert all(
+        MIN_PRECEDENCE <= bp <= MAX_PRECEDENCE
+        for info in OPERATORS.values()
+        for bp in info[1:]
+    )
+    reduce = string.Template(REDUCE).substitute(unary_ids=unary_ids)
+
+    def indented(spaces):
+        return "\n".join(" " * spaces + line for line in reduce.splitlines())
+
+    header = HEADER.substitute(
+        names=literal(names, "(", ")"),
+        left_bp=repr(tuple(info.left_precedence for info in OPERATORS.values())),
+        right_bp=repr(tuple(info.right_precedence for info in OPERATORS.values())),
+        binop_ids=literal([(names[op], op) for op in binary], "{", "}"),
+        uniop_ids=literal([(names[op][1:], op) for op in unary], "{", "}"),
+        lparen=len(names),
+        paren_bp=MIN_PRECEDENCE - 1,
+    )
+    pratt = PRATT.substitute(
+        paren_bp=MIN_PRECEDENCE - 1,
+        uniop_right_bp=uniform(
+            (OPERATORS[names[op]].right_precedence for op in unary), "RIGHT_BP[op]"
+        ),
+    )
+    shunting_yard = SHUNTING_YARD.substitute(
+        uniop_left_bp=uniform(
+            (OPERATORS[names[op]].left_precedence for op in unary), "LEFT_BP[op]"
+        ),
+        reduce_error=indented(16),
+        reduce_loop=indented(12),
+        reduce_end=indented(8),
+    )
+    return header + pratt + shunting_yard
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument(
+        "--check", action="store_true", help="exit 1 if generated.py is out of date"
+    )
+    args = argparser.parse_args()
+
+    source = generate()
+    try:
+        with open(GENERATED_PATH, encoding="utf-8") as current:
+            up_to_date = current.read() == source
+    except FileNotFoundError:
+        up_to_date = False
+    if args.check:
+        print(f"{GENERATED_PATH} is {'up to date' if up_to_date else 'out of date'}")
+        sys.exit(0 if up_to_date else 1)
+    if not up_to_date:
+        with open(GENERATED_PATH, "w", encoding="utf-8") as generated:
+            generated.write(source)
+        print(f"Wrote {GENERATED_PATH}")
+
+
+if __name__ == "__main__":
+    main()
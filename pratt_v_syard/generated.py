@@ -0,0 +1,196 @@
+"""
+Pratt and shunting yard parsers specialized to op_base.OPERATORS.
+
+Generated by `python -m pratt_v_syard.gen_parsers`; do not edit.
+"""
+from .op_base import GRAMMAR, NODES, OPERATORS
+
+# Indexed by operator id, which is the operator's position in OPERATORS
+NAMES = (
+    "|",
+    "^",
+    "&",
+    ">>",
+    "<<",
+    "+",
+    "-",
+    "*",
+    "/",
+    "%",
+    "_+",
+    "_-",
+    "_~",
+    "**",
+)
+LEFT_BP = (1, 3, 5, 7, 7, 9, 9, 11, 11, 11, 14, 14, 14, 14)
+RIGHT_BP = (2, 4, 6, 8, 8, 10, 10, 12, 12, 12, 13, 13, 13, 13)
+# False once OPERATORS has changed since this file was generated, in which
+# case parsers.PARSERS leaves these parsers out and they refuse to parse
+FRESH = NAMES == tuple(OPERATORS) and all(
+    (OPERATORS[name].left_precedence, OPERATORS[name].right_precedence)
+    == (LEFT_BP[op], RIGHT_BP[op])
+    for (op, name) in enumerate(NAMES)
+)
+FUNCS = tuple(OPERATORS[name].func for name in NAMES) if FRESH else ()
+BINOP_IDS = {
+    "|": 0,
+    "^": 1,
+    "&": 2,
+    ">>": 3,
+    "<<": 4,
+    "+": 5,
+    "-": 6,
+    "*": 7,
+    "/": 8,
+    "%": 9,
+    "**": 13,
+}
+UNIOP_IDS = {
+    "+": 10,
+    "-": 11,
+    "~": 12,
+}
+# On the shunting yard operator stack, with the lowest binding power
+LPAREN = 14
+OP_STACK_BP = RIGHT_BP + (0,)
+STALE_MESSAGE = "OPERATORS has changed; rerun python -m pratt_v_syard.gen_parsers"
+
+
+def check_grammar(grammar):
+    if not FRESH:
+        raise ValueError(STALE_MESSAGE)
+    if grammar != GRAMMAR:
+        raise ValueError(f"Generated parsers can't parse {grammar}, only {GRAMMAR}")
+
+
+def pratt_parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    """
+    Parse by recursive Pratt parsing, like basic_pratt.parse
+    """
+    check_grammar(grammar)
+    make_binop, make_uniop, make_val, make_var = nodes
+
+    def parse_expr(min_prec):
+        tok = tokstream.poll()
+        if tok is None:
+            raise ValueError("Unexpected EOF")
+        kind = tok.lastgroup
+        if kind == "num":
+            lhs = make_val(int(tok.group()))
+        elif kind == "name":
+            lhs = make_var(tok.group())
+        elif kind == "paren":
+            if tok.group() != "(":
+                raise ValueError(f"Unexpected right paren at {tok.start()}")
+            lhs = parse_expr(0)
+            if not tokstream:
+                raise ValueError(f"Unclosed left paren beginning at {tok.start()}")
+            tok = tokstream.poll()
+            if tok.group() != ")":
+                raise ValueError(f"Expected operator or right paren at {tok.start()}")
+        else:
+            op = UNIOP_IDS.get(tok.group())
+            if op is None:
+                raise ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+            lhs = make_uniop(NAMES[op], FUNCS[op], parse_expr(13))
+
+        while tokstream:
+            tok = tokstream.peek()
+            if tok.lastgroup != "op":
+                break
+            op = BINOP_IDS[tok.group()]
+            if LEFT_BP[op] < min_prec:
+                break
+            tokstream.poll()
+            lhs = make_binop(NAMES[op], FUNCS[op], lhs, parse_expr(RIGHT_BP[op]))
+        return lhs
+
+    retval = parse_expr(0)
+    tok = tokstream.poll()
+    if tok is not None:
+        raise ValueError(f"Expected operator at {tok.start()}")
+    return retval
+
+
+def sy_parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    """
+    Parse by the shunting yard algorithm, like shunting_yard.parse, with
+    operator ids on the operator stack instead of closures. Atoms can
+    never be reduced before the operator after them arrives, so they go
+    straight onto the value stack.
+    """
+    check_grammar(grammar)
+    make_binop, make_uniop, make_val, make_var = nodes
+    val_stack = []
+    op_stack = []
+    paren_starts = []
+    expect_atom = True
+    for tok in tokstream:
+        kind = tok.lastgroup
+        if expect_atom:
+            if kind == "num":
+                val_stack.append(make_val(int(tok.group())))
+                expect_atom = False
+                continue
+            if kind == "name":
+                val_stack.append(make_var(tok.group()))
+                expect_atom = False
+                continue
+            if kind == "paren":
+                if tok.group() != "(":
+                    raise ValueError(f"Unexpected right paren at {tok.start()}")
+                op_stack.append(LPAREN)
+                paren_starts.append(tok.start())
+                continue
+            op = UNIOP_IDS.get(tok.group())
+            if op is None:
+                raise ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+            new_prec = 14
+        elif kind == "op":
+            op = BINOP_IDS[tok.group()]
+            new_prec = LEFT_BP[op]
+            expect_atom = True
+        else:
+            while op_stack:
+                top = op_stack.pop()
+                if top == LPAREN:
+                    paren_starts.pop()
+                    break
+                if top in {10, 11, 12}:
+                    val_stack[-1] = make_uniop(NAMES[top], FUNCS[top], val_stack[-1])
+                else:
+                    right = val_stack.pop()
+                    left = val_stack.pop()
+                    val_stack.append(make_binop(NAMES[top], FUNCS[top], left, right))
+            else:
+                raise ValueError(f"Expected operator at {tok.start()}")
+            if tok.group() == ")":
+                continue
+            raise ValueError(f"Expected operator or right paren at {tok.start()}")
+        while op_stack and new_prec < OP_STACK_BP[op_stack[-1]]:
+            top = op_stack.pop()
+            if top in {10, 11, 12}:
+                val_stack[-1] = make_uniop(NAMES[top], FUNCS[top], val_stack[-1])
+            else:
+                right = val_stack.pop()
+                left = val_stack.pop()
+                val_stack.append(make_binop(NAMES[top], FUNCS[top], left, right))
+        op_stack.append(op)
+    if expect_atom:
+        raise ValueError("Unexpected EOF")
+    while op_stack:
+        top = op_stack.pop()
+        if top == LPAREN:
+            raise ValueError(f"Unclosed left paren beginning at {paren_starts[-1]}")
+        if top in {10, 11, 12}:
+            val_stack[-1] = make_uniop(NAMES[top], FUNCS[top], val_stack[-1])
+        else:
+            right = val_stack.pop()
+            left = val_stack.pop()
+            val_stack.append(make_binop(NAMES[top], FUNCS[top], left, right))
+    assert len(val_stack) == 1, f"Val stack should have length 1, was {val_stack}"
+    return val_stack[0]
@@ -0,0 +1,366 @@
+"""
+Incremental reparsing and re-evaluation of a document after small edits.
+
+A Document keeps its tokens, its tree and what it learned while parsing.
+After an edit it relexes only from the token before the edit up to the
+first token that lines up with an old one again, and shifts the rest.
+Parsing is memoized Pratt parsing. A parse of the operand starting at a
+token, with a given minimum binding power, depends only on the tokens
+from there to the token that stopped it. Each such parse is remembered on
+its first token, along with checkpoints of its operator loop. A parse
+that the edit doesn't reach is reused whole, and one that runs into the
+edit resumes from its last checkpoint before it. Reused subtrees keep the
+values cached on their nodes, so evaluation only visits the new nodes,
+which are the edited ones and their ancestors. Variable values are
+cached too, so bindings change through Document.bind, which drops the
+values that depend on them.
+
+Trees, values and errors, positions included, are the same as from a
+fresh drive_parse and EvalVisitor pass over the new text. Like
+basic_pratt, the parser recurses on the nesting depth of the expression.
+"""
+import bisect
+
+from .op_base import GRAMMAR, BinopNode, Token, UniopNode, ValNode, VarNode
+
+# The value slot of a node that hasn't been evaluated yet
+UNSET = object()
+# What parsing can raise. Like the other parsers, an operator that is only
+# unary ("~") where a binary one belongs raises KeyError.
+PARSE_ERRORS = (KeyError, RecursionError, ValueError)
+
+
+class DocToken(Token):
+    """
+    A Token that knows its index in the document, and the memoized parses
+    that start at it
+    """
+
+    __slots__ = ("index", "memo")
+
+    def __init__(self, kind, text, pos, endpos):
+        super().__init__(kind, text, pos, endpos)
+        self.index = -1
+        self.memo = None
+
+
+class Spanned:
+    """
+    Mixin for nodes that remember their first and last tokens and cache
+    their value. A node's span covers any parentheses inside it.
+    """
+
+    __slots__ = ()
+
+    @property
+    def span(self):
+        return (self.first.pos, self.last.endpos)
+
+
+class SpanBinopNode(Spanned, BinopNode):
+    __slots__ = ("first", "last", "value")
+
+    def __init__(self, name, opfunc, left, right, first, last):
+        super().__init__(name, opfunc, left, right)
+        self.first = first
+        self.last = last
+        self.value = UNSET
+
+
+class SpanUniopNode(Spanned, UniopNode):
+    __slots__ = ("first", "last", "value")
+
+    def __init__(self, name, opfunc, right, first, last):
+        super().__init__(name, opfunc, right)
+        self.first = first
+        self.last = last
+        self.value = UNSET
+
+
+class SpanValNode(Spanned, ValNode):
+    __slots__ = ("first", "last", "value")
+
+    def __init__(self, val, token):
+        super().__init__(val)
+        self.first = self.last = token
+        self.value = val
+
+
+class SpanVarNode(Spanned, VarNode):
+    __slots__ = ("first", "last", "value")
+
+    def __init__(self, name, token):
+        super().__init__(name)
+        self.first = self.last = token
+        self.value = UNSET
+
+
+class ParseMemo:
+    """
+    What one _parse_operand call learned: its result and the token that
+    stopped it (when complete), and (lhs, next token) at the top of each
+    pass through its operator loop. The next token has been looked at, by
+    the call that parsed the operand before it, so a checkpoint holds
+    until that token is edited.
+    """
+
+    __slots__ = ("node", "end", "checkpoints")
+
+    def __init__(self, node, end, checkpoints):
+        self.node = node
+        self.end = end
+        self.checkpoints = checkpoints
+
+
+class Document:
+    """
+    The source text of an expression and its parse, kept up to date
+    through edit(). tree is None and error holds the exception when the
+    text doesn't parse. Variables are looked up in env, which is read
+    once per variable node and its value cached: change it with bind(),
+    not directly.
+    """
+
+    def __init__(self, text, env=None, grammar=GRAMMAR):
+        self.grammar = grammar
+        self.env = {} if env is None else env
+        self.text = ""
+        self.tokens = [DocToken("eof", "", 0, 0)]
+        self.tokens[0].index = 0
+        self._lexerrs = set()
+        self.tree = None
+        self.error = None
+        try:
+            self.edit(0, 0, text)
+        except PARSE_ERRORS:
+            pass
+
+    def edit(self, offset, deleted, inserted):
+        """
+        Replace deleted characters at offset with inserted, and return the
+        new tree; raise the parse error if the new text doesn't parse
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.text):
+            raise IndexError(f"Edit out of range of a {len(self.text)} char text")
+        self.text = self.text[:offset] + inserted + self.text[offset + deleted :]
+        self._relex(offset, deleted, len(inserted) - deleted)
+        self.tree = None
+        self.error = None
+        try:
+            self.tree = self._parse()
+        except PARSE_ERRORS as err:
+            self.error = err
+            raise
+        return self.tree
+
+    def _relex(self, offset, deleted, delta):
+        tokens = self.tokens
+        eof = len(tokens) - 1
+        # A token ending right at the edit might run on into it ("1" + "2")
+        first = bisect.bisect_left(tokens, offset, 0, eof, key=lambda tok: tok.endpos)
+        restart = tokens[first - 1].endpos if first else 0
+        # Once a new token starts where an old one after the edit did, the
+        # rest of the text lexes as before
+        resync = bisect.bisect_left(
+            tokens, offset + deleted, first, eof, key=lambda tok: tok.pos
+        )
+        new_tokens = []
+        for match in self.grammar.lex_re.finditer(self.text, restart):
+            start = match.start()
+            while resync < eof and tokens[resync].pos + delta < start:
+                resync += 1
+            if resync < eof and tokens[resync].pos + delta == start:
+                break
+            new_tokens.append(DocToken.from_match(match))
+        else:
+            resync = eof
+
+        self._forget(first)
+        lexerrs = self._lexerrs
+        for tok in tokens[first:resync]:
+            lexerrs.discard(tok)
+        index_delta = len(new_tokens) - (resync - first)
+        if delta or index_delta:
+            for tok in tokens[resync:]:
+                tok.pos += delta
+                tok.endpos += delta
+                tok.index += index_delta
+        tokens[first:resync] = new_tokens
+        for index, tok in enumerate(new_tokens, first):
+            tok.index = index
+            if tok.kind == "lexerr":
+                lexerrs.add(tok)
+
+    def _forget(self, first):
+        """
+        Drop what memoized parses learned from tokens[first] onwards
+        """
+        for tok in self.tokens[:first]:
+            memo = tok.memo
+            if not memo:
+                continue
+            for min_prec, entry in list(memo.items()):
+                if entry.end is None or entry.end.index >= first:
+                    entry.node = entry.end = None
+                    checkpoints = entry.checkpoints
+                    while checkpoints and checkpoints[-1][1].index >= first:
+                        checkpoints.pop()
+                    if not checkpoints:
+                        del memo[min_prec]
+
+    def _parse(self):
+        if self._lexerrs:
+            tok = min(self._lexerrs, key=lambda tok: tok.pos)
+            raise ValueError(f"Unrecognized token {tok.text} at {tok.pos}")
+        tree, index = self._parse_operand(0, self.grammar.min_precedence - 1)
+        tok = self.tokens[index]
+        if tok.kind != "eof":
+            raise ValueError(f"Expected operator at {tok.pos}")
+        return tree
+
+    def _parse_operand(self, index, min_prec):
+        """
+        basic_pratt.prattparse_expr over self.tokens, memoized; returns the
+        tree and the index of the token that stopped it
+        """
+        tokens = self.tokens
+        operators = self.grammar.operators
+        start = tokens[index]
+        entry = start.memo.get(min_prec) if start.memo else None
+        if entry is not None and entry.end is not None:
+            return entry.node, entry.end.index
+        if entry is not None:
+            lhs, resume = entry.checkpoints.pop()
+            index = resume.index
+            checkpoints = entry.checkpoints
+        else:
+            lhs, index = self._parse_prefix(index)
+            checkpoints = []
+
+        while True:
+            tok = tokens[index]
+            checkpoints.append((lhs, tok))
+            if tok.kind != "op":
+                break
+            opinfo = operators[tok.text]
+            if opinfo.left_precedence < min_prec:
+                break
+            rhs, index = self._parse_operand(index + 1, opinfo.right_precedence)
+            lhs = SpanBinopNode(
+                tok.text, opinfo.func, lhs, rhs, start, tokens[index - 1]
+            )
+
+        if entry is None:
+            entry = ParseMemo(lhs, tok, checkpoints)
+            if start.memo is None:
+                start.memo = {}
+            start.memo[min_prec] = entry
+        else:
+            entry.node = lhs
+            entry.end = tok
+        return lhs, index
+
+    def _parse_prefix(self, index):
+        tokens = self.tokens
+        tok = tokens[index]
+        if tok.kind == "num":
+            return SpanValNode(int(tok.text), tok), index + 1
+        if tok.kind == "name":
+            return SpanVarNode(tok.text, tok), index + 1
+        if tok.kind == "paren" and tok.text == "(":
+            lhs, index = self._parse_operand(index + 1, self.grammar.min_precedence - 1)
+            close = tokens[index]
+            if close.kind == "eof":
+                raise ValueError(f"Unclosed left paren beginning at {tok.pos}")
+            if close.text != ")":
+                raise ValueError(f"Expected operator or right paren at {close.pos}")
+            return lhs, index + 1
+        if tok.kind == "paren":
+            raise ValueError(f"Unexpected right paren at {tok.pos}")
+        if tok.kind == "op":
+            # better be a uniop
+            opname = "_" + tok.text
+            opinfo = self.grammar.operators.get(opname)
+            if opinfo is None:
+                raise ValueError(f"Unknown unary operator {tok.text} at {tok.pos}")
+            rhs, index = self._parse_operand(index + 1, opinfo.right_precedence)
+            return (
+                SpanUniopNode(opname, opinfo.func, rhs, tok, tokens[index - 1]),
+                index,
+            )
+        raise ValueError("Unexpected EOF")
+
+    def evaluate(self):
+        """
+        The value of the document, computing only what isn't cached on the
+        tree; raises the parse error if it doesn't parse
+        """
+        if self.tree is None:
+            raise self.error
+        env = self.env
+        todo = [self.tree]
+        while todo:
+            node = todo[-1]
+            if node.value is not UNSET:
+                todo.pop()
+            elif isinstance(node, BinopNode):
+                if node.left.value is UNSET:
+                    todo.append(node.left)
+                elif node.right.value is UNSET:
+                    todo.append(node.right)
+                else:
+                    node.value = node.opfunc(node.left.value, node.right.value)
+                    todo.pop()
+            elif isinstance(node, UniopNode):
+                if node.right.value is UNSET:
+                    todo.append(node.right)
+                else:
+                    node.value = node.opfunc(node.right.value)
+                    todo.pop()
+            else:
+                try:
+                    node.value = env[node.name]
+                except KeyError:
+                    raise ValueError(f"Unbound variable {node.name}") from None
+                todo.pop()
+        return self.tree.value
+
+    def bind(self, values):
+        """
+        Update env with the name -> value mapping values, and forget the
+        cached values of the nodes using those names and of their
+        ancestors, in the tree and in memoized parses
+        """
+        names = set(values)
+        self.env.update(values)
+        roots = [self.tree]
+        for tok in self.tokens:
+            for entry in (tok.memo or {}).values():
+                roots.append(entry.node)
+                roots.extend(lhs for lhs, _ in entry.checkpoints)
+        # Memoized parses share subtrees, so this walks a DAG, children first
+        done = set()
+        stale = set()
+        for root in roots:
+            todo = [] if root is None or id(root) in done else [root]
+            while todo:
+                node = todo[-1]
+                if isinstance(node, BinopNode):
+                    children = (node.left, node.right)
+                elif isinstance(node, UniopNode):
+                    children = (node.right,)
+                else:
+                    children = ()
+                pending = [child for child in children if id(child) not in done]
+                if pending:
+                    todo.extend(pending)
+                    continue
+                todo.pop()
+                done.add(id(node))
+                if isinstance(node, VarNode):
+                    changed = node.name in names
+                else:
+                    changed = any(id(child) in stale for child in children)
+                if changed:
+                    stale.add(id(node))
+                    node.value = UNSET
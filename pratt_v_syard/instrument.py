@@ -0,0 +1,224 @@
+"""
+Opt-in instrumentation of the parsers: what a parse did, rather than how
+long it took.
+
+instrumented_parse runs any strategy from parsers.PARSERS and returns a
+ParseStats along with the tree. It counts peek() and poll() calls (a
+for loop over the lexer polls), nodes built and functions created (the
+closures and lambdas the CPS parsers make per token), and records the
+deepest nesting of the parser's own frames and the longest local_stack,
+func_stack, val_stack and op_stack it had.
+
+Nothing in the parsers changes. The lexer is wrapped in a counting proxy,
+nodes are built through a counting NodeFactory, and the rest comes from a
+sys.settrace hook that only follows frames of the strategy's own module,
+so parsing without instrumentation costs exactly what it did. Function
+creation is counted per MAKE_FUNCTION opcode, and stack lengths are
+sampled at the start of every line.
+
+StatsSummary aggregates the stats of many parses; summaries_json exports
+them.
+"""
+import dis
+import functools
+import json
+import sys
+
+from .op_base import GRAMMAR, NODES, Lexer, NodeFactory
+
+COUNTS = ("tokens", "peeks", "polls", "nodes", "closures")
+STACK_NAMES = ("local_stack", "func_stack", "val_stack", "op_stack")
+DEPTHS = ("recursion",) + STACK_NAMES
+
+
+class ParseStats:
+    """
+    What one parse did: counts and maximum depths, keyed by the names in
+    COUNTS and DEPTHS
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self.max_depths = dict.fromkeys(DEPTHS, 0)
+
+    def as_dict(self):
+        return {
+            "parser": self.parser,
+            "counts": dict(self.counts),
+            "max_depths": dict(self.max_depths),
+        }
+
+    def __repr__(self):
+        return f"ParseStats({self.as_dict()})"
+
+
+class StatsSummary:
+    """
+    Totals of the counts, and maxima of the depths, over many parses by
+    one parser; parses that raised are counted in errors
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.parses = 0
+        self.errors = 0
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self.max_depths = dict.fromkeys(DEPTHS, 0)
+
+    def add(self, stats):
+        self.parses += 1
+        for name, count in stats.counts.items():
+            self.counts[name] += count
+        for name, depth in stats.max_depths.items():
+            self.max_depths[name] = max(self.max_depths[name], depth)
+
+    def per_token(self, name):
+        return self.counts[name] / self.counts["tokens"] if self.counts["tokens"] else 0
+
+    def as_dict(self):
+        return {
+            "parser": self.parser,
+            "parses": self.parses,
+            "errors": self.errors,
+            "counts": dict(self.counts),
+            "max_depths": dict(self.max_depths),
+        }
+
+
+class CountingTokens:
+    """
+    A proxy for a lexer that counts the parser's peek() and poll() calls
+    """
+
+    def __init__(self, tokens, counts):
+        self._tokens = tokens
+        self._counts = counts
+
+    def peek(self):
+        self._counts["peeks"] += 1
+        return self._tokens.peek()
+
+    def poll(self):
+        self._counts["polls"] += 1
+        return self._tokens.poll()
+
+    def __bool__(self):
+        return bool(self._tokens)
+
+    def __iter__(self):
+        return iter(self.poll, None)
+
+
+def counting_nodes(nodes, counts):
+    """
+    A NodeFactory that builds nodes with nodes, counting them
+    """
+
+    def counted(make):
+        def make_counted(*args):
+            counts["nodes"] += 1
+            return make(*args)
+
+        return make_counted
+
+    return NodeFactory(*map(counted, nodes))
+
+
+@functools.lru_cache(maxsize=None)
+def _code_info(code):
+    """
+    The offsets of code's MAKE_FUNCTION instructions, and which of
+    STACK_NAMES it can see
+    """
+    offsets = frozenset(
+        instr.offset
+        for instr in dis.get_instructions(code)
+        if instr.opname == "MAKE_FUNCTION"
+    )
+    visible = set(code.co_varnames + code.co_cellvars + code.co_freevars)
+    return offsets, tuple(name for name in STACK_NAMES if name in visible)
+
+
+class _Tracer:
+    def __init__(self, filename, stats):
+        self.filename = filename
+        self.counts = stats.counts
+        self.max_depths = stats.max_depths
+        self.depth = 0
+
+    def trace_calls(self, frame, event, _arg):
+        if event != "call" or frame.f_code.co_filename != self.filename:
+            return None
+        self.depth += 1
+        if self.depth > self.max_depths["recursion"]:
+            self.max_depths["recursion"] = self.depth
+        frame.f_trace_opcodes = True
+        return self.trace_frame
+
+    def trace_frame(self, frame, event, _arg):
+        if event == "opcode":
+            if frame.f_lasti in _code_info(frame.f_code)[0]:
+                self.counts["closures"] += 1
+        elif event == "line":
+            stack_names = _code_info(frame.f_code)[1]
+            if stack_names:
+                frame_locals = frame.f_locals
+                max_depths = self.max_depths
+                for name in stack_names:
+                    stack = frame_locals.get(name)
+                    if stack is not None and len(stack) > max_depths[name]:
+                        max_depths[name] = len(stack)
+        elif event == "return":
+            self.depth -= 1
+        return self.trace_frame
+
+
+def instrumented_parse(
+    strategy, exprstr, pname=None, lexer_class=Lexer, nodes=NODES, grammar=GRAMMAR
+):
+    """
+    Like parsers.drive_parse, but return (tree, ParseStats). pname is the
+    parser name to put in the stats, by default the strategy's module.
+    """
+    if pname is None:
+        pname = strategy.__module__
+    stats = ParseStats(pname)
+    counts = stats.counts
+    tokens = lexer_class(exprstr, grammar=grammar)
+    tokens.clear_for_error()
+    if isinstance(exprstr, str):
+        counts["tokens"] = sum(1 for _ in grammar.lex_re.finditer(exprstr))
+    tracer = _Tracer(strategy.__code__.co_filename, stats)
+    old_trace = sys.gettrace()
+    sys.settrace(tracer.trace_calls)
+    try:
+        tree = strategy(
+            CountingTokens(tokens, counts), counting_nodes(nodes, counts), grammar
+        )
+    finally:
+        sys.settrace(old_trace)
+    return tree, stats
+
+
+def summarize(parsers, exprstrs, errors=(KeyError, RecursionError, ValueError)):
+    """
+    A StatsSummary per (name, strategy) in parsers, over all of exprstrs
+    """
+    summaries = []
+    for pname, strategy in parsers:
+        summary = StatsSummary(pname)
+        for exprstr in exprstrs:
+            try:
+                summary.add(instrumented_parse(strategy, exprstr, pname)[1])
+            except errors:
+                summary.errors += 1
+        summaries.append(summary)
+    return summaries
+
+
+def summaries_json(summaries, **kwargs):
+    """
+    The summaries as a JSON array; kwargs are passed to json.dumps
+    """
+    return json.dumps([summary.as_dict() for summary in summaries], **kwargs)
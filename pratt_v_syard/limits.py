@@ -0,0 +1,199 @@
+"""
+Resource limits for untrusted input: evaluation that refuses to build
+huge ints and gives up at a deadline, and pre-flight checks of a source
+string before it is parsed.
+
+BoundedEvalVisitor estimates the bit length of the result of each **, <<
+and * from its operands before computing it, and raises SizeLimitExceeded
+if that is over the limit, so 9**9**9**9 fails at once instead of pinning
+a CPU. Every other operator gives a result not much bigger than its
+operands. It also checks the clock every CHECK_EVERY nodes and raises
+DeadlineExceeded once the deadline has passed, or once cancel() has been
+called from another thread. Only the operator functions of OPERATORS are
+estimated; a grammar with other functions gets deadlines only.
+
+check_source counts tokens and nesting depth without parsing, and raises
+ParseLimitExceeded as soon as either is over its limit. Nesting is what
+the recursive parsers recurse on: parentheses, runs of unary operators
+and chains of right associative operators like **.
+"""
+from collections import namedtuple
+import math
+import operator
+import time
+
+from .op_base import GRAMMAR, EvalVisitor
+
+# max_bits bounds the ints evaluation builds, timeout (in seconds, or None
+# for no deadline) bounds its time, and max_tokens and max_depth bound what
+# check_source lets through to a parser
+Limits = namedtuple(
+    "Limits",
+    ["max_bits", "timeout", "max_tokens", "max_depth"],
+    defaults=(1 << 20, None, 100_000, 200),
+)
+DEFAULT_LIMITS = Limits()
+CHECK_EVERY = 256
+
+
+class LimitExceeded(Exception):
+    """
+    Evaluating or parsing an expression would take more than its limits
+    allow
+    """
+
+
+class SizeLimitExceeded(LimitExceeded):
+    pass
+
+
+class DeadlineExceeded(LimitExceeded):
+    pass
+
+
+class ParseLimitExceeded(LimitExceeded):
+    pass
+
+
+def _mul_bits(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        return left.bit_length() + right.bit_length()
+    return None
+
+
+def _lshift_bits(left, right):
+    if isinstance(left, int) and isinstance(right, int) and left and right > 0:
+        return left.bit_length() + right
+    return None
+
+
+def _pow_bits(left, right):
+    if not isinstance(left, int) or not isinstance(right, int) or right <= 0:
+        return None
+    if -1 <= left <= 1:
+        return 1
+    if right.bit_length() > 53:
+        # Too big for a float, and the result has more bits than this
+        return right
+    return int(right * math.log2(abs(left))) + 1
+
+
+# How to estimate the bit length of each operator function's result from
+# its operands, or None when it can't be big without big operands. Modules
+# that evaluate with functions of their own add them, as optimize does.
+BIT_ESTIMATES = {
+    operator.mul: _mul_bits,
+    operator.lshift: _lshift_bits,
+    operator.pow: _pow_bits,
+}
+
+
+def estimate_bits(opfunc, left, right):
+    """
+    About the bit length of opfunc(left, right), or None if it is not a
+    **, << or * of ints (or another function in BIT_ESTIMATES)
+    """
+    estimate = BIT_ESTIMATES.get(opfunc)
+    if estimate is None:
+        return None
+    return estimate(left, right)
+
+
+class BoundedEvalVisitor(EvalVisitor):
+    """
+    An EvalVisitor that raises a LimitExceeded rather than go past limits;
+    use walk() with it for trees too deep to recurse over
+    """
+
+    def __init__(self, env=None, limits=DEFAULT_LIMITS):
+        super().__init__(env)
+        self.max_bits = limits.max_bits
+        if limits.timeout is None:
+            self.deadline = None
+        else:
+            self.deadline = time.monotonic() + limits.timeout
+        self._countdown = CHECK_EVERY
+
+    def cancel(self):
+        """
+        Make evaluation stop soon, raising DeadlineExceeded; safe to call
+        from another thread
+        """
+        self.deadline = float("-inf")
+
+    def check_deadline(self):
+        self._countdown = CHECK_EVERY
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DeadlineExceeded("Evaluation ran past its deadline")
+
+    def visit_binop(self, binop_node):
+        return self.fold_binop(
+            binop_node, binop_node.left.accept(self), binop_node.right.accept(self)
+        )
+
+    def visit_uniop(self, uniop_node):
+        return self.fold_uniop(uniop_node, uniop_node.right.accept(self))
+
+    def fold_binop(self, binop_node, left, right):
+        self._countdown -= 1
+        if not self._countdown:
+            self.check_deadline()
+        bits = estimate_bits(binop_node.opfunc, left, right)
+        if bits is not None and bits > self.max_bits:
+            raise SizeLimitExceeded(
+                f"Result of {binop_node.name} would have about {bits} bits,"
+                f" more than the limit of {self.max_bits}"
+            )
+        return binop_node.opfunc(left, right)
+
+    def fold_uniop(self, uniop_node, right):
+        self._countdown -= 1
+        if not self._countdown:
+            self.check_deadline()
+        return uniop_node.opfunc(right)
+
+
+def check_source(exprstr, limits=DEFAULT_LIMITS, grammar=GRAMMAR):
+    """
+    Raise ParseLimitExceeded if exprstr has more than limits.max_tokens
+    tokens or nests deeper than limits.max_depth; only as much of it is
+    lexed as it takes to tell
+    """
+    max_tokens = limits.max_tokens
+    max_depth = limits.max_depth
+    operators = grammar.operators
+    # The depth at the start of each open parenthesized group
+    group_depths = [0]
+    depth = 0
+    expect_operand = True
+    for count, match in enumerate(grammar.lex_re.finditer(exprstr), 1):
+        if count > max_tokens:
+            raise ParseLimitExceeded(f"More than {max_tokens} tokens")
+        kind = match.lastgroup
+        if kind == "paren":
+            if match.group() == "(":
+                depth += 1
+                group_depths.append(depth)
+                expect_operand = True
+            elif len(group_depths) > 1:
+                depth = group_depths.pop() - 1
+                expect_operand = False
+        elif kind == "op":
+            if expect_operand:
+                depth += 1
+            else:
+                opinfo = operators.get(match.group())
+                if (
+                    opinfo is not None
+                    and opinfo.right_precedence < opinfo.left_precedence
+                ):
+                    depth += 1
+                else:
+                    depth = group_depths[-1]
+                expect_operand = True
+        else:
+            expect_operand = False
+        if depth > max_depth:
+            raise ParseLimitExceeded(
+                f"Nested more than {max_depth} deep at {match.start()}"
+            )
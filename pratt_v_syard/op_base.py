@@ -1,16 +1,20 @@
 import re
 from abc import ABC, abstractmethod
 import operator
-from collections import namedtuple
+from collections import deque, namedtuple
 
 
 class Node(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def accept(self, visitor):
         pass
 
 
 class BinopNode(Node):
+    __slots__ = ("name", "opfunc", "left", "right")
+
     def __init__(self, name, opfunc, left, right):
         self.name = name
         self.opfunc = opfunc
@@ -22,6 +26,8 @@ class BinopNode(Node):
 
 
 class UniopNode(Node):
+    __slots__ = ("name", "opfunc", "right")
+
     def __init__(self, name, opfunc, right):
         self.name = name
         self.opfunc = opfunc
@@ -32,6 +38,8 @@ class UniopNode(Node):
 
 
 class ValNode(Node):
+    __slots__ = ("val",)
+
     def __init__(self, val):
         self.val = val
 
@@ -39,6 +47,73 @@ class ValNode(Node):
         return visitor.visit_val(self)
 
 
+class VarNode(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def accept(self, visitor):
+        return visitor.visit_var(self)
+
+
+class Frozen:
+    """
+    Mixin for nodes that can't be changed once built, so one tree can be
+    shared between callers
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class FrozenBinopNode(Frozen, BinopNode):
+    __slots__ = ()
+
+    def __init__(self, name, opfunc, left, right):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "opfunc", opfunc)
+        object.__setattr__(self, "left", left)
+        object.__setattr__(self, "right", right)
+
+
+class FrozenUniopNode(Frozen, UniopNode):
+    __slots__ = ()
+
+    def __init__(self, name, opfunc, right):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "opfunc", opfunc)
+        object.__setattr__(self, "right", right)
+
+
+class FrozenValNode(Frozen, ValNode):
+    __slots__ = ()
+
+    def __init__(self, val):
+        object.__setattr__(self, "val", val)
+
+
+class FrozenVarNode(Frozen, VarNode):
+    __slots__ = ()
+
+    def __init__(self, name):
+        object.__setattr__(self, "name", name)
+
+
+# What a parser calls to build each kind of node. The default is just the
+# node classes; other factories can build something other than Node trees.
+NodeFactory = namedtuple("NodeFactory", ["binop", "uniop", "val", "var"])
+NODES = NodeFactory(BinopNode, UniopNode, ValNode, VarNode)
+FROZEN_NODES = NodeFactory(
+    FrozenBinopNode, FrozenUniopNode, FrozenValNode, FrozenVarNode
+)
+
+
 class NodeVisitor:
     def visit_binop(self, binop_node):
         self.visit_other(binop_node)
@@ -49,6 +124,9 @@ class NodeVisitor:
     def visit_val(self, val_node):
         self.visit_other(val_node)
 
+    def visit_var(self, var_node):
+        self.visit_other(var_node)
+
     def visit_other(self, _node):
         raise NotImplementedError("default visit_other")
 
@@ -58,28 +136,67 @@ class Lispish(NodeVisitor):
     A visitor that prints out a tree as an S expression.
     """
 
+    # visit_binop and visit_uniop write a whole subtree without recursing,
+    # so walker.walk can hand trees straight to accept()
+    flat_visits = True
+
     def visit_binop(self, binop_node):
-        return (
-            f"({binop_node.name}"
-            f" {binop_node.left.accept(self)}"
-            f" {binop_node.right.accept(self)})"
-        )
+        return self._write(binop_node)
 
     def visit_uniop(self, uniop_node):
-        return f"({uniop_node.name} {uniop_node.right.accept(self)})"
+        return self._write(uniop_node)
+
+    def _write(self, root):
+        """
+        The S expression for root, written in one pass with an explicit
+        stack and joined once, rather than copying every child's text into
+        its parent's at each level. Children whose visit method a subclass
+        overrides still go through accept().
+        """
+        inline_binop = type(self).visit_binop is Lispish.visit_binop
+        inline_uniop = type(self).visit_uniop is Lispish.visit_uniop
+        pieces = []
+        todo = [root]
+        while todo:
+            item = todo.pop()
+            if isinstance(item, str):
+                pieces.append(item)
+            elif isinstance(item, BinopNode) and (inline_binop or item is root):
+                pieces.append(f"({item.name} ")
+                todo.extend((")", item.right, " ", item.left))
+            elif isinstance(item, UniopNode) and (inline_uniop or item is root):
+                pieces.append(f"({item.name} ")
+                todo.extend((")", item.right))
+            else:
+                pieces.append(item.accept(self))
+        return "".join(pieces)
+
+    # The same as visit_binop and visit_uniop, given the children's results;
+    # walker.walk uses these to run the visitor without recursion
+    def fold_binop(self, binop_node, left, right):
+        return f"({binop_node.name} {left} {right})"
+
+    def fold_uniop(self, uniop_node, right):
+        return f"({uniop_node.name} {right})"
 
     def visit_val(self, val_node):
         return str(val_node.val)
 
+    def visit_var(self, var_node):
+        return var_node.name
+
     def visit_other(self, node):
         return repr(node)
 
 
 class EvalVisitor(NodeVisitor):
     """
-    A visitor that numerically evaluates a tree
+    A visitor that numerically evaluates a tree, looking variables up in env
     """
 
+    def __init__(self, env=None):
+        self.env = {} if env is None else env
+
     def visit_binop(self, binop_node):
         return binop_node.opfunc(
             binop_node.left.accept(self), binop_node.right.accept(self)
@@ -88,9 +205,21 @@ class EvalVisitor(NodeVisitor):
     def visit_uniop(self, uniop_node):
         return uniop_node.opfunc(uniop_node.right.accept(self))
 
+    def fold_binop(self, binop_node, left, right):
+        return binop_node.opfunc(left, right)
+
+    def fold_uniop(self, uniop_node, right):
+        return uniop_node.opfunc(right)
+
     def visit_val(self, val_node):
         return val_node.val
 
+    def visit_var(self, var_node):
+        try:
+            return self.env[var_node.name]
+        except KeyError:
+            raise ValueError(f"Unbound variable {var_node.name}") from None
+
     def visit_other(self, node):
         raise ValueError(f"Can't evaluate {node}")
 
@@ -115,11 +244,85 @@ OPERATORS = {
 
 MIN_PRECEDENCE = 1
 MAX_PRECEDENCE = 14
-LEX_RE = re.compile(
-    r"(?:(?P<op>\*\*|~|"
-    + "|".join(re.escape(x) for x in OPERATORS if not x.startswith("_"))
-    + r")|(?P<num>\d+\b)|(?P<paren>[()])|(?P<lexerr>\w+|\S))"
-)
+
+
+class Grammar:
+    """
+    An operator language: a table like OPERATORS (unary operators are the
+    names starting with "_") and everything the lexers and parsers derive
+    from it, computed once when the grammar is made.
+
+    Operator ids are positions in the table, and names, funcs, left_bp and
+    right_bp are indexed by them; binop_ids and uniop_ids map operator text
+    to ids. Grammars compare equal when their tables do, and pickle with
+    their tables already built, so only the lexer regex is compiled again
+    when a worker loads one.
+    """
+
+    def __init__(self, operators):
+        if not operators:
+            raise ValueError("A grammar needs at least one operator")
+        self.operators = dict(operators)
+        self.names = tuple(self.operators)
+        self.funcs = tuple(info.func for info in self.operators.values())
+        self.left_bp = tuple(info.left_precedence for info in self.operators.values())
+        self.right_bp = tuple(info.right_precedence for info in self.operators.values())
+        self.min_precedence = min(self.left_bp + self.right_bp)
+        self.max_precedence = max(self.left_bp + self.right_bp)
+        self.binop_ids = {}
+        self.uniop_ids = {}
+        for op, name in enumerate(self.names):
+            if name.startswith("_"):
+                self.uniop_ids[name[1:]] = op
+            else:
+                self.binop_ids[name] = op
+        pattern = lex_pattern({**self.binop_ids, **self.uniop_ids})
+        self.lex_re = re.compile(pattern)
+        self.bytes_lex_re = re.compile(pattern.encode())
+
+    def subset(self, names):
+        """
+        The grammar with only the named operators
+        """
+        return Grammar({name: self.operators[name] for name in names})
+
+    def _key(self):
+        return (self.names, self.funcs, self.left_bp, self.right_bp)
+
+    def __eq__(self, other):
+        if not isinstance(other, Grammar):
+            return NotImplemented
+        return self is other or self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Grammar({self.names})"
+
+
+def lex_pattern(op_texts):
+    """
+    The source of a lexer regex for the given operator texts. Longer
+    operators are tried first, and an operator that ends in a word
+    character can't run on into a name ("mod" but not "modulo").
+    """
+    alternatives = []
+    for text in sorted(op_texts, key=len, reverse=True):
+        alternative = re.escape(text)
+        if re.match(r"\w", text[-1]):
+            alternative += r"\b"
+        alternatives.append(alternative)
+    return (
+        r"(?:(?P<op>"
+        + "|".join(alternatives)
+        + r")|(?P<num>\d+\b)|(?P<name>[^\W\d]\w*)|(?P<paren>[()])|(?P<lexerr>\w+|\S))"
+    )
+
+
+GRAMMAR = Grammar(OPERATORS)
+LEX_RE = GRAMMAR.lex_re
+LEX_RE_BYTES = GRAMMAR.bytes_lex_re
 
 
 class Lexer:
@@ -127,8 +330,8 @@ class Lexer:
     Simple single-regex lexer
     """
 
-    def __init__(self, instr):
-        self._tokens = list(LEX_RE.finditer(instr))
+    def __init__(self, instr, grammar=GRAMMAR):
+        self._tokens = deque(grammar.lex_re.finditer(instr))
 
     def clear_for_error(self):
         for tok in self._tokens:
@@ -144,7 +347,7 @@ class Lexer:
 
     def poll(self):
         if self._tokens:
-            return self._tokens.pop(0)
+            return self._tokens.popleft()
         return None
 
     def __bool__(self):
@@ -161,3 +364,164 @@ class Lexer:
                 raise StopIteration
 
         return Iterator()
+
+
+class Token:
+    """
+    A token with its kind and text pulled out of a regex match, for lexers
+    like BytesLexer whose matches the parsers can't use as they are. It
+    answers group() and start() the way a LEX_RE match does, so every
+    parser can consume it unchanged.
+    """
+
+    __slots__ = ("kind", "text", "pos", "endpos")
+
+    def __init__(self, kind, text, pos, endpos):
+        self.kind = kind
+        self.text = text
+        self.pos = pos
+        self.endpos = endpos
+
+    @classmethod
+    def from_match(cls, match):
+        return cls(match.lastgroup, match.group(), *match.span())
+
+    @property
+    def lastgroup(self):
+        return self.kind
+
+    def group(self, name=0):
+        if name == self.kind or name == 0:
+            return self.text
+        return None
+
+    # Every named group in LEX_RE spans the whole token
+    def start(self, _name=0):
+        return self.pos
+
+    def end(self, _name=0):
+        return self.endpos
+
+    def __repr__(self):
+        return f"Token({self.kind!r}, {self.text!r}, {self.pos}, {self.endpos})"
+
+
+class BytesLexer(Lexer):
+    """
+    Lexer over a bytes-like buffer (bytes, mmap, memoryview), or the part
+    of it from start to end, producing Tokens whose positions are byte
+    offsets from start. A number's text stays bytes for int() to decode;
+    everything else is decoded to str. Names are ASCII only here: other
+    bytes are unrecognized tokens.
+    """
+
+    def __init__(
+        self, buffer, start=0, end=None, grammar=GRAMMAR
+    ):  # pylint:disable=super-init-not-called
+        if end is None:
+            end = len(buffer)
+        tokens = deque()
+        for match in grammar.bytes_lex_re.finditer(buffer, start, end):
+            kind = match.lastgroup
+            text = match.group()
+            if kind != "num":
+                text = text.decode("utf-8", "backslashreplace")
+            pos, endpos = match.span()
+            tokens.append(Token(kind, text, pos - start, endpos - start))
+        self._tokens = tokens
+
+
+class _ShiftedMatch:
+    """
+    A regex match re-based onto the offsets of the whole input, for tokens
+    that were matched against a later chunk of a streamed source.
+    """
+
+    __slots__ = ("_match", "_base", "lastgroup")
+
+    def __init__(self, match, base):
+        self._match = match
+        self._base = base
+        self.lastgroup = match.lastgroup
+
+    def group(self, name=0):
+        return self._match.group(name)
+
+    def start(self, name=0):
+        return self._match.start(name) + self._base
+
+    def end(self, name=0):
+        return self._match.end(name) + self._base
+
+
+class StreamLexer:
+    """
+    Lexer that only tokenizes as far as the parser has asked for.
+
+    The source may be a string, a text file or an iterable of string
+    chunks. Unrecognized tokens are reported when the parser reaches them
+    rather than up front, so clear_for_error() does nothing here.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE, grammar=GRAMMAR):
+        self._lex_re = grammar.lex_re
+        if isinstance(source, str):
+            self._chunks = iter(())
+            self._buf = source
+            self._eof = True
+        else:
+            if hasattr(source, "read"):
+                self._chunks = iter(lambda: source.read(chunk_size), "")
+            else:
+                self._chunks = iter(source)
+            self._buf = ""
+            self._eof = False
+        self._pos = 0
+        self._base = 0
+        self._next = self._scan()
+
+    def _scan(self):
+        while True:
+            match = self._lex_re.search(self._buf, self._pos)
+            # A match running up to the end of the buffer might continue
+            # into the next chunk ("1" "2", "*" "*"), so only trust it at EOF
+            if match is not None and (self._eof or match.end() < len(self._buf)):
+                self._pos = match.end()
+                if self._base:
+                    return _ShiftedMatch(match, self._base)
+                return match
+            if self._eof:
+                return None
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                continue
+            keep = len(self._buf) if match is None else match.start()
+            self._base += keep
+            self._buf = self._buf[keep:] + chunk
+            self._pos = 0
+
+    def clear_for_error(self):
+        pass
+
+    def peek(self):
+        tok = self._next
+        if tok is not None and tok.lastgroup == "lexerr":
+            raise ValueError(
+                f"Unrecognized token {tok.group('lexerr')} at {tok.start()}"
+            )
+        return tok
+
+    def poll(self):
+        tok = self.peek()
+        if tok is not None:
+            self._next = self._scan()
+        return tok
+
+    def __bool__(self):
+        return self._next is not None
+
+    def __iter__(self):
+        return iter(self.poll, None)
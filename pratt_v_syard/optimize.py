@@ -0,0 +1,192 @@
+"""
+An optimizer pass over parsed trees: algebraic rewrites that give the same
+results as the original tree, bit for bit, under EvalVisitor.
+
+- (a ** b) % m is evaluated as pow(a, b, m) whenever, at run time, a, b
+  and m are ints with b >= 0 and m nonzero, so a ** b is never built.
+  The tree keeps its shape and names; only the two nodes' functions
+  change.
+- Multiplying an int by a power of two becomes a left shift, and an int
+  modulo a power of two becomes a mask. True division is left alone: it
+  always gives a float, which no shift does.
+- --x and ~~x collapse to x, and +x, x + 0, x - 0, x * 1, x | 0, x ^ 0,
+  x << 0, x >> 0 and x ** 1 (and the commuted forms) become x.
+
+Rewrites other than the first only fire where x is known to be an int:
+built from int literals by operators that keep ints as ints. Variables
+could be bound to anything (bools, floats, arrays), so they never are.
+"""
+import operator
+
+from .compiled import postorder
+from .limits import BIT_ESTIMATES, estimate_bits
+from .op_base import NODES, BinopNode, UniopNode, ValNode, VarNode
+
+# Operators that give an int when both operands are ints
+INT_CLOSED = {
+    operator.add,
+    operator.sub,
+    operator.mul,
+    operator.mod,
+    operator.and_,
+    operator.or_,
+    operator.xor,
+    operator.lshift,
+    operator.rshift,
+}
+# Operand values that make a binary operator an identity, by side
+RIGHT_IDENTITIES = {
+    operator.add: 0,
+    operator.sub: 0,
+    operator.mul: 1,
+    operator.or_: 0,
+    operator.xor: 0,
+    operator.lshift: 0,
+    operator.rshift: 0,
+    operator.pow: 1,
+}
+LEFT_IDENTITIES = {
+    operator.add: 0,
+    operator.mul: 1,
+    operator.or_: 0,
+    operator.xor: 0,
+}
+SELF_INVERSE = {operator.neg, operator.inv}
+
+
+class DeferredPow:
+    """
+    The value of a ** b, not yet computed, on its way to a % node
+    """
+
+    __slots__ = ("base", "exp")
+
+    def __init__(self, base, exp):
+        self.base = base
+        self.exp = exp
+
+
+def deferred_pow(base, exp):
+    if type(base) is int and type(exp) is int and exp >= 0:
+        return DeferredPow(base, exp)
+    return base**exp
+
+
+def mod_deferred_pow(value, mod):
+    if type(value) is DeferredPow:
+        if type(mod) is int and mod != 0:
+            return pow(value.base, value.exp, mod)
+        value = value.base**value.exp
+    return value % mod
+
+
+def _mod_deferred_pow_bits(value, mod):
+    if type(value) is not DeferredPow:
+        return None
+    if type(mod) is int and mod != 0:
+        return mod.bit_length()
+    return estimate_bits(operator.pow, value.base, value.exp)
+
+
+# deferred_pow itself needs no estimate: it only computes a ** b when that
+# is a float or a fraction, and limits.BoundedEvalVisitor bounds ints only
+BIT_ESTIMATES[mod_deferred_pow] = _mod_deferred_pow_bits
+
+
+class _Info:
+    """
+    What the optimizer knows about an optimized subtree: whether its value
+    is an int, and the exponent if it is a constant power of two
+    """
+
+    __slots__ = ("node", "is_int", "const", "log2")
+
+    def __init__(self, node, is_int, const=None, log2=None):
+        self.node = node
+        self.is_int = is_int
+        self.const = const
+        self.log2 = log2
+
+
+def optimize(root, nodes=NODES):
+    """
+    A rewritten copy of the tree, built with the op_base.NodeFactory nodes;
+    root itself is left alone
+    """
+    make_binop, make_uniop, make_val, make_var = nodes
+    infos = []
+    for node in postorder(root):
+        if isinstance(node, ValNode):
+            val = node.val
+            is_int = type(val) is int
+            log2 = None
+            if is_int and val > 0 and val & (val - 1) == 0:
+                log2 = val.bit_length() - 1
+            infos.append(_Info(make_val(val), is_int, val if is_int else None, log2))
+        elif isinstance(node, VarNode):
+            infos.append(_Info(make_var(node.name), False))
+        elif isinstance(node, UniopNode):
+            infos.append(_optimize_uniop(node, infos.pop(), make_uniop))
+        else:
+            right = infos.pop()
+            left = infos.pop()
+            infos.append(_optimize_binop(node, left, right, nodes))
+    return infos.pop().node
+
+
+def _optimize_uniop(node, right, make_uniop):
+    func = node.opfunc
+    is_int = right.is_int and func in (operator.neg, operator.pos, operator.inv)
+    if right.is_int:
+        if func is operator.pos:
+            return right
+        inner = right.node
+        if func in SELF_INVERSE and isinstance(inner, UniopNode):
+            if inner.opfunc is func:
+                # inner's operand is an int too, or inner wouldn't be
+                return _Info(inner.right, True)
+    return _Info(make_uniop(node.name, func, right.node), is_int)
+
+
+def _optimize_binop(node, left, right, nodes):
+    make_binop, _, make_val, _ = nodes
+    func = node.opfunc
+    both_int = left.is_int and right.is_int
+    if func is operator.mod and _is_pow(left.node):
+        pow_node = left.node
+        left = _Info(
+            make_binop(pow_node.name, deferred_pow, pow_node.left, pow_node.right),
+            False,
+        )
+        return _Info(
+            make_binop(node.name, mod_deferred_pow, left.node, right.node), False
+        )
+    if right.const is not None and RIGHT_IDENTITIES.get(func) == right.const:
+        if left.is_int:
+            return left
+    if left.const is not None and LEFT_IDENTITIES.get(func) == left.const:
+        if right.is_int:
+            return right
+    if func is operator.mul:
+        # The constant can't raise, so swapping the operands is safe
+        if left.log2 is not None and right.is_int:
+            left, right = right, left
+        if right.log2 is not None and left.is_int:
+            return _Info(
+                make_binop("<<", operator.lshift, left.node, make_val(right.log2)),
+                True,
+            )
+    if func is operator.mod and right.log2 is not None and left.is_int:
+        mask = (1 << right.log2) - 1
+        return _Info(make_binop("&", operator.and_, left.node, make_val(mask)), True)
+    is_int = both_int and (
+        func in INT_CLOSED or (func is operator.pow and right.const is not None)
+    )
+    log2 = None
+    if func is operator.pow and left.const == 2 and right.const is not None:
+        log2 = right.const
+    return _Info(make_binop(node.name, func, left.node, right.node), is_int, None, log2)
+
+
+def _is_pow(node):
+    return isinstance(node, BinopNode) and node.opfunc is operator.pow
@@ -0,0 +1,82 @@
+"""
+A bounded, in-process LRU cache of parse trees for drive_parse.
+
+Cached trees are built from the op_base Frozen node classes, so handing
+the same tree to several callers is safe. Failed parses are never cached:
+a bad expression is parsed again each time and raises the same ValueError
+that drive_parse would.
+"""
+from collections import OrderedDict, namedtuple
+
+from .op_base import FROZEN_NODES, GRAMMAR
+from .parsers import drive_parse
+
+CacheStats = namedtuple(
+    "CacheStats", ["hits", "misses", "evictions", "entries", "source_chars"]
+)
+
+
+class ParseCache:
+    """
+    LRU cache keyed by (parser, lexer class, grammar, source text).
+
+    It holds at most max_entries trees, and at most max_source_chars
+    characters of source between them, which stands in for their memory
+    use since tree size grows with source length. Either bound may be None.
+    Sources that aren't strings (files, chunk iterables) aren't cached.
+    """
+
+    def __init__(self, max_entries=1024, max_source_chars=None):
+        self.max_entries = max_entries
+        self.max_source_chars = max_source_chars
+        self._trees = OrderedDict()
+        self._source_chars = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._trees)
+
+    def stats(self):
+        return CacheStats(
+            self.hits, self.misses, self.evictions, len(self._trees), self._source_chars
+        )
+
+    def clear(self):
+        self._trees.clear()
+        self._source_chars = 0
+
+    def parse(self, strategy, exprstr, lexer_class, grammar=GRAMMAR):
+        if not isinstance(exprstr, str):
+            self.misses += 1
+            return drive_parse(
+                strategy, exprstr, lexer_class, FROZEN_NODES, grammar=grammar
+            )
+        key = (strategy, lexer_class, grammar, exprstr)
+        tree = self._trees.get(key)
+        if tree is not None:
+            self.hits += 1
+            self._trees.move_to_end(key)
+            return tree
+        self.misses += 1
+        tree = drive_parse(
+            strategy, exprstr, lexer_class, FROZEN_NODES, grammar=grammar
+        )
+        if self.max_source_chars is None or len(exprstr) <= self.max_source_chars:
+            self._trees[key] = tree
+            self._source_chars += len(exprstr)
+            self._evict()
+        return tree
+
+    def _evict(self):
+        while self._trees and (
+            (self.max_entries is not None and len(self._trees) > self.max_entries)
+            or (
+                self.max_source_chars is not None
+                and self._source_chars > self.max_source_chars
+            )
+        ):
+            (_, _, _, exprstr), _ = self._trees.popitem(last=False)
+            self._source_chars -= len(exprstr)
+            self.evictions += 1
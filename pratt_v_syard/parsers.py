@@ -1,6 +1,8 @@
 """
 Exports PARSERS which connects to all the parsers
 """
+import warnings
+
 from .shunting_yard import parse as sy_parse
 from .basic_pratt import parse as pratt1_parse
 from .pratt_nopeek import parse as pratt2_parse
@@ -14,7 +16,14 @@ from .pratt_stackless7 import parse as pratt_sl7_parse
 from .pratt_stackless8 import parse as pratt_sl8_parse
 from .pratt_stackless9 import parse as pratt_sl9_parse
 from .pratt_returnless import parse as pratt_rl_parse
-from .op_base import Lexer
+from .generated import (
+    FRESH as GENERATED_FRESH,
+    STALE_MESSAGE,
+    pratt_parse as gen_pratt_parse,
+    sy_parse as gen_sy_parse,
+)
+from .limits import check_source
+from .op_base import GRAMMAR, Lexer, NODES
 
 PARSERS = (
     ("Shunting Yard", sy_parse),
@@ -30,10 +39,50 @@ PARSERS = (
     ("Stackless8 Pratt Parsing", pratt_sl8_parse),
     ("Stackless9 Pratt Parsing", pratt_sl9_parse),
     ("Returnless Pratt Parsing", pratt_rl_parse),
+    ("Generated Pratt Parsing", gen_pratt_parse),
+    ("Generated Shunting Yard", gen_sy_parse),
 )
+if not GENERATED_FRESH:
+    warnings.warn(f"{STALE_MESSAGE}. Leaving the generated parsers out of PARSERS")
+    PARSERS = tuple(
+        (pname, pfunc)
+        for pname, pfunc in PARSERS
+        if pfunc not in (gen_pratt_parse, gen_sy_parse)
+    )
+
+
+def drive_parse(
+    strategy,
+    exprstr,
+    lexer_class=Lexer,
+    nodes=NODES,
+    cache=None,
+    grammar=GRAMMAR,
+    limits=None,
+):
+    """
+    Lex exprstr with lexer_class and parse it with strategy, building the
+    tree with the op_base.NodeFactory nodes.
+
+    Pass op_base.StreamLexer as lexer_class to tokenize lazily; exprstr may
+    then also be a text file or an iterable of string chunks.
+
+    grammar (an op_base.Grammar) is the operator language, for both the
+    lexer and the parser.
 
+    If cache (a parse_cache.ParseCache) is given, the tree may come from it
+    and is then built from immutable nodes, so nodes must be left alone.
 
-def drive_parse(strategy, exprstr):
-    tokens = Lexer(exprstr)
+    If limits (a limits.Limits) is given, exprstr must be a string, and
+    limits.check_source rejects it before it is lexed for real when it has
+    too many tokens or nests too deep.
+    """
+    if limits is not None:
+        check_source(exprstr, limits, grammar)
+    if cache is not None:
+        if nodes is not NODES:
+            raise ValueError("A parse cache builds its own immutable nodes")
+        return cache.parse(strategy, exprstr, lexer_class, grammar)
+    tokens = lexer_class(exprstr, grammar=grammar)
     tokens.clear_for_error()
-    return strategy(tokens)
+    return strategy(tokens, nodes, grammar)
@@ -1,15 +1,13 @@
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
-def parse(tokstream):
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    min_precedence = grammar.min_precedence
     val_stack = []
-    prattparse_expr(tokstream, MIN_PRECEDENCE - 1, val_stack)
+    prattparse_expr(tokstream, min_precedence - 1, val_stack, nodes, grammar)
     tok = tokstream.poll()
     if tok is not None:
         raise ValueError(f"Expected operator at {tok.start()}")
@@ -17,14 +15,18 @@ def parse(tokstream):
     return val_stack[0]
 
 
-def prattparse_expr(tokstream, min_prec, val_stack):
+def prattparse_expr(tokstream, min_prec, val_stack, nodes, grammar):
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
     tok = tokstream.poll()
     if tok is None:
         raise ValueError("Unexpected EOF")
     if tok.group("num"):
-        val_stack.append(ValNode(int(tok.group("num"))))
+        val_stack.append(nodes.val(int(tok.group("num"))))
+    elif tok.group("name"):
+        val_stack.append(nodes.var(tok.group("name")))
     elif tok.group("paren") and tok.group("paren") == "(":
-        prattparse_expr(tokstream, MIN_PRECEDENCE - 1, val_stack)
+        prattparse_expr(tokstream, min_precedence - 1, val_stack, nodes, grammar)
         if tokstream:
             tok = tokstream.peek()
             if tok.group("paren") == ")":
@@ -38,22 +40,24 @@ def prattparse_expr(tokstream, min_prec, val_stack):
     elif tok.group("op"):
         # better be a uniop
         opname = "_" + tok.group("op")
-        if opname not in OPERATORS:
+        if opname not in operators:
             raise ValueError(
                 "Unknown unary operator %s at %d" % (tok.group("op"), tok.start("op"))
             )
-        opinfo = OPERATORS[opname]
-        prattparse_expr(tokstream, opinfo.right_precedence, val_stack)
-        val_stack[-1:] = [UniopNode(opname, opinfo.func, val_stack[-1])]
+        opinfo = operators[opname]
+        prattparse_expr(tokstream, opinfo.right_precedence, val_stack, nodes, grammar)
+        val_stack[-1:] = [nodes.uniop(opname, opinfo.func, val_stack[-1])]
 
     while tokstream:
         tok = tokstream.peek()
         if not tok.group("op"):
             break
         opname = tok.group("op")
-        opinfo = OPERATORS[opname]
+        opinfo = operators[opname]
         if opinfo.left_precedence < min_prec:
             break
         tokstream.poll()
-        prattparse_expr(tokstream, opinfo.right_precedence, val_stack)
-        val_stack[-2:] = [BinopNode(opname, opinfo.func, val_stack[-2], val_stack[-1])]
+        prattparse_expr(tokstream, opinfo.right_precedence, val_stack, nodes, grammar)
+        val_stack[-2:] = [
+            nodes.binop(opname, opinfo.func, val_stack[-2], val_stack[-1])
+        ]
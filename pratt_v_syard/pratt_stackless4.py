@@ -1,41 +1,44 @@
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
-def parse(tokstream):
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
+    make_binop, make_uniop, make_val, make_var = nodes
     do_first_part = True
-    local_stack = [(MIN_PRECEDENCE - 1, lambda _l: _l, -1)]
+    local_stack = [(min_precedence - 1, lambda _l: _l, -1)]
     while local_stack:
         if do_first_part:
             tok = tokstream.poll()
             if tok is None:
                 raise ValueError("Unexpected EOF")
             if tok.group("num"):
-                lhs = ValNode(int(tok.group("num")))
+                lhs = make_val(int(tok.group("num")))
+                tok = tokstream.poll()
+            elif tok.group("name"):
+                lhs = make_var(tok.group("name"))
                 tok = tokstream.poll()
             elif tok.group("paren") and tok.group("paren") == "(":
-                local_stack.append((MIN_PRECEDENCE - 1, lambda x: x, tok.start()))
+                local_stack.append((min_precedence - 1, lambda x: x, tok.start()))
                 continue
             elif tok.group("paren"):
                 raise ValueError(f"Unexpected right paren at {tok.start()}")
             elif tok.group("op"):
                 # better be a uniop
                 opname = "_" + tok.group("op")
-                if opname not in OPERATORS:
+                if opname not in operators:
                     raise ValueError(
                         "Unknown unary operator %s at %d"
                         % (tok.group("op"), tok.start("op"))
                     )
-                opinfo = OPERATORS[opname]
+                opinfo = operators[opname]
 
                 def cpsfunc2_closure(opname_, opinfo_):
                     def cpsfunc2(rhs_):
-                        return UniopNode(opname_, opinfo_.func, rhs_)
+                        return make_uniop(opname_, opinfo_.func, rhs_)
 
                     return cpsfunc2
 
@@ -51,12 +54,12 @@ def parse(tokstream):
         do_first_part = False
         while (tok is not None) and (
             (not tok.group("op"))
-            or (OPERATORS[tok.group("op")].left_precedence < local_stack[-1][0])
+            or (operators[tok.group("op")].left_precedence < local_stack[-1][0])
         ):
             if not local_stack:
                 break
             old_prec, lhs_func, loc = local_stack.pop()
-            if old_prec == MIN_PRECEDENCE - 1 and loc >= 0:
+            if old_prec == min_precedence - 1 and loc >= 0:
                 if tok.group("paren") != ")":
                     raise ValueError(
                         f"Expected operator or right paren at {tok.start()}"
@@ -68,11 +71,11 @@ def parse(tokstream):
             break
 
         opname = tok.group("op")
-        opinfo = OPERATORS[opname]
+        opinfo = operators[opname]
 
         def cpsfunc3_closure(opname_, opinfo_, lhs_):
             def cpsfunc3(rhs_):
-                return BinopNode(opname_, opinfo_.func, lhs_, rhs_)
+                return make_binop(opname_, opinfo_.func, lhs_, rhs_)
 
             return cpsfunc3
 
@@ -88,7 +91,7 @@ def parse(tokstream):
 
     while local_stack:
         old_prec, lhs_func, loc = local_stack.pop()
-        if old_prec == MIN_PRECEDENCE - 1 and loc >= 0:
+        if old_prec == min_precedence - 1 and loc >= 0:
             raise ValueError(f"Unclosed left paren beginning at {loc}")
         lhs = lhs_func(lhs)
     if tok is not None:
@@ -1,39 +1,43 @@
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
-def parse(tokstream):
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
+    make_binop, make_uniop, make_val, make_var = nodes
     do_first_part = True
-    local_stack = [(MIN_PRECEDENCE - 1, lambda _l: _l, -1)]
+    local_stack = [(min_precedence - 1, lambda _l: _l, -1)]
     for tok in tokstream:
         if do_first_part:
             if tok.group("num"):
-                lhs = ValNode(int(tok.group("num")))
+                lhs = make_val(int(tok.group("num")))
+                do_first_part = False
+                continue
+            if tok.group("name"):
+                lhs = make_var(tok.group("name"))
                 do_first_part = False
                 continue
             if tok.group("paren") and tok.group("paren") == "(":
-                local_stack.append((MIN_PRECEDENCE - 1, lambda x: x, tok.start()))
+                local_stack.append((min_precedence - 1, lambda x: x, tok.start()))
                 continue
             if tok.group("paren"):
                 raise ValueError(f"Unexpected right paren at {tok.start()}")
             if tok.group("op"):
                 # better be a uniop
                 opname = "_" + tok.group("op")
-                if opname not in OPERATORS:
+                if opname not in operators:
                     raise ValueError(
                         "Unknown unary operator %s at %d"
                         % (tok.group("op"), tok.start("op"))
                     )
-                opinfo = OPERATORS[opname]
+                opinfo = operators[opname]
 
                 def cpsfunc2_closure(opname_, opinfo_):
                     def cpsfunc2(rhs_):
-                        return UniopNode(opname_, opinfo_.func, rhs_)
+                        return make_uniop(opname_, opinfo_.func, rhs_)
 
                     return cpsfunc2
 
@@ -49,7 +53,7 @@ def parse(tokstream):
             if not tok.group("op"):
                 while local_stack:
                     old_prec, lhs_func, loc = local_stack.pop()
-                    if old_prec == MIN_PRECEDENCE - 1 and loc >= 0:
+                    if old_prec == min_precedence - 1 and loc >= 0:
                         break  # dug back to a left paren, so tok better be an right paren
                     lhs = lhs_func(lhs)
                 else:
@@ -61,14 +65,14 @@ def parse(tokstream):
 
             # Now know that tok is an op
             opname = tok.group("op")
-            opinfo = OPERATORS[opname]
+            opinfo = operators[opname]
             while opinfo.left_precedence < local_stack[-1][0]:
                 _, lhs_func, _ = local_stack.pop()
                 lhs = lhs_func(lhs)
 
             def cpsfunc3_closure(opname_, opinfo_, lhs_):
                 def cpsfunc3(rhs_):
-                    return BinopNode(opname_, opinfo_.func, lhs_, rhs_)
+                    return make_binop(opname_, opinfo_.func, lhs_, rhs_)
 
                 return cpsfunc3
 
@@ -86,7 +90,7 @@ def parse(tokstream):
 
     while local_stack:
         old_prec, lhs_func, loc = local_stack.pop()
-        if old_prec == MIN_PRECEDENCE - 1 and loc >= 0:
+        if old_prec == min_precedence - 1 and loc >= 0:
             raise ValueError(f"Unclosed left paren beginning at {loc}")
         lhs = lhs_func(lhs)
 
@@ -1,13 +1,13 @@
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
-def parse(tokstream):
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
+    make_binop, make_uniop, make_val, make_var = nodes
     def cpsfunc1_closure(loc):
         def cpsfunc1(lhs_):
             raise ValueError(f"Unclosed left paren beginning at {loc}")
@@ -16,36 +16,39 @@ def parse(tokstream):
 
     def cpsfunc2_closure(opname_, opinfo_):
         def cpsfunc2(rhs_):
-            return UniopNode(opname_, opinfo_.func, rhs_)
+            return make_uniop(opname_, opinfo_.func, rhs_)
 
         return cpsfunc2
 
     def cpsfunc3_closure(opname_, opinfo_, lhs_):
         def cpsfunc3(rhs_):
-            return BinopNode(opname_, opinfo_.func, lhs_, rhs_)
+            return make_binop(opname_, opinfo_.func, lhs_, rhs_)
 
         return cpsfunc3
 
     do_first_part = True
-    local_stack = [(MIN_PRECEDENCE - 2, lambda _l: _l)]
+    local_stack = [(min_precedence - 2, lambda _l: _l)]
     for tok in tokstream:
         if do_first_part:
             if tok.group("num"):
-                lhs = ValNode(int(tok.group("num")))
+                lhs = make_val(int(tok.group("num")))
+                do_first_part = False
+            if tok.group("name"):
+                lhs = make_var(tok.group("name"))
                 do_first_part = False
             if tok.group("paren") and tok.group("paren") == "(":
-                local_stack.append((MIN_PRECEDENCE - 1, cpsfunc1_closure(tok.start())))
+                local_stack.append((min_precedence - 1, cpsfunc1_closure(tok.start())))
             elif tok.group("paren"):
                 raise ValueError(f"Unexpected right paren at {tok.start()}")
             if tok.group("op"):
                 # better be a uniop
                 opname = "_" + tok.group("op")
-                if opname not in OPERATORS:
+                if opname not in operators:
                     raise ValueError(
                         "Unknown unary operator %s at %d"
                         % (tok.group("op"), tok.start("op"))
                     )
-                opinfo = OPERATORS[opname]
+                opinfo = operators[opname]
 
                 local_stack.append(
                     (
@@ -56,7 +59,7 @@ def parse(tokstream):
         else:
             if tok.group("op") is not None:
                 opname = tok.group("op")
-                opinfo = OPERATORS[opname]
+                opinfo = operators[opname]
                 while opinfo.left_precedence < local_stack[-1][0]:
                     _, lhs_func = local_stack.pop()
                     lhs = lhs_func(lhs)
@@ -71,7 +74,7 @@ def parse(tokstream):
             else:
                 while local_stack:
                     old_prec, lhs_func = local_stack.pop()
-                    if old_prec == MIN_PRECEDENCE - 1:
+                    if old_prec == min_precedence - 1:
                         break  # dug back to a left paren, so tok better be an right paren
                     lhs = lhs_func(lhs)
                 else:
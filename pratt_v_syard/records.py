@@ -0,0 +1,73 @@
+"""
+Parse files of newline-delimited expressions straight from a bytes buffer.
+
+parse_file maps the file into memory, and parse_records walks any
+bytes-like buffer (bytes, mmap, memoryview) a line at a time, lexing each
+record in place with op_base.BytesLexer, so no line is ever copied out as
+a string of its own. Only the text of each token is: numbers are decoded
+with int() from their bytes, and names and operators become short strs,
+so the trees keep no reference to the buffer and outlive the mapping.
+
+Records are lines without their "\\n" or "\\r\\n"; an empty line is a
+record like any other (and fails to parse). Error positions, like token
+positions, are byte offsets from the start of the record, so they match
+what parsing the line on its own would report for ASCII input.
+"""
+from collections import namedtuple
+import mmap
+import os
+import re
+
+from .batch import ITEM_ERRORS
+from .op_base import GRAMMAR, NODES, BytesLexer
+
+# lineno counts from 1, and start is the byte offset of the record in the
+# buffer; either tree or error is None
+RecordResult = namedtuple("RecordResult", ["lineno", "start", "tree", "error"])
+
+_NEWLINE = re.compile(b"\n")
+
+
+def record_spans(buffer):
+    """
+    Yield (start, end) for each line of buffer, excluding its line ending.
+    A last line without a newline is still a record.
+    """
+    size = len(buffer)
+    pos = 0
+    while pos < size:
+        match = _NEWLINE.search(buffer, pos)
+        end = size if match is None else match.start()
+        stop = end
+        if stop > pos and buffer[stop - 1] == 13:
+            stop -= 1
+        yield pos, stop
+        pos = end + 1
+
+
+def parse_records(strategy, buffer, nodes=NODES, grammar=GRAMMAR):
+    """
+    Yield a RecordResult for each record of buffer, parsed with strategy
+    """
+    for lineno, (start, end) in enumerate(record_spans(buffer), 1):
+        try:
+            tokens = BytesLexer(buffer, start, end, grammar)
+            tokens.clear_for_error()
+            tree = strategy(tokens, nodes, grammar)
+        except ITEM_ERRORS as err:
+            yield RecordResult(lineno, start, None, err)
+        else:
+            yield RecordResult(lineno, start, tree, None)
+
+
+def parse_file(strategy, path, nodes=NODES, grammar=GRAMMAR):
+    """
+    parse_records over the file at path, mapped into memory for as long as
+    the iteration lasts
+    """
+    with open(path, "rb") as file:
+        # mmap can't map an empty file
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from parse_records(strategy, buffer, nodes, grammar)
@@ -0,0 +1,532 @@
+"""
+A compact, versioned binary format for op_base trees.
+
+A stream is a header followed by any number of trees. The header is
+MAGIC, a VERSION byte and a 4-byte fingerprint of the grammar's operator
+names, because operators are stored by their id in the grammar (their
+position in the operator table) and the ids only mean the same thing
+against the same table. Each tree is its nodes in postfix order followed
+by END, one opcode byte per node:
+
+    OP_BASE + id    an operator; unary or binary as its name says
+    INT n           a literal 0 <= n < 2**63, n as a varint
+    NEG_INT n       a literal -2**63 <= -n - 1 < 0, n as a varint
+    BIG_INT k b     any other int: k as a varint, then k bytes little-endian
+    FLOAT d         a float, as 8 bytes IEEE 754 little-endian
+    NEW_VAR k s     a variable: k as a varint, then k bytes of UTF-8
+    VAR i           the i-th distinct variable of this tree again
+
+Varints are LEB128: seven bits a byte, low bits first, the top bit set on
+every byte but the last.
+
+dump and load work through a file a chunk at a time, and neither recurses,
+so trees deeper than the recursion limit (which pickle can't handle) are
+fine. LazyTree indexes a tree in a buffer, such as a memoryview or mmap,
+without building nodes, and makes Node views of them only as they are
+looked at, decoding literals and names from the buffer on demand.
+"""
+from array import array
+import struct
+import zlib
+
+from .compiled import postorder
+from .op_base import GRAMMAR, NODES, BinopNode, UniopNode, ValNode, VarNode
+
+MAGIC = b"PVST"
+VERSION = 1
+END, INT, NEG_INT, BIG_INT, FLOAT, NEW_VAR, VAR = range(7)
+OP_BASE = 16
+MAX_OPERATORS = 256 - OP_BASE
+CHUNK_SIZE = 1 << 16
+
+_FLOAT = struct.Struct("<d")
+_VARINT_BITS = 63
+
+
+def fingerprint(grammar):
+    """
+    A 32-bit checksum of grammar's operator names in id order
+    """
+    return zlib.crc32("\0".join(grammar.names).encode())
+
+
+def header(grammar=GRAMMAR):
+    if len(grammar.names) > MAX_OPERATORS:
+        raise ValueError(f"Can't serialize more than {MAX_OPERATORS} operators")
+    return MAGIC + bytes([VERSION]) + fingerprint(grammar).to_bytes(4, "little")
+
+
+HEADER_SIZE = len(header())
+
+
+def _write_varint(out, number):
+    while number >= 0x80:
+        out.append((number & 0x7F) | 0x80)
+        number >>= 7
+    out.append(number)
+
+
+def _write_val(out, val):
+    if type(val) is int:
+        if 0 <= val < 1 << _VARINT_BITS:
+            if val < 0x80:
+                out += bytes((INT, val))
+            else:
+                out.append(INT)
+                _write_varint(out, val)
+        elif -(1 << _VARINT_BITS) <= val < 0:
+            out.append(NEG_INT)
+            _write_varint(out, -val - 1)
+        else:
+            data = val.to_bytes(val.bit_length() // 8 + 1, "little", signed=True)
+            out.append(BIG_INT)
+            _write_varint(out, len(data))
+            out += data
+    elif type(val) is float:
+        out.append(FLOAT)
+        out += _FLOAT.pack(val)
+    else:
+        raise ValueError(f"Can't serialize literal {val!r}")
+
+
+class Dumper:
+    """
+    Writes trees to file, after a header for grammar, buffering up to
+    chunk_size bytes at a time; call flush() when done
+    """
+
+    def __init__(self, file, grammar=GRAMMAR, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self._ids = {name: OP_BASE + op for (op, name) in enumerate(grammar.names)}
+        self._out = bytearray(header(grammar))
+
+    def dump(self, root):
+        """
+        Append a tree, without recursion
+        """
+        out = self._out
+        ids = self._ids
+        var_ids = {}
+        for node in postorder(root):
+            if isinstance(node, ValNode):
+                _write_val(out, node.val)
+            elif isinstance(node, VarNode):
+                var_id = var_ids.get(node.name)
+                if var_id is None:
+                    var_ids[node.name] = len(var_ids)
+                    name = node.name.encode()
+                    out.append(NEW_VAR)
+                    _write_varint(out, len(name))
+                    out += name
+                else:
+                    out.append(VAR)
+                    _write_varint(out, var_id)
+            else:
+                op = ids.get(node.name)
+                if op is None:
+                    raise ValueError(f"Operator {node.name} isn't in the grammar")
+                out.append(op)
+            if len(out) >= self.chunk_size:
+                self.file.write(out)
+                out.clear()
+        out.append(END)
+
+    def flush(self):
+        self.file.write(self._out)
+        self._out.clear()
+
+
+def dump(root, file, grammar=GRAMMAR):
+    """
+    Write a header and one tree to file
+    """
+    dump_all([root], file, grammar)
+
+
+def dump_all(roots, file, grammar=GRAMMAR):
+    """
+    Write a header and then each tree of roots to file
+    """
+    dumper = Dumper(file, grammar)
+    for root in roots:
+        dumper.dump(root)
+    dumper.flush()
+
+
+def dumps(root, grammar=GRAMMAR):
+    """
+    A header and one tree, as bytes
+    """
+    out = _BytesSink()
+    dump(root, out, grammar)
+    return bytes(out.data)
+
+
+class _BytesSink:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+def check_header(data, grammar=GRAMMAR):
+    """
+    Raise ValueError unless data starts with a header for grammar
+    """
+    if bytes(data[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a serialized tree")
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Truncated tree data")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported format version {data[len(MAGIC)]}")
+    if int.from_bytes(data[len(MAGIC) + 1 : HEADER_SIZE], "little") != fingerprint(
+        grammar
+    ):
+        raise ValueError("Trees were serialized with a different operator table")
+
+
+class Loader:
+    """
+    Reads trees back from file (or from data, if there is no file), a
+    chunk_size read at a time. The file is read ahead of the tree being
+    loaded, so read everything in it through the one Loader.
+    """
+
+    def __init__(
+        self, file=None, data=b"", nodes=NODES, grammar=GRAMMAR, chunk_size=CHUNK_SIZE
+    ):
+        self.file = file
+        self.data = data
+        self.pos = 0
+        self.nodes = nodes
+        self.grammar = grammar
+        self.chunk_size = chunk_size
+        self._fill(HEADER_SIZE)
+        check_header(self.data[:HEADER_SIZE], grammar)
+        self.pos = HEADER_SIZE
+
+    def _fill(self, count):
+        """
+        Read until data holds count bytes from pos, or the file ends
+        """
+        have = len(self.data) - self.pos
+        if have >= count or self.file is None:
+            return
+        chunks = [bytes(self.data[self.pos :])]
+        while have < count:
+            chunk = self.file.read(max(self.chunk_size, count - have))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            have += len(chunk)
+        self.data = b"".join(chunks)
+        self.pos = 0
+
+    def _varint(self):
+        number = 0
+        shift = 0
+        while True:
+            self._fill(1)
+            byte = self.data[self.pos]
+            self.pos += 1
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return number
+            shift += 7
+
+    def _take(self, count):
+        self._fill(count)
+        if len(self.data) - self.pos < count:
+            raise ValueError("Truncated tree data")
+        start = self.pos
+        self.pos += count
+        return self.data[start : self.pos]
+
+    def at_end(self):
+        self._fill(1)
+        return self.pos >= len(self.data)
+
+    def load(self):
+        """
+        The next tree, built with nodes, without recursion
+        """
+        make_binop, make_uniop, make_val, make_var = self.nodes
+        names = self.grammar.names
+        funcs = self.grammar.funcs
+        unary = [name.startswith("_") for name in names]
+        variables = []
+        stack = []
+        try:
+            while True:
+                # Most nodes are an opcode and at most a short varint
+                self._fill(16)
+                data = self.data
+                code = data[self.pos]
+                self.pos += 1
+                if code >= OP_BASE:
+                    op = code - OP_BASE
+                    if unary[op]:
+                        stack[-1] = make_uniop(names[op], funcs[op], stack[-1])
+                    else:
+                        right = stack.pop()
+                        stack[-1] = make_binop(names[op], funcs[op], stack[-1], right)
+                elif code == INT:
+                    byte = data[self.pos]
+                    if byte < 0x80:
+                        self.pos += 1
+                        stack.append(make_val(byte))
+                    else:
+                        stack.append(make_val(self._varint()))
+                elif code == VAR:
+                    stack.append(make_var(variables[self._varint()]))
+                elif code == NEW_VAR:
+                    name = str(self._take(self._varint()), "utf-8")
+                    variables.append(name)
+                    stack.append(make_var(name))
+                elif code == NEG_INT:
+                    stack.append(make_val(-self._varint() - 1))
+                elif code == BIG_INT:
+                    data = self._take(self._varint())
+                    stack.append(make_val(int.from_bytes(data, "little", signed=True)))
+                elif code == FLOAT:
+                    stack.append(make_val(_FLOAT.unpack(self._take(8))[0]))
+                elif code == END:
+                    break
+                else:
+                    raise ValueError(f"Bad opcode {code}")
+        except IndexError:
+            raise ValueError("Truncated or corrupt tree data") from None
+        if len(stack) != 1:
+            raise ValueError("Corrupt tree data")
+        return stack[0]
+
+    def __iter__(self):
+        while not self.at_end():
+            yield self.load()
+
+
+def load(file, nodes=NODES, grammar=GRAMMAR):
+    """
+    The first tree in file
+    """
+    return Loader(file, nodes=nodes, grammar=grammar).load()
+
+
+def load_all(file, nodes=NODES, grammar=GRAMMAR):
+    """
+    Yield every tree in file, in order
+    """
+    return iter(Loader(file, nodes=nodes, grammar=grammar))
+
+
+def loads(data, nodes=NODES, grammar=GRAMMAR):
+    """
+    The first tree in data, a bytes-like object
+    """
+    return Loader(data=memoryview(data), nodes=nodes, grammar=grammar).load()
+
+
+class LazyTree:
+    """
+    One tree in a bytes-like buffer (by default the first after the
+    header), indexed in one pass without building any nodes. end is the
+    offset just past it, where the next tree starts.
+
+    offsets holds where each node's operand starts in the buffer, and
+    left/right its children's indices (-1 if none); ops holds each node's
+    opcode.
+    """
+
+    def __init__(self, buffer, start=None, grammar=GRAMMAR):
+        self.buffer = buffer = memoryview(buffer)
+        self.grammar = grammar
+        if start is None:
+            check_header(buffer, grammar)
+            start = HEADER_SIZE
+        self.ops = array("B")
+        self.offsets = array("q")
+        self.left = array("q")
+        self.right = array("q")
+        # Offsets of the variable names, by variable id
+        self._var_offsets = []
+        unary = [name.startswith("_") for name in grammar.names]
+        stack = []
+        pos = start
+        try:
+            while True:
+                code = buffer[pos]
+                pos += 1
+                if code == END:
+                    break
+                index = len(self.ops)
+                left = right = -1
+                offset = pos
+                if code >= OP_BASE:
+                    if unary[code - OP_BASE]:
+                        right = stack.pop()
+                    else:
+                        right = stack.pop()
+                        left = stack.pop()
+                elif code in (INT, NEG_INT, VAR):
+                    pos = _skip_varint(buffer, pos)
+                    if code == VAR:
+                        code = NEW_VAR
+                        offset = self._var_offsets[_read_varint(buffer, offset)[0]]
+                elif code in (BIG_INT, NEW_VAR):
+                    size, pos = _read_varint(buffer, pos)
+                    pos += size
+                    if code == NEW_VAR:
+                        self._var_offsets.append(offset)
+                elif code == FLOAT:
+                    pos += _FLOAT.size
+                else:
+                    raise ValueError(f"Bad opcode {code}")
+                if pos > len(buffer):
+                    raise IndexError
+                stack.append(index)
+                self.ops.append(code)
+                self.offsets.append(offset)
+                self.left.append(left)
+                self.right.append(right)
+        except IndexError:
+            raise ValueError("Truncated or corrupt tree data") from None
+        if len(stack) != 1:
+            raise ValueError("Corrupt tree data")
+        self.end = pos
+
+    def __len__(self):
+        return len(self.ops)
+
+    def val(self, index):
+        """
+        The literal at node index, decoded from the buffer
+        """
+        code = self.ops[index]
+        offset = self.offsets[index]
+        if code == INT:
+            return _read_varint(self.buffer, offset)[0]
+        if code == NEG_INT:
+            return -_read_varint(self.buffer, offset)[0] - 1
+        if code == FLOAT:
+            return _FLOAT.unpack_from(self.buffer, offset)[0]
+        size, offset = _read_varint(self.buffer, offset)
+        return int.from_bytes(
+            self.buffer[offset : offset + size], "little", signed=True
+        )
+
+    def name(self, index):
+        """
+        The operator or variable name of node index
+        """
+        code = self.ops[index]
+        if code >= OP_BASE:
+            return self.grammar.names[code - OP_BASE]
+        size, offset = _read_varint(self.buffer, self.offsets[index])
+        return str(self.buffer[offset : offset + size], "utf-8")
+
+    def node(self, index=-1):
+        """
+        A Node view of the subtree rooted at index (by default the root)
+        """
+        if index < 0:
+            index += len(self.ops)
+        code = self.ops[index]
+        if code == NEW_VAR:
+            return LazyVarView(self, index)
+        if code < OP_BASE:
+            return LazyValView(self, index)
+        if self.left[index] < 0:
+            return LazyUniopView(self, index)
+        return LazyBinopView(self, index)
+
+
+def _read_varint(buffer, pos):
+    number = 0
+    shift = 0
+    while True:
+        byte = buffer[pos]
+        pos += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return number, pos
+        shift += 7
+
+
+def _skip_varint(buffer, pos):
+    while buffer[pos] >= 0x80:
+        pos += 1
+    return pos + 1
+
+
+# The views don't call their base __init__; their attributes come from the tree
+# pylint:disable=super-init-not-called
+
+
+class LazyBinopView(BinopNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.name(self.index)
+
+    @property
+    def opfunc(self):
+        return self.tree.grammar.funcs[self.tree.ops[self.index] - OP_BASE]
+
+    @property
+    def left(self):
+        return self.tree.node(self.tree.left[self.index])
+
+    @property
+    def right(self):
+        return self.tree.node(self.tree.right[self.index])
+
+
+class LazyUniopView(UniopNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.name(self.index)
+
+    @property
+    def opfunc(self):
+        return self.tree.grammar.funcs[self.tree.ops[self.index] - OP_BASE]
+
+    @property
+    def right(self):
+        return self.tree.node(self.tree.right[self.index])
+
+
+class LazyValView(ValNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def val(self):
+        return self.tree.val(self.index)
+
+
+class LazyVarView(VarNode):
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.name(self.index)
@@ -0,0 +1,286 @@
+"""
+An asyncio server that parses and evaluates expressions for its clients,
+and a client for it.
+
+The protocol is line-delimited JSON over TCP or a Unix socket. A request
+looks like
+
+    {"id": 1, "expr": "1 + x", "parser": "Shunting Yard",
+     "mode": "both", "env": {"x": 2}}
+
+where everything but "expr" is optional: "parser" is a name from
+parsers.PARSERS, "mode" is one of "value", "lispish" or "both", and "env"
+binds variables. The reply carries the same "id" and either "value"
+and/or "lispish", or "error". Replies on one connection can arrive out of
+order when requests overlap.
+
+Each connection has at most max_concurrent requests in progress; until
+one finishes the server stops reading from that connection, so a client
+that sends faster than it is served is held back by TCP flow control.
+Parsing and evaluation run in an executor so that an expensive expression
+doesn't stall the event loop, and within LIMITS, so that one can't hold a
+worker for long either.
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import multiprocessing
+
+from .batch import ITEM_ERRORS
+from .limits import BoundedEvalVisitor, Limits
+from .op_base import Lispish
+from .parsers import PARSERS, drive_parse
+
+DEFAULT_PARSER = PARSERS[0][0]
+MODES = ("value", "lispish", "both")
+LINE_LIMIT = 1 << 20
+LIMITS = Limits(timeout=10.0)
+
+_strategies = dict(PARSERS)
+
+
+def evaluate_request(request, limits=LIMITS):
+    """
+    The reply (a dict) to one decoded request
+    """
+    reply = {"id": request.get("id")}
+    try:
+        strategy = _strategies.get(request.get("parser", DEFAULT_PARSER))
+        if strategy is None:
+            raise ValueError(f"Unknown parser {request['parser']}")
+        mode = request.get("mode", "both")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode}")
+        exprstr = request.get("expr")
+        if not isinstance(exprstr, str):
+            raise ValueError("Request has no expr string")
+        tree = drive_parse(strategy, exprstr, limits=limits)
+        if mode != "value":
+            reply["lispish"] = tree.accept(Lispish())
+        if mode != "lispish":
+            reply["value"] = tree.accept(BoundedEvalVisitor(request.get("env"), limits))
+    except ITEM_ERRORS as err:
+        reply = {"id": reply["id"], "error": str(err)}
+    return reply
+
+
+def encode_reply(reply):
+    # Values JSON can't hold (complex numbers) are sent as their repr
+    try:
+        return json.dumps(reply, default=repr).encode() + b"\n"
+    except ValueError as err:
+        # An int with too many digits to convert to a string
+        return encode_reply({"id": reply["id"], "error": str(err)})
+
+
+def handle_line(line):
+    """
+    The encoded reply to one encoded request line
+    """
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+    except ValueError as err:
+        reply = {"id": None, "error": f"Bad request: {err}"}
+    else:
+        reply = evaluate_request(request)
+    return encode_reply(reply)
+
+
+class Connection:
+    """
+    The server's side of one client connection
+    """
+
+    def __init__(self, reader, writer, max_concurrent, executor):
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.write_lock = asyncio.Lock()
+        self.tasks = set()
+
+    async def run(self):
+        try:
+            while True:
+                await self.slots.acquire()
+                try:
+                    line = await self.reader.readline()
+                except ValueError:
+                    # Longer than LINE_LIMIT; the reader has dropped it
+                    self.start(None)
+                    continue
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                self.start(line)
+        finally:
+            if self.tasks:
+                await asyncio.wait(self.tasks)
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def start(self, line):
+        task = asyncio.create_task(self.respond(line))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def respond(self, line):
+        try:
+            if line is None:
+                reply = encode_reply({"id": None, "error": "Request line too long"})
+            else:
+                loop = asyncio.get_running_loop()
+                reply = await loop.run_in_executor(self.executor, handle_line, line)
+            self.writer.write(reply)
+            async with self.write_lock:
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.slots.release()
+
+
+async def start_server(host=None, port=0, path=None, max_concurrent=8, executor=None):
+    """
+    Start serving on a Unix socket at path if given, otherwise on TCP host
+    and port, and return the asyncio.Server. executor is passed to
+    run_in_executor; the default is the event loop's thread pool, and a
+    ProcessPoolExecutor lets several evaluations run truly in parallel.
+    """
+
+    async def serve(reader, writer):
+        await Connection(reader, writer, max_concurrent, executor).run()
+
+    if path is not None:
+        return await asyncio.start_unix_server(serve, path, limit=LINE_LIMIT)
+    return await asyncio.start_server(serve, host, port, limit=LINE_LIMIT)
+
+
+def make_executor(workers):
+    """
+    The executor for start_server given a --workers option: None, for the
+    event loop's thread pool, when workers is None, otherwise a
+    ProcessPoolExecutor with that many processes, or one per CPU for 0
+    """
+    if workers is None:
+        return None
+    # Workers forked from the server would inherit the sockets of the
+    # connections open at the time, and keep them open after the server
+    # closes its end
+    method = "forkserver"
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    return ProcessPoolExecutor(
+        workers or None, mp_context=multiprocessing.get_context(method)
+    )
+
+
+def add_workers_option(argparser):
+    argparser.add_argument(
+        "--workers",
+        type=int,
+        help="worker processes to evaluate in; 0 means one per CPU, and"
+        " without this requests run in the event loop's thread pool",
+    )
+
+
+class Client:
+    """
+    A connection to the server that can have any number of requests
+    outstanding at once
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count()
+        self._pending = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host=None, port=None, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def request(self, exprstr, parser=DEFAULT_PARSER, mode="both", env=None):
+        """
+        The server's reply to exprstr, as a dict
+        """
+        request_id = next(self._ids)
+        request = {"id": request_id, "expr": exprstr, "parser": parser, "mode": mode}
+        if env is not None:
+            request["env"] = env
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def _receive(self):
+        try:
+            while line := await self.reader.readline():
+                reply = json.loads(line)
+                future = self._pending.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, ValueError):
+            pass
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Server closed the connection"))
+        self._pending.clear()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._receiver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Serve parse/evaluate requests")
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=8765)
+    argparser.add_argument("--unix", help="listen on this Unix socket instead")
+    argparser.add_argument("--max-concurrent", type=int, default=8)
+    add_workers_option(argparser)
+    args = argparser.parse_args()
+    executor = make_executor(args.workers)
+
+    async def run():
+        server = await start_server(
+            args.host, args.port, args.unix, args.max_concurrent, executor
+        )
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
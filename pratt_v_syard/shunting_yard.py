@@ -3,12 +3,8 @@ Shunting yard parsing module
 """
 from enum import Enum
 from .op_base import (
-    BinopNode,
-    UniopNode,
-    ValNode,
-    MAX_PRECEDENCE,
-    MIN_PRECEDENCE,
-    OPERATORS,
+    GRAMMAR,
+    NODES,
 )
 
 
@@ -18,30 +14,41 @@ class TokState(Enum):
     EXPECT_ATOM = 2  # expecting num or uniop
 
 
-def parse(tokstream):
+def parse(tokstream, nodes=NODES, grammar=GRAMMAR):
     """
     Parse according to a shunting yard algorithm.
 
     This doesn't use an output queue, but instead evaluates operations immediately
-    when they would hit the output queue.
+    when they would hit the output queue. Those operations build nodes with the
+    given op_base.NodeFactory.
     """
+    operators = grammar.operators
+    min_precedence = grammar.min_precedence
+    max_precedence = grammar.max_precedence
     val_stack = []
+    make_binop, make_uniop, make_val, make_var = nodes
 
     def binop(name, func):
         def retval():
-            val_stack[-2:] = [BinopNode(name, func, val_stack[-2], val_stack[-1])]
+            val_stack[-2:] = [make_binop(name, func, val_stack[-2], val_stack[-1])]
 
         return retval
 
     def uniop(name, func):
         def retval():
-            val_stack[-1:] = [UniopNode(name, func, val_stack[-1])]
+            val_stack[-1:] = [make_uniop(name, func, val_stack[-1])]
 
         return retval
 
     def pushval(val):
         def retval():
-            val_stack.append(ValNode(int(val)))
+            val_stack.append(make_val(int(val)))
+
+        return retval
+
+    def pushvar(name):
+        def retval():
+            val_stack.append(make_var(name))
 
         return retval
 
@@ -56,11 +63,15 @@ def parse(tokstream):
     for tok in tokstream:
         if tok_state == TokState.EXPECT_ATOM:
             if tok.group("num"):
-                to_push = (MAX_PRECEDENCE + 2, pushval(tok.group("num")))
-                new_prec = MAX_PRECEDENCE + 1
+                to_push = (max_precedence + 2, pushval(tok.group("num")))
+                new_prec = max_precedence + 1
+                tok_state = TokState.EXPECT_OP
+            elif tok.group("name"):
+                to_push = (max_precedence + 2, pushvar(tok.group("name")))
+                new_prec = max_precedence + 1
                 tok_state = TokState.EXPECT_OP
             elif tok.group("paren") and tok.group("paren") == "(":
-                to_push = (MIN_PRECEDENCE - 1, lparen_error(tok.start()))
+                to_push = (min_precedence - 1, lparen_error(tok.start()))
                 func_stack.append(to_push)
                 continue
             elif tok.group("paren"):
@@ -68,12 +79,12 @@ def parse(tokstream):
             elif tok.group("op"):
                 # better be a uniop
                 opname = "_" + tok.group("op")
-                if opname not in OPERATORS:
+                if opname not in operators:
                     raise ValueError(
                         "Unknown unary operator %s at %d"
                         % (tok.group("op"), tok.start("op"))
                     )
-                opinfo = OPERATORS[opname]
+                opinfo = operators[opname]
                 to_push = (
                     opinfo.right_precedence,
                     uniop(opname, opinfo.func),
@@ -81,13 +92,13 @@ def parse(tokstream):
                 new_prec = opinfo.left_precedence
         elif tok_state == TokState.EXPECT_OP:
             if tok.group("op"):
-                opinfo = OPERATORS[tok.group("op")]
+                opinfo = operators[tok.group("op")]
                 to_push = (opinfo.right_precedence, binop(tok.group("op"), opinfo.func))
                 new_prec = opinfo.left_precedence
                 tok_state = TokState.EXPECT_ATOM
             else:
                 while func_stack:
-                    if func_stack[-1][0] == MIN_PRECEDENCE - 1:
+                    if func_stack[-1][0] == min_precedence - 1:
                         func_stack.pop()
                         break
                     _, todo = func_stack.pop()
@@ -108,3 +119,63 @@ def parse(tokstream):
         todo()
     assert len(val_stack) == 1, f"Val stack should have length 1, was {val_stack}"
     return val_stack[0]
+
+
+def validate(exprstr, grammar=GRAMMAR):
+    """
+    Raise the error that drive_parse(parse, exprstr) would, or return None
+    if exprstr parses, without building anything.
+
+    This is parse's state machine with only what decides its errors: the
+    TokState and where the open parens start. Binding powers never make an
+    error, so they aren't needed either. As with Lexer, an unrecognized
+    token anywhere is reported ahead of any parse error.
+    """
+    binop_ids = grammar.binop_ids
+    uniop_ids = grammar.uniop_ids
+    expect_atom = TokState.EXPECT_ATOM
+    tok_state = expect_atom
+    paren_starts = []
+    tokens = grammar.lex_re.finditer(exprstr)
+    for tok in tokens:
+        kind = tok.lastgroup
+        if kind == "lexerr":
+            raise ValueError(f"Unrecognized token {tok.group()} at {tok.start()}")
+        if tok_state is expect_atom:
+            if kind == "num" or kind == "name":
+                tok_state = TokState.EXPECT_OP
+            elif kind == "paren":
+                if tok.group() != "(":
+                    error = ValueError(f"Unexpected right paren at {tok.start()}")
+                    break
+                paren_starts.append(tok.start())
+            elif tok.group() not in uniop_ids:
+                error = ValueError(
+                    "Unknown unary operator %s at %d" % (tok.group(), tok.start())
+                )
+                break
+        elif kind == "op":
+            if tok.group() not in binop_ids:
+                # parse looks it up in the operator table
+                error = KeyError(tok.group())
+                break
+            tok_state = expect_atom
+        elif paren_starts:
+            paren_starts.pop()
+            if tok.group() != ")":
+                error = ValueError(f"Expected operator or right paren at {tok.start()}")
+                break
+        else:
+            error = ValueError(f"Expected operator at {tok.start()}")
+            break
+    else:
+        if tok_state is expect_atom:
+            error = ValueError("Unexpected EOF")
+        elif paren_starts:
+            error = ValueError(f"Unclosed left paren beginning at {paren_starts[-1]}")
+        else:
+            return
+    for tok in tokens:
+        if tok.lastgroup == "lexerr":
+            raise ValueError(f"Unrecognized token {tok.group()} at {tok.start()}")
+    raise error
@@ -0,0 +1,122 @@
+"""
+Unittests for batch parsing and evaluation
+"""
+
+import pickle
+import subprocess
+import sys
+import unittest
+
+from .batch import BatchSummary, eval_many, output_many, parse_many
+from .flat_tree import parse_flat
+from .limits import LimitExceeded
+from .parsers import PARSERS
+
+EXPRS = ["1 + 2", "4 + 5 9", "2 ** 10", "1 / 0", "x * 3", "(1", "-2**-3"]
+
+
+class TestBatch(unittest.TestCase):
+    def check_parse(self, workers):
+        results = list(parse_many(EXPRS, PARSERS[1][1], workers, chunksize=2))
+        self.assertEqual(len(results), len(EXPRS))
+        self.assertEqual(results[0].tree.lispish(), "(+ 1 2)")
+        self.assertEqual(str(results[1].error), "Expected operator at 6")
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertIsNone(results[1].tree)
+        self.assertEqual(results[4].tree.evaluate({"x": 2}), 6)
+        self.assertEqual(str(results[5].error), "Unclosed left paren beginning at 0")
+        self.assertEqual(results[6].tree.lispish(), "(_- (** 2 (_- 3)))")
+
+    def check_eval(self, workers):
+        results = list(eval_many(EXPRS, workers=workers, chunksize=3, env={"x": 5}))
+        self.assertEqual([result.value for result in results[:3:2]], [3, 1024])
+        self.assertIsInstance(results[3].error, ZeroDivisionError)
+        self.assertEqual(results[4].value, 15)
+        self.assertEqual(results[6].value, -0.125)
+        results = list(eval_many(["9 ** 9 ** 9 ** 9", "1 << 2"], workers=workers))
+        self.assertIsInstance(results[0].error, LimitExceeded)
+        self.assertEqual(results[1].value, 4)
+
+    def test_in_process(self):
+        self.check_parse(1)
+        self.check_eval(1)
+
+    def test_pool(self):
+        self.check_parse(2)
+        self.check_eval(2)
+
+    def test_lazy_input(self):
+        results = parse_many((str(i) for i in range(1000)), workers=1, chunksize=7)
+        self.assertEqual(
+            [result.tree.evaluate() for result in results], list(range(1000))
+        )
+
+    def test_flat_tree_pickle(self):
+        tree = parse_flat(PARSERS[0][1], "x * (1 + 2) - y ** 3")
+        copy = pickle.loads(pickle.dumps(tree))
+        self.assertEqual(copy.lispish(), tree.lispish())
+        self.assertEqual(copy.evaluate({"x": 2, "y": 3}), -21)
+        copy.nodes.val(2)
+        self.assertEqual(copy.literals, tree.literals)
+
+    def check_output(self, workers):
+        exprs = EXPRS + ["1 ~ 2", "9 ** 9 ** 9 ** 9"]
+        results = list(output_many(exprs, PARSERS[2][1], "value", workers, 2))
+        self.assertEqual([result.output for result in results[:3:2]], ["3", "1024"])
+        self.assertIsInstance(results[3].error, ZeroDivisionError)
+        self.assertIsInstance(results[-2].error, KeyError)
+        self.assertEqual(type(results[-1].error).__name__, "SizeLimitExceeded")
+        results = list(output_many(exprs, mode="lispish", workers=workers))
+        self.assertEqual(results[6].output, "(_- (** 2 (_- 3)))")
+        results = list(output_many(exprs, mode="validate", workers=workers))
+        self.assertEqual(
+            [result.error is None for result in results],
+            [True, False, True, True, True, False, True, False, True],
+        )
+        self.assertEqual(results[0].output, "ok")
+        for result in results:
+            self.assertGreaterEqual(result.seconds, 0)
+
+    def test_output(self):
+        self.check_output(1)
+        self.check_output(2)
+        with self.assertRaises(ValueError):
+            output_many(EXPRS, mode="both")
+
+    def test_summary(self):
+        summary = BatchSummary()
+        for exprstr, result in zip(EXPRS, output_many(EXPRS, workers=1)):
+            summary.add(len(exprstr), result)
+        self.assertEqual((summary.lines, summary.errors), (7, 4))
+        self.assertEqual(summary.chars, sum(map(len, EXPRS)))
+        self.assertEqual(summary.latencies(1.0), [max(summary.seconds)])
+        self.assertIn("7 lines, 4 errors", summary.format())
+        self.assertEqual(BatchSummary().latencies(0.5), [0.0])
+
+
+class TestCommandLine(unittest.TestCase):
+    def run_main(self, *args):
+        return subprocess.run(
+            [sys.executable, "-m", "pratt_v_syard", *args],
+            input="\n".join(EXPRS) + "\n",
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+    def test_batch(self):
+        done = self.run_main("--env", '{"x": 2}', "--chunksize", "3")
+        self.assertEqual(done.returncode, 1)
+        lines = done.stdout.splitlines()
+        self.assertEqual(len(lines), len(EXPRS))
+        self.assertEqual(lines[:3:2] + lines[4:5], ["3", "1024", "6"])
+        self.assertEqual(lines[1], "<stdin>:2: ValueError: Expected operator at 6")
+        self.assertEqual(lines[3], "<stdin>:4: ZeroDivisionError: division by zero")
+        self.assertIn("7 lines, 3 errors", done.stderr)
+
+    def test_modes(self):
+        done = self.run_main("--mode", "lispish", "--parser", PARSERS[5][0], "-")
+        self.assertEqual(done.stdout.splitlines()[2], "(** 2 10)")
+        done = self.run_main("--mode", "validate", "--workers", "2")
+        self.assertEqual(done.stdout.splitlines()[4], "ok")
+        self.assertIn("7 lines, 2 errors", done.stderr)
@@ -0,0 +1,110 @@
+"""
+Unittests for the benchmark inputs and the benchmark suite's bookkeeping
+"""
+
+import unittest
+
+from .benchmarks.memory import MEASURES, node_bytes, run_memory
+from .benchmarks.shapes import int_mix, random_mix
+from .benchmarks.suite import SHAPES, find_regressions, run_suite
+from .op_base import EvalVisitor, FROZEN_NODES, Lispish
+from .parsers import PARSERS, drive_parse
+from .walker import walk
+
+
+class TestShapes(unittest.TestCase):
+    def test_all_parsers_agree(self):
+        for shape, generate in SHAPES.items():
+            exprstr = generate(30, 1)
+            expected = walk(drive_parse(PARSERS[0][1], exprstr), Lispish())
+            for pname, pfunc in PARSERS:
+                with self.subTest(pname, shape=shape):
+                    tree = drive_parse(pfunc, exprstr)
+                    self.assertEqual(walk(tree, Lispish()), expected)
+
+    def test_deterministic(self):
+        for shape, generate in SHAPES.items():
+            with self.subTest(shape):
+                self.assertEqual(generate(50, 3), generate(50, 3))
+
+    def test_random_mix(self):
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                tree = drive_parse(PARSERS[0][1], random_mix(200, seed))
+                self.assertIsInstance(walk(tree, EvalVisitor()), int)
+        exprstr = random_mix(20, 0, ops=("**",))
+        self.assertEqual(exprstr.count("**"), 20)
+
+    def test_int_mix_evaluates(self):
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                tree = drive_parse(PARSERS[0][1], int_mix(200, seed))
+                self.assertIsInstance(walk(tree, EvalVisitor()), int)
+
+
+class TestSuite(unittest.TestCase):
+    def test_run_and_compare(self):
+        run = run_suite([5], 1, shapes=("left_chain", "random_mix"))
+        self.assertEqual(len(run["results"]), 2 * len(PARSERS))
+        for record in run["results"]:
+            self.assertIn("lex", record)
+            self.assertIn("parse", record)
+        self.assertEqual(find_regressions(run, run, 0.1), [])
+
+        slower = {
+            "results": [
+                dict(record, parse=record["parse"] * 2) for record in run["results"]
+            ]
+        }
+        regressions = find_regressions(slower, run, 0.5)
+        self.assertEqual(len(regressions), len(run["results"]))
+        self.assertEqual({phase for (_, phase, _, _) in regressions}, {"parse"})
+        self.assertEqual(find_regressions(slower, run, 1.5), [])
+
+        # A phase that errors or goes missing is a regression too
+        broken = {"results": [dict(record) for record in run["results"]]}
+        del broken["results"][0]["eval"]
+        broken["results"][0]["error"] = "eval: ZeroDivisionError"
+        del broken["results"][1]["lex"]
+        regressions = find_regressions(broken, run, 0.5)
+        self.assertEqual(
+            [(record, phase, new) for (record, phase, _, new) in regressions],
+            [
+                (broken["results"][0], "eval", None),
+                (broken["results"][1], "lex", None),
+            ],
+        )
+        self.assertEqual(find_regressions(run, broken, 0.5), [])
+
+
+class TestMemory(unittest.TestCase):
+    def test_run_and_compare(self):
+        run = run_memory([20], shapes=("left_chain", "nested_parens"))
+        self.assertEqual(len(run["results"]), 2 * len(PARSERS))
+        for record in run["results"]:
+            for measure in MEASURES:
+                self.assertGreaterEqual(record[measure], 0)
+            self.assertGreaterEqual(record["parse_peak"], record["parse_retained"])
+            self.assertGreater(record["parse_retained"], 0)
+        self.assertEqual(find_regressions(run, run, 0.1, MEASURES), [])
+
+        bigger = {
+            "results": [
+                dict(record, lex_retained=record["lex_retained"] * 2)
+                for record in run["results"]
+            ]
+        }
+        regressions = find_regressions(bigger, run, 0.5, MEASURES)
+        self.assertEqual(
+            {measure for (_, measure, _, _) in regressions}, {"lex_retained"}
+        )
+
+    def test_node_bytes(self):
+        sizes = node_bytes(FROZEN_NODES, count=100)
+        self.assertEqual(
+            list(sizes),
+            ["FrozenBinopNode", "FrozenUniopNode", "FrozenValNode", "FrozenVarNode"],
+        )
+        for sizeof, traced in sizes.values():
+            self.assertGreater(traced, 0)
+            self.assertLessEqual(traced, 2 * sizeof)
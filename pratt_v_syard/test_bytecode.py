@@ -0,0 +1,111 @@
+"""
+Unittests for postfix programs and the stack machine that runs them
+"""
+
+import pickle
+import random
+import unittest
+
+from .bytecode import Program, compile_program, parse_program
+from .op_base import EvalVisitor, Lexer, Lispish
+from .parsers import PARSERS, drive_parse
+from .test_grammar import CUSTOM
+from .test_parsers import LEXERS
+
+EXPRS = (
+    "2**3**2",
+    "( 2   ** 3 ) ** 2",
+    "-2**-3",
+    "x * (1 + 2 * 3 - ~4 % 3 << 2 | 7 ^ 5 & 3) / y",
+    "x - x * 2 - 2",
+)
+ENV = {"x": 3, "y": 4}
+
+
+def outcome(func):
+    try:
+        return func()
+    except (ArithmeticError, KeyError, TypeError, ValueError) as err:
+        return (type(err), str(err))
+
+
+class TestBytecode(unittest.TestCase):
+    def test_matches_tree(self):
+        for expr in EXPRS:
+            tree = drive_parse(PARSERS[0][1], expr)
+            for lexer_class in LEXERS:
+                with self.subTest(expr, lexer=lexer_class.__name__):
+                    program = compile_program(expr, lexer_class)
+                    self.assertEqual(program.lispish(), tree.accept(Lispish()))
+                    self.assertEqual(program.run(ENV), tree.accept(EvalVisitor(ENV)))
+            for pname, pfunc in PARSERS:
+                with self.subTest(pname, expr=expr):
+                    program = Program.from_node(drive_parse(pfunc, expr))
+                    self.assertEqual(program.code, compile_program(expr).code)
+                    self.assertEqual(program.slots, compile_program(expr).slots)
+
+    def test_layout(self):
+        program = compile_program("x - x * 2 - 2")
+        self.assertEqual(program.slots, ["x", 2])
+        self.assertEqual(program.variables, [(0, "x")])
+        ops = {name: op for (op, name) in enumerate(program.grammar.names)}
+        self.assertEqual(
+            program.code.tolist(), [~0, ~0, ~1, ops["*"], ops["-"], ~1, ops["-"]]
+        )
+
+    def test_parse_errors(self):
+        rng = random.Random(18)
+        pieces = ("1", "x", "(", ")", "+", "-", "~", "**", "&", "$", " ")
+        for _ in range(2000):
+            expr = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 9)))
+            with self.subTest(expr=expr):
+                self.assertEqual(
+                    outcome(lambda: compile_program.__wrapped__(expr).lispish()),
+                    outcome(lambda: drive_parse(PARSERS[0][1], expr).accept(Lispish())),
+                )
+
+    def test_eval_errors(self):
+        for expr, env in (
+            ("1 / 0 + x", {}),
+            ("x + 1 / 0", {}),
+            ("x + y", {"x": 1}),
+            ("x ** 2 - (1 << -1)", {"x": 2}),
+            ("~x", {"x": 1.5}),
+            ("x", None),
+        ):
+            with self.subTest(expr, env=env):
+                tree = drive_parse(PARSERS[0][1], expr)
+                self.assertEqual(
+                    outcome(lambda: compile_program(expr).run(env)),
+                    outcome(lambda: tree.accept(EvalVisitor(env))),
+                )
+
+    def test_non_int_literals(self):
+        tree = drive_parse(PARSERS[0][1], "1 + 2")
+        tree.left.val = -0.0
+        tree.right.val = 0
+        program = Program.from_node(tree)
+        self.assertEqual(program.slots, [-0.0, 0])
+        self.assertEqual(repr(program.run()), "0.0")
+
+    def test_pickle(self):
+        program = compile_program(EXPRS[3])
+        loaded = pickle.loads(pickle.dumps(program))
+        self.assertEqual(loaded.code, program.code)
+        self.assertEqual(loaded.lispish(), program.lispish())
+        self.assertEqual(loaded.run(ENV), program.run(ENV))
+        # A loaded program still shares slots as it is added to
+        loaded.emit_var("y")
+        loaded.emit_val(7)
+        self.assertEqual(loaded.slots, program.slots)
+
+    def test_cache(self):
+        self.assertIs(compile_program(EXPRS[0]), compile_program(EXPRS[0]))
+
+    def test_grammar(self):
+        tokens = Lexer("7 mod 4 // 2 + !0", grammar=CUSTOM)
+        program = parse_program(tokens, CUSTOM)
+        self.assertEqual(program.lispish(), "(+ (// (mod 7 4) 2) (_! 0))")
+        self.assertEqual(program.run(), 2)
+        loaded = pickle.loads(pickle.dumps(program))
+        self.assertEqual(loaded.run(), 2)
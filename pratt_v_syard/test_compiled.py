@@ -0,0 +1,63 @@
+"""
+Unittests for compiling trees to Python functions
+"""
+
+import operator
+import unittest
+
+from .compiled import compile_expr, compile_tree
+from .op_base import BinopNode, EvalVisitor, UniopNode, ValNode
+from .parsers import PARSERS, drive_parse
+from .test_grammar import CUSTOM
+
+EXPRS = (
+    "2**3**2",
+    "-2**-3",
+    "1 + 2 * 3 - ~4 % 3 << 2 | 7 ^ 5 & 3",
+    "7 / 2 - -(3 >> 1)",
+    "42",
+)
+
+
+class TestCompiled(unittest.TestCase):
+    def test_matches_eval_visitor(self):
+        for pname, pfunc in PARSERS:
+            for expr in EXPRS:
+                with self.subTest(pname, expr=expr):
+                    tree = drive_parse(pfunc, expr)
+                    self.assertEqual(compile_tree(tree)(), tree.accept(EvalVisitor()))
+
+    def test_errors_at_call_time(self):
+        compiled = compile_expr(PARSERS[0][1], "1 + 2 % (3 - 3)")
+        with self.assertRaises(ZeroDivisionError):
+            compiled()
+
+    def test_deep_tree(self):
+        tree = drive_parse(PARSERS[0][1], " + ".join(["1"] * 20000))
+        self.assertEqual(compile_tree(tree)(), 20000)
+
+    def test_other_functions_and_values(self):
+        tree = BinopNode("max", max, UniopNode("abs", abs, ValNode(-3)), ValNode(2.5))
+        self.assertEqual(compile_tree(tree)(), 3)
+
+    def test_caching(self):
+        tree = drive_parse(PARSERS[0][1], "1 + 2")
+        self.assertIs(compile_tree(tree), compile_tree(tree))
+        self.assertIs(
+            compile_expr(PARSERS[0][1], "3 * 4"), compile_expr(PARSERS[0][1], "3 * 4")
+        )
+
+    def test_cache_follows_edits(self):
+        tree = drive_parse(PARSERS[0][1], "1 - 2")
+        self.assertEqual(compile_tree(tree)(), -1)
+        tree.right = ValNode(5)
+        self.assertEqual(compile_tree(tree)(), -4)
+        # Equal values of different types get their own functions
+        one = compile_tree(BinopNode("-", operator.sub, ValNode(0), ValNode(-1)))
+        self.assertIs(type(one()), int)
+        one = compile_tree(BinopNode("-", operator.sub, ValNode(0), ValNode(-1.0)))
+        self.assertIs(type(one()), float)
+
+    def test_grammar(self):
+        compiled = compile_expr(PARSERS[0][1], "7 // 2 mod 2", grammar=CUSTOM)
+        self.assertEqual(compiled(), 1)
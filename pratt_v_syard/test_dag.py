@@ -0,0 +1,77 @@
+"""
+Unittests for hash-consed parse DAGs
+"""
+
+import operator
+import unittest
+
+from .dag import MemoEvalVisitor, NodeInterner, parse_dag
+from .op_base import EvalVisitor, Lispish
+from .parsers import PARSERS, drive_parse
+from .test_grammar import CUSTOM
+
+EXPR = "(2 ** 64 - 1) & 7 + (2 ** 64 - 1) * -(2 ** 64 - 1) % 3"
+
+
+class TestDag(unittest.TestCase):
+    def test_matches_tree(self):
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                tree = drive_parse(pfunc, EXPR)
+                dag = parse_dag(pfunc, EXPR)
+                self.assertEqual(dag.accept(Lispish()), tree.accept(Lispish()))
+                self.assertEqual(
+                    dag.accept(MemoEvalVisitor()), tree.accept(EvalVisitor())
+                )
+
+    def test_sharing(self):
+        interner = NodeInterner()
+        first = parse_dag(
+            PARSERS[0][1], "(2 ** 64 - 1) ^ (2 ** 64 - 1)", interner=interner
+        )
+        self.assertIs(first.left, first.right)
+        # 2, 64, 1, **, -, ^
+        self.assertEqual(len(interner), 6)
+        second = parse_dag(PARSERS[1][1], "2 ** 64 - 1", interner=interner)
+        self.assertIs(second, first.left)
+        self.assertEqual(len(interner), 6)
+        self.assertIsNot(parse_dag(PARSERS[0][1], "2 ** 64 - 1"), second)
+
+    def test_memo_evaluates_shared_node_once(self):
+        calls = []
+
+        def counting_pow(left, right):
+            calls.append((left, right))
+            return left**right
+
+        interner = NodeInterner()
+        power = interner.binop("**", counting_pow, interner.val(2), interner.val(64))
+        total = interner.binop("+", int.__add__, power, power)
+        self.assertEqual(total.accept(MemoEvalVisitor()), 2 * 2**64)
+        self.assertEqual(calls, [(2, 64)])
+
+    def test_keys(self):
+        interner = NodeInterner()
+        one = interner.val(1)
+        self.assertIsNot(interner.val(1.0), one)
+        self.assertIsNot(interner.val(True), one)
+        self.assertIs(interner.val(1), one)
+        # Same name, different function
+        plus = interner.binop("+", operator.add, one, one)
+        self.assertIsNot(interner.binop("+", operator.sub, one, one), plus)
+        self.assertIsNot(
+            interner.uniop("-", operator.neg, one), interner.uniop("-", abs, one)
+        )
+        self.assertEqual(plus.accept(EvalVisitor()), 2)
+
+    def test_frozen(self):
+        dag = parse_dag(PARSERS[0][1], "x * x")
+        with self.assertRaises(AttributeError):
+            dag.left = dag.right
+        with self.assertRaises(AttributeError):
+            dag.left.name = "y"
+
+    def test_grammar(self):
+        dag = parse_dag(PARSERS[0][1], "7 // 2 mod 2 + 7 // 2", grammar=CUSTOM)
+        self.assertIs(dag.left.left, dag.right)
+        self.assertEqual(dag.accept(MemoEvalVisitor()), 4)
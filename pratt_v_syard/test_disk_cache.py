@@ -0,0 +1,204 @@
+"""
+Unittests for the persistent SQLite parse and output cache
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from .batch import output_many
+from .disk_cache import (
+    CachedError,
+    CachedResult,
+    DiskCache,
+    error_name,
+    output_kind,
+)
+from .limits import DEFAULT_LIMITS, Limits
+from .op_base import Lispish
+from .parsers import PARSERS
+from .test_grammar import CUSTOM
+
+EXPRS = ["1 + 2", "4 + 5 9", "2 ** 10", "1 / 0", "x * 3", "(1", "-2**-3", "1 ~ 2"]
+
+
+def outputs(results):
+    return [
+        (result.output, None if result.error is None else error_name(result.error))
+        for result in results
+    ]
+
+
+def fill(path, start):
+    """
+    Put a thousand entries, overlapping with other calls, from another
+    process
+    """
+    cache = DiskCache(path)
+    items = [
+        (str(i), CachedResult(None, str(i), None)) for i in range(start, start + 1000)
+    ]
+    for chunk in range(0, len(items), 100):
+        cache.put_many(PARSERS[0][1], items[chunk : chunk + 100], "value")
+    return [hit.output for hit in cache.get_many(PARSERS[0][1], [str(start)], "value")]
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "cache.sqlite")
+
+    def open(self, **kwargs):
+        cache = DiskCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_parse_many(self):
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                cache = self.open()
+                first = cache.parse_many(pfunc, EXPRS)
+                self.assertEqual(cache.stats()[:2], (0, len(EXPRS)))
+                again = self.open().parse_many(pfunc, EXPRS)
+                for old, new in zip(first, again):
+                    if old.error is None:
+                        self.assertIsNone(new.error)
+                        self.assertEqual(
+                            new.tree.accept(Lispish()), old.tree.accept(Lispish())
+                        )
+                    else:
+                        self.assertIsInstance(new.error, CachedError)
+                        self.assertEqual(str(new.error), str(old.error))
+                        self.assertEqual(error_name(new.error), error_name(old.error))
+                self.assertEqual(
+                    cache.stats().entries,
+                    len(EXPRS) * (1 + PARSERS.index((pname, pfunc))),
+                )
+
+    def test_keys(self):
+        cache = self.open()
+        sy_parse, pratt_parse = PARSERS[0][1], PARSERS[1][1]
+        cache.put(sy_parse, "1 + 2", CachedResult(None, "3", None), "value")
+        self.assertEqual(cache.get(sy_parse, "1 + 2", "value").output, "3")
+        self.assertIsNone(cache.get(sy_parse, "1 + 2"))
+        self.assertIsNone(cache.get(pratt_parse, "1 + 2", "value"))
+        self.assertIsNone(cache.get(sy_parse, "1 +  2", "value"))
+        custom = self.open(grammar=CUSTOM)
+        self.assertIsNone(custom.get(sy_parse, "1 + 2", "value"))
+        self.assertNotEqual(
+            output_kind("value", {"x": 1}, DEFAULT_LIMITS),
+            output_kind("value", {"x": 2}, DEFAULT_LIMITS),
+        )
+        self.assertEqual(output_kind("lispish", {"x": 1}, DEFAULT_LIMITS), "lispish")
+
+    def test_bulk_queries(self):
+        cache = self.open()
+        sources = [str(i) for i in range(2000)]
+        cache.put_many(
+            PARSERS[0][1], [(s, CachedResult(None, s, None)) for s in sources], "value"
+        )
+        statements = []
+        cache._connect().set_trace_callback(statements.append)
+        hits = cache.get_many(PARSERS[0][1], sources + ["x"], "value")
+        self.assertEqual([hit.output for hit in hits[:-1]], sources)
+        self.assertIsNone(hits[-1])
+        self.assertEqual(len(statements), 5)
+
+    def test_eviction(self):
+        cache = self.open(max_bytes=20_000)
+        pfunc = PARSERS[0][1]
+        sources = [str(i) for i in range(30)]
+        for source in sources[:15]:
+            cache.put(pfunc, source, CachedResult(None, "x" * 1000, None))
+        cache._connect().execute("UPDATE entries SET used = used - 3600")
+        # A hit makes "0" the most recently used of the first fifteen
+        self.assertIsNotNone(cache.get(pfunc, "0"))
+        for source in sources[15:]:
+            cache.put(pfunc, source, CachedResult(None, "x" * 1000, None))
+        stats = cache.stats()
+        self.assertLessEqual(stats.payload_bytes, 20_000)
+        self.assertGreater(stats.evictions, 10)
+        self.assertEqual(stats.entries, 30 - stats.evictions)
+        hits = cache.get_many(pfunc, sources)
+        self.assertIsNotNone(hits[0])
+        self.assertEqual(hits[1:15].count(None), stats.evictions)
+        cache.put(pfunc, "29", CachedResult(None, "", None))
+        self.assertEqual(cache.stats().payload_bytes, stats.payload_bytes - 1000)
+        cache.clear()
+        self.assertEqual(cache.stats()[3:], (0, 0))
+
+    def test_processes(self):
+        cache = self.open()
+        self.assertEqual(pickle.loads(pickle.dumps(cache)).path, self.path)
+        with ProcessPoolExecutor(4) as executor:
+            firsts = list(executor.map(fill, [self.path] * 4, range(0, 2000, 500)))
+        self.assertEqual(firsts, [["0"], ["500"], ["1000"], ["1500"]])
+        self.assertEqual(cache.stats().entries, 2500)
+
+    def test_schema_version(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA user_version = 99")
+        conn.close()
+        with self.assertRaisesRegex(ValueError, "schema version 99"):
+            self.open().stats()
+
+    def test_output_many(self):
+        expected = outputs(output_many(EXPRS, workers=1, env={"x": 2}))
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                cache = self.open()
+                cache.clear()
+                for _ in range(2):
+                    results = output_many(
+                        EXPRS, workers=workers, chunksize=3, env={"x": 2}, cache=cache
+                    )
+                    self.assertEqual(outputs(results), expected)
+                self.assertEqual(cache.stats().entries, len(EXPRS))
+        cache = self.open()
+        results = output_many(
+            EXPRS, mode="lispish", workers=1, env={"x": 2}, cache=cache
+        )
+        self.assertEqual(cache.stats().hits, 0)
+        results = output_many(EXPRS, workers=1, env={"x": 3}, cache=cache)
+        self.assertEqual(list(results)[4].output, "9")
+
+    def test_deadlines_not_stored(self):
+        cache = self.open()
+        limits = Limits(timeout=0.0)
+        deep = " + ".join(["1"] * 2000)
+        results = list(output_many([deep], workers=1, limits=limits, cache=cache))
+        self.assertEqual(error_name(results[0].error), "DeadlineExceeded")
+        self.assertEqual(cache.stats().entries, 0)
+
+    def test_recursion_not_stored(self):
+        cache = self.open()
+        deep = "(" * 1500 + "1" + ")" * 1500
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                error = cache.parse_many(pfunc, [deep])[0].error
+                if isinstance(error, RecursionError):
+                    self.assertIsNone(cache.get(pfunc, deep))
+        results = cache.outputs([deep], PARSERS[1][1], "value", None, DEFAULT_LIMITS)
+        self.assertIsInstance(results[0].error, RecursionError)
+        self.assertEqual(cache.get_many(PARSERS[1][1], [deep], "value"), [None])
+        self.assertEqual(
+            cache.outputs([], PARSERS[0][1], "value", None, DEFAULT_LIMITS), []
+        )
+
+    def test_command_line(self):
+        args = [sys.executable, "-m", "pratt_v_syard", "--cache", self.path]
+        runs = [
+            subprocess.run(
+                args, input="\n".join(EXPRS) + "\n", capture_output=True, text=True
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(runs[0].stdout, runs[1].stdout)
+        self.assertIn("<stdin>:4: ZeroDivisionError: division by zero", runs[1].stdout)
+        self.assertEqual(self.open().stats().entries, len(EXPRS))
@@ -0,0 +1,73 @@
+"""
+Unittests for the flat postfix-array trees
+"""
+
+import pickle
+import unittest
+
+from .flat_tree import FlatTree, VAL_OPCODE, parse_flat
+from .op_base import EvalVisitor, Lispish
+from .parsers import PARSERS, drive_parse
+from .test_grammar import CUSTOM, GENERATED
+
+EXPRS = (
+    "2**3**2",
+    "( 2   ** 3 ) ** 2",
+    "-2**-3",
+    "1 + 2 * 3 - ~4 % 3 << 2 | 7 ^ 5 & 3",
+)
+
+
+class TestFlatTree(unittest.TestCase):
+    def test_matches_node_tree(self):
+        for pname, pfunc in PARSERS:
+            for expr in EXPRS:
+                with self.subTest(pname, expr=expr):
+                    tree = drive_parse(pfunc, expr)
+                    flat = parse_flat(pfunc, expr)
+                    self.assertEqual(flat.lispish(), tree.accept(Lispish()))
+                    self.assertEqual(flat.evaluate(), tree.accept(EvalVisitor()))
+                    self.assertEqual(
+                        flat.node().accept(Lispish()), tree.accept(Lispish())
+                    )
+                    self.assertEqual(
+                        FlatTree.from_node(tree).opcodes.tolist(),
+                        flat.opcodes.tolist(),
+                    )
+
+    def test_postfix_layout(self):
+        flat = parse_flat(PARSERS[0][1], "2 * 3 + 2")
+        self.assertEqual(len(flat), 5)
+        self.assertEqual(flat.literals, [2, 3])
+        self.assertEqual(flat.opcodes[0], VAL_OPCODE)
+        self.assertEqual(flat.node().name, "+")
+        self.assertEqual(flat.node().left.name, "*")
+        self.assertEqual(flat.node().right.val, 2)
+
+    def test_errors(self):
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                with self.assertRaisesRegex(ValueError, "Expected operator at 6"):
+                    parse_flat(pfunc, "4 + 5 9")
+
+    def test_grammar(self):
+        expr = "!0 + 7 // 2 mod 3 ** x"
+        for pname, pfunc in PARSERS:
+            if pfunc in GENERATED:
+                continue
+            with self.subTest(pname):
+                tree = drive_parse(pfunc, expr, grammar=CUSTOM)
+                flat = parse_flat(pfunc, expr, grammar=CUSTOM)
+                self.assertEqual(flat.lispish(), tree.accept(Lispish()))
+                self.assertEqual(flat.evaluate({"x": 2}), 4)
+                self.assertEqual(flat.node().accept(EvalVisitor({"x": 2})), 4)
+                self.assertEqual(
+                    FlatTree.from_node(tree, CUSTOM).opcodes.tolist(),
+                    flat.opcodes.tolist(),
+                )
+                self.assertEqual(
+                    pickle.loads(pickle.dumps(flat)).lispish(), flat.lispish()
+                )
+        self.assertEqual(flat.opcodes[-2], CUSTOM.names.index("mod"))
+        with self.assertRaisesRegex(ValueError, "Operator _! isn't in the grammar"):
+            FlatTree.from_node(tree)
@@ -0,0 +1,36 @@
+"""
+Check that the generated parsers are in step with the operator table
+"""
+
+import subprocess
+import sys
+import unittest
+
+from .gen_parsers import GENERATED_PATH, generate
+
+
+class TestGenerated(unittest.TestCase):
+    def test_up_to_date(self):
+        with open(GENERATED_PATH, encoding="utf-8") as generated:
+            self.assertEqual(
+                generated.read(),
+                generate(),
+                "Rerun python -m pratt_v_syard.gen_parsers",
+            )
+
+    def test_stale_tables(self):
+        # Change OPERATORS before anything imports the generated parsers
+        code = (
+            "from pratt_v_syard import op_base\n"
+            "op_base.OPERATORS['+'] = op_base.OPERATORS['+']._replace(left_precedence=2)\n"
+            "from pratt_v_syard.generated import sy_parse\n"
+            "from pratt_v_syard.parsers import PARSERS, drive_parse\n"
+            "print(len(PARSERS), ' '.join(name for name, _ in PARSERS))\n"
+            "drive_parse(sy_parse, '1 + 2')\n"
+        )
+        done = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=False
+        )
+        self.assertNotIn("Generated", done.stdout)
+        self.assertIn("Leaving the generated parsers out of PARSERS", done.stderr)
+        self.assertIn("ValueError: OPERATORS has changed", done.stderr)
@@ -0,0 +1,87 @@
+"""
+Unittests for parsing with grammars other than the default one
+"""
+
+import operator
+import pickle
+import re
+import unittest
+
+from .generated import pratt_parse as gen_pratt_parse, sy_parse as gen_sy_parse
+from .op_base import EvalVisitor, GRAMMAR, LEX_RE, Grammar, Lispish, OpInfo, OPERATORS
+from .parsers import PARSERS, drive_parse
+from .test_parsers import LEXERS
+
+GENERATED = (gen_pratt_parse, gen_sy_parse)
+BITWISE = GRAMMAR.subset(["|", "^", "&", "_~"])
+CUSTOM = Grammar(
+    dict(
+        OPERATORS,
+        **{
+            "//": OpInfo(operator.floordiv, 11, 12),
+            "mod": OpInfo(operator.mod, 11, 12),
+            "_!": OpInfo(operator.not_, 14, 13),
+        },
+    )
+)
+
+
+class TestGrammar(unittest.TestCase):
+    def check_all(self, grammar, exprstr, expected, value):
+        for pname, pfunc in PARSERS:
+            if pfunc in GENERATED:
+                continue
+            for lexer_class in LEXERS:
+                with self.subTest(pname, expr=exprstr, lexer=lexer_class.__name__):
+                    tree = drive_parse(pfunc, exprstr, lexer_class, grammar=grammar)
+                    self.assertEqual(tree.accept(Lispish()), expected)
+                    self.assertEqual(tree.accept(EvalVisitor({"modulo": 9})), value)
+
+    def check_errors(self, grammar, exprstr, errorstr):
+        for pname, pfunc in PARSERS:
+            if pfunc in GENERATED:
+                continue
+            for lexer_class in LEXERS:
+                with self.subTest(pname, expr=exprstr, lexer=lexer_class.__name__):
+                    with self.assertRaisesRegex(ValueError, re.escape(errorstr)):
+                        drive_parse(pfunc, exprstr, lexer_class, grammar=grammar)
+
+    def test_default(self):
+        self.assertEqual(Grammar(OPERATORS), GRAMMAR)
+        self.assertIs(LEX_RE, GRAMMAR.lex_re)
+        self.assertEqual((GRAMMAR.min_precedence, GRAMMAR.max_precedence), (1, 14))
+        self.assertEqual(GRAMMAR.uniop_ids, {"+": 10, "-": 11, "~": 12})
+        self.assertEqual(GRAMMAR.names[GRAMMAR.binop_ids["**"]], "**")
+
+    def test_subset(self):
+        self.check_all(BITWISE, "1 | 6 & ~3", "(| 1 (& 6 (_~ 3)))", 5)
+        self.check_errors(BITWISE, "1 + 2", "Unrecognized token + at 2")
+        self.check_errors(BITWISE, "-2", "Unrecognized token - at 0")
+        self.check_errors(BITWISE, "1 | & 2", "Unknown unary operator & at 4")
+
+    def test_custom_operators(self):
+        self.check_all(CUSTOM, "7 // 2 mod 2", "(mod (// 7 2) 2)", 1)
+        self.check_all(CUSTOM, "modulo mod 2 ** 2", "(mod modulo (** 2 2))", 1)
+        self.check_all(CUSTOM, "!0 + 7/2", "(+ (_! 0) (/ 7 2))", 4.5)
+        self.check_errors(CUSTOM, "7 mod", "Unexpected EOF")
+
+    def test_pickle(self):
+        loaded = pickle.loads(pickle.dumps(CUSTOM))
+        self.assertEqual(loaded, CUSTOM)
+        self.assertEqual(hash(loaded), hash(CUSTOM))
+        self.assertNotEqual(loaded, GRAMMAR)
+        self.assertEqual(loaded.lex_re.pattern, CUSTOM.lex_re.pattern)
+        tree = drive_parse(PARSERS[0][1], "9 // 2", grammar=loaded)
+        self.assertEqual(tree.accept(EvalVisitor()), 4)
+
+    def test_generated_parsers(self):
+        default = pickle.loads(pickle.dumps(GRAMMAR))
+        for pfunc in GENERATED:
+            tree = drive_parse(pfunc, "1 + 2 * 3", grammar=default)
+            self.assertEqual(tree.accept(Lispish()), "(+ 1 (* 2 3))")
+            with self.assertRaisesRegex(ValueError, "Generated parsers can't parse"):
+                drive_parse(pfunc, "1 | 2", grammar=BITWISE)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            Grammar({})
@@ -0,0 +1,106 @@
+"""
+Unittests for incremental reparsing, checked against fresh parses
+"""
+
+import random
+import unittest
+
+from .benchmarks.shapes import BINOPS, random_mix
+from .incremental import PARSE_ERRORS, UNSET, Document
+from .op_base import EvalVisitor, Lispish
+from .parsers import PARSERS, drive_parse
+
+ENV = {"x": 3}
+SNIPPETS = ["1", "2", "0", " ", "+", "*", "**", "-", "~", "/", "(", ")", "x", "y", "$"]
+
+
+def fresh_outcome(text):
+    try:
+        tree = drive_parse(PARSERS[0][1], text)
+    except (KeyError, ValueError) as err:
+        return ("parse error", type(err), str(err))
+    try:
+        value = tree.accept(EvalVisitor(ENV))
+    except (ArithmeticError, TypeError, ValueError) as err:
+        value = ("eval error", type(err), str(err))
+    return (tree.accept(Lispish()), value)
+
+
+def edit_outcome(document, offset, deleted, inserted):
+    try:
+        tree = document.edit(offset, deleted, inserted)
+    except PARSE_ERRORS as err:
+        return ("parse error", type(err), str(err))
+    try:
+        value = document.evaluate()
+    except (ArithmeticError, TypeError, ValueError) as err:
+        value = ("eval error", type(err), str(err))
+    return (tree.accept(Lispish()), value)
+
+
+class TestIncremental(unittest.TestCase):
+    def test_random_edits(self):
+        rng = random.Random(0)
+        for seed in range(60):
+            document = Document(random_mix(rng.randrange(40), seed, BINOPS), ENV)
+            for _ in range(20):
+                offset = rng.randrange(len(document.text) + 1)
+                deleted = rng.randrange(min(3, len(document.text) - offset) + 1)
+                inserted = "".join(rng.choices(SNIPPETS, k=rng.randrange(3)))
+                old_text = document.text
+                with self.subTest(text=old_text, edit=(offset, deleted, inserted)):
+                    actual = edit_outcome(document, offset, deleted, inserted)
+                    self.assertEqual(actual, fresh_outcome(document.text))
+
+    def test_errors(self):
+        document = Document("(1 + 2) * 3")
+        with self.assertRaisesRegex(ValueError, "Unclosed left paren beginning at 0"):
+            document.edit(6, 1, "")
+        self.assertIsNone(document.tree)
+        with self.assertRaisesRegex(ValueError, "Unclosed left paren beginning at 0"):
+            document.evaluate()
+        document.edit(10, 0, ")")
+        self.assertEqual(document.text, "(1 + 2 * 3)")
+        self.assertEqual(document.evaluate(), 7)
+        with self.assertRaisesRegex(ValueError, r"Unrecognized token \$ at 1"):
+            document.edit(1, 0, "$")
+        self.assertEqual(Document("1 +").error.args, ("Unexpected EOF",))
+
+    def test_spans(self):
+        document = Document("x * (1 + 22)", ENV)
+        tree = document.tree
+        self.assertEqual(tree.span, (0, 12))
+        self.assertEqual(tree.right.span, (5, 11))
+        self.assertEqual(tree.right.right.span, (9, 11))
+        document.edit(0, 0, "  ")
+        self.assertEqual(document.tree.right.right.span, (11, 13))
+
+    def test_reuse(self):
+        document = Document("(1 + 2) * (3 + 4) - 5", ENV)
+        self.assertEqual(document.evaluate(), 16)
+        left = document.tree.left.left
+        self.assertEqual(left.value, 3)
+        # Editing the 4 rebuilds only the nodes above it
+        document.edit(15, 1, "6")
+        self.assertIs(document.tree.left.left, left)
+        self.assertEqual(document.tree.right.value, 5)
+        self.assertIs(document.tree.left.right.value, UNSET)
+        self.assertEqual(document.evaluate(), 22)
+
+    def test_bind(self):
+        document = Document("(x + 1) * (y - 2) + 3", {"x": 1, "y": 5})
+        self.assertEqual(document.evaluate(), 9)
+        right = document.tree.left.right
+        document.bind({"x": 10})
+        self.assertIs(document.tree.value, UNSET)
+        self.assertIs(document.tree.left.left.value, UNSET)
+        self.assertEqual(right.value, 3)
+        self.assertEqual(document.evaluate(), 36)
+        # Memoized parses reused after an edit don't bring back old values
+        document.edit(0, 0, "2 * ")
+        self.assertEqual(document.evaluate(), 69)
+        document.bind({"y": 3, "z": 0})
+        self.assertEqual(document.evaluate(), 25)
+        document.edit(0, 4, "")
+        self.assertEqual(document.evaluate(), 14)
+        self.assertEqual(document.env, {"x": 10, "y": 3, "z": 0})
@@ -0,0 +1,74 @@
+"""
+Unittests for parser instrumentation
+"""
+
+import json
+import sys
+import unittest
+
+from .compiled import postorder
+from .instrument import DEPTHS, StatsSummary, instrumented_parse, summarize
+from .instrument import summaries_json
+from .op_base import Lispish, StreamLexer
+from .parsers import PARSERS, drive_parse
+
+EXPR = "-(1 + 2) * 3 ** -x - ((4 & y) | 5)"
+
+
+class TestInstrument(unittest.TestCase):
+    def test_every_parser(self):
+        expected = drive_parse(PARSERS[0][1], EXPR).accept(Lispish())
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                tree, stats = instrumented_parse(pfunc, EXPR, pname)
+                self.assertEqual(tree.accept(Lispish()), expected)
+                self.assertEqual(stats.parser, pname)
+                counts = stats.counts
+                self.assertEqual(counts["tokens"], 21)
+                self.assertEqual(counts["nodes"], sum(1 for _ in postorder(tree)))
+                # Every token, and the end of input, is polled once
+                self.assertEqual(counts["polls"], counts["tokens"] + 1)
+                self.assertGreaterEqual(stats.max_depths["recursion"], 1)
+
+    def test_depths_follow_nesting(self):
+        parsers = dict(PARSERS)
+        for depth in (5, 20):
+            exprstr = "(" * depth + "1" + ")" * depth
+            _, stats = instrumented_parse(parsers["Basic Pratt Parsing"], exprstr)
+            self.assertGreater(stats.max_depths["recursion"], depth)
+            self.assertEqual(stats.counts["closures"], 0)
+            _, stats = instrumented_parse(parsers["Shunting Yard"], exprstr)
+            self.assertEqual(stats.max_depths["recursion"], 2)
+            # The parens, and the atom on top of them
+            self.assertEqual(stats.max_depths["func_stack"], depth + 1)
+            self.assertGreater(stats.counts["closures"], 0)
+            _, stats = instrumented_parse(parsers["Stackless Pratt Parsing"], exprstr)
+            self.assertGreater(stats.max_depths["local_stack"], depth)
+
+    def test_trace_restored(self):
+        def tracer(frame, event, arg):
+            return None
+
+        old_trace = sys.gettrace()
+        sys.settrace(tracer)
+        try:
+            instrumented_parse(PARSERS[1][1], EXPR, lexer_class=StreamLexer)
+            self.assertIs(sys.gettrace(), tracer)
+            with self.assertRaises(ValueError):
+                instrumented_parse(PARSERS[1][1], "1 +")
+            self.assertIs(sys.gettrace(), tracer)
+        finally:
+            sys.settrace(old_trace)
+
+    def test_summary(self):
+        summaries = summarize(PARSERS[:2], ["1 + 2", "((3))", "1 +"])
+        self.assertEqual([summary.parses for summary in summaries], [2, 2])
+        self.assertEqual([summary.errors for summary in summaries], [1, 1])
+        self.assertEqual(summaries[0].counts["tokens"], 8)
+        self.assertEqual(summaries[0].max_depths["func_stack"], 3)
+        exported = json.loads(summaries_json(summaries))
+        self.assertEqual(exported[1], summaries[1].as_dict())
+        self.assertEqual(set(exported[1]["max_depths"]), set(DEPTHS))
+
+        summary = StatsSummary("empty")
+        self.assertEqual(summary.per_token("polls"), 0)
@@ -0,0 +1,103 @@
+"""
+Unittests for the lexers in op_base
+"""
+
+import io
+import mmap
+import unittest
+
+from .op_base import BytesLexer, LEX_RE, Lexer, StreamLexer, Token
+
+
+def summarize(lexer):
+    return [(tok.lastgroup, tok.group(tok.lastgroup), tok.start()) for tok in lexer]
+
+
+class TestStreamLexer(unittest.TestCase):
+    EXPR = "12 ** 3 << (45 - ~6) % 789 >> 1"
+
+    def test_matches_eager_lexer(self):
+        self.assertEqual(summarize(StreamLexer(self.EXPR)), summarize(Lexer(self.EXPR)))
+
+    def test_chunk_boundaries(self):
+        expected = summarize(Lexer(self.EXPR))
+        for size in range(1, len(self.EXPR) + 1):
+            chunks = [self.EXPR[i : i + size] for i in range(0, len(self.EXPR), size)]
+            with self.subTest(size=size):
+                self.assertEqual(summarize(StreamLexer(chunks)), expected)
+                self.assertEqual(
+                    summarize(StreamLexer(io.StringIO(self.EXPR), size)), expected
+                )
+
+    def test_peek_and_bool(self):
+        tokens = StreamLexer(iter(["1", "2 ", "", " +3"]))
+        self.assertTrue(tokens)
+        self.assertEqual(tokens.peek().group("num"), "12")
+        self.assertEqual(tokens.poll().group("num"), "12")
+        self.assertEqual(tokens.poll().start(), 4)
+        self.assertEqual(tokens.poll().group("num"), "3")
+        self.assertFalse(tokens)
+        self.assertIsNone(tokens.peek())
+        self.assertIsNone(tokens.poll())
+
+    def test_lexerr_reported_when_reached(self):
+        tokens = StreamLexer(["4 + 5", "x 6"])
+        self.assertEqual(
+            [tok.group() for tok in (tokens.poll(), tokens.poll())], ["4", "+"]
+        )
+        self.assertTrue(tokens)
+        with self.assertRaisesRegex(ValueError, "Unrecognized token 5x at 4"):
+            tokens.poll()
+
+
+class TestToken(unittest.TestCase):
+    def test_matches_regex_lexer(self):
+        expr = "12 ** 3 << (45 - ~6) % 789 >> 1 $"
+        tokens = map(Token.from_match, LEX_RE.finditer(expr))
+        self.assertEqual(summarize(tokens), summarize(Lexer(expr)))
+
+    def test_token_groups(self):
+        tok = Token.from_match(LEX_RE.search("  <<"))
+        self.assertEqual(tok.group("op"), "<<")
+        self.assertEqual(tok.group(), "<<")
+        self.assertIsNone(tok.group("num"))
+        self.assertIsNone(tok.group("paren"))
+        self.assertEqual((tok.start(), tok.start("op"), tok.end()), (2, 2, 4))
+        self.assertEqual(repr(tok), repr(Token("op", "<<", 2, 4)))
+
+
+class TestBytesLexer(unittest.TestCase):
+    EXPR = "12 ** 3 << (45 - ~6) % 789 >> x1 $"
+
+    def test_matches_regex_lexer(self):
+        expected = [
+            (kind, text.encode() if kind == "num" else text, pos)
+            for (kind, text, pos) in summarize(Lexer(self.EXPR))
+        ]
+        data = self.EXPR.encode()
+        for buffer in (data, bytearray(data), memoryview(data)):
+            with self.subTest(type(buffer).__name__):
+                self.assertEqual(summarize(BytesLexer(buffer)), expected)
+
+    def test_record_offsets(self):
+        data = b"junk\n7 + ($)\nmore"
+        tokens = BytesLexer(data, 5, 12)
+        self.assertEqual(
+            [(tok.group(), tok.start(), tok.end()) for tok in tokens],
+            [(b"7", 0, 1), ("+", 2, 3), ("(", 4, 5), ("$", 5, 6), (")", 6, 7)],
+        )
+        with self.assertRaisesRegex(ValueError, r"Unrecognized token \$ at 5"):
+            BytesLexer(data, 5, 12).clear_for_error()
+        # Numbers decode from their bytes, and nothing leaks past end
+        self.assertEqual(int(next(iter(BytesLexer(b"1234", 1, 3))).group()), 23)
+
+    def test_mmap(self):
+        with mmap.mmap(-1, 16) as buffer:
+            buffer.write(b"x ** 2\n")
+            self.assertEqual(
+                [tok.group() for tok in BytesLexer(buffer, 0, 6)], ["x", "**", b"2"]
+            )
+
+    def test_non_ascii(self):
+        tok = next(iter(BytesLexer("\u00e9".encode())))
+        self.assertEqual((tok.lastgroup, tok.group()), ("lexerr", "\\xc3"))
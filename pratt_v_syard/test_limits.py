@@ -0,0 +1,167 @@
+"""
+Unittests for resource-bounded evaluation and parse limits
+"""
+
+import operator
+import random
+import time
+import unittest
+
+from .benchmarks.shapes import int_mix, nested_parens, unary_runs
+from .limits import (
+    BoundedEvalVisitor,
+    DeadlineExceeded,
+    LimitExceeded,
+    Limits,
+    ParseLimitExceeded,
+    SizeLimitExceeded,
+    check_source,
+    estimate_bits,
+)
+from .op_base import EvalVisitor
+from .optimize import optimize
+from .parsers import PARSERS, drive_parse
+from .server import evaluate_request
+from .walker import walk
+
+
+class TestBoundedEval(unittest.TestCase):
+    def test_huge_power(self):
+        tree = drive_parse(PARSERS[0][1], "9**9**9**9")
+        start = time.perf_counter()
+        with self.assertRaises(SizeLimitExceeded):
+            tree.accept(BoundedEvalVisitor())
+        with self.assertRaises(SizeLimitExceeded):
+            walk(tree, BoundedEvalVisitor())
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_limits_each_operator(self):
+        limits = Limits(max_bits=1000)
+        for exprstr in (
+            "2 ** 1001",
+            "1 << 1000",
+            "(2 ** 600) * (2 ** 600)",
+            "x ** 999",
+        ):
+            with self.subTest(exprstr):
+                tree = drive_parse(PARSERS[0][1], exprstr)
+                with self.assertRaises(SizeLimitExceeded):
+                    walk(tree, BoundedEvalVisitor({"x": 3}, limits))
+        for exprstr in (
+            "2 ** 999",
+            "1 << 999",
+            "(2 ** 500) * (2 ** 498)",
+            "1 ** (10 ** 9)",
+        ):
+            with self.subTest(exprstr):
+                tree = drive_parse(PARSERS[0][1], exprstr)
+                self.assertEqual(
+                    walk(tree, BoundedEvalVisitor(None, limits)),
+                    tree.accept(EvalVisitor()),
+                )
+
+    def test_optimized(self):
+        limits = Limits(max_bits=1000, timeout=0.5)
+        for exprstr in (
+            "3 ** 20000000 % 0",
+            "3 ** 20000000 % x",
+            "2 ** 1001 % (1 - 1)",
+        ):
+            with self.subTest(exprstr):
+                tree = optimize(drive_parse(PARSERS[0][1], exprstr))
+                with self.assertRaises(SizeLimitExceeded):
+                    walk(tree, BoundedEvalVisitor({"x": 1.5}, limits))
+        for exprstr in ("3 ** 20000000 % 7", "2 ** 999 % x", "x * 4 % 8"):
+            with self.subTest(exprstr):
+                tree = drive_parse(PARSERS[0][1], exprstr)
+                self.assertEqual(
+                    walk(optimize(tree), BoundedEvalVisitor({"x": 7}, limits)),
+                    (
+                        pow(3, 20000000, 7)
+                        if "3 **" in exprstr
+                        else walk(tree, EvalVisitor({"x": 7}))
+                    ),
+                )
+
+    def test_estimates(self):
+        rng = random.Random(16)
+        for _ in range(300):
+            left = rng.randint(-(1 << 200), 1 << 200) >> rng.randint(0, 200)
+            right = rng.randint(0, 300)
+            for opfunc in (operator.mul, operator.lshift, operator.pow):
+                with self.subTest(opfunc.__name__, left=left, right=right):
+                    estimate = estimate_bits(opfunc, left, right)
+                    actual = opfunc(left, right).bit_length()
+                    if estimate is None:
+                        self.assertLessEqual(actual, max(left.bit_length(), 1))
+                    else:
+                        self.assertGreaterEqual(estimate + 1, actual)
+        self.assertIsNone(estimate_bits(operator.pow, 2.0, 10))
+        self.assertIsNone(estimate_bits(operator.pow, 2, -10))
+        self.assertIsNone(estimate_bits(operator.add, 2, 10))
+
+    def test_matches_eval_within_limits(self):
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                tree = drive_parse(PARSERS[0][1], int_mix(200, seed))
+                self.assertEqual(
+                    walk(tree, BoundedEvalVisitor()), walk(tree, EvalVisitor())
+                )
+
+    def test_deadline(self):
+        tree = drive_parse(PARSERS[0][1], int_mix(2000))
+        with self.assertRaises(DeadlineExceeded):
+            walk(tree, BoundedEvalVisitor(None, Limits(timeout=0)))
+        visitor = BoundedEvalVisitor()
+        visitor.cancel()
+        with self.assertRaises(DeadlineExceeded):
+            walk(tree, visitor)
+
+    def test_distinct_type(self):
+        for error in (SizeLimitExceeded, DeadlineExceeded, ParseLimitExceeded):
+            self.assertTrue(issubclass(error, LimitExceeded))
+            self.assertFalse(issubclass(error, (ArithmeticError, ValueError)))
+
+
+class TestCheckSource(unittest.TestCase):
+    def test_tokens(self):
+        limits = Limits(max_tokens=9)
+        check_source("1 + 2 + 3 + 4 + 5", limits)
+        with self.assertRaises(ParseLimitExceeded):
+            check_source("1 + 2 + 3 + 4 + 5 + 6", limits)
+        with self.assertRaises(ParseLimitExceeded):
+            drive_parse(PARSERS[0][1], "1 + 2 + 3 + 4 + 5 + 6", limits=limits)
+
+    def test_depth(self):
+        limits = Limits(max_depth=10)
+        for exprstr, ok in (
+            ("1" + " + 1" * 1000, True),
+            ("(" * 10 + "1" + ")" * 10, True),
+            ("(" * 11 + "1" + ")" * 11, False),
+            ("-" * 10 + "1 + " + "-" * 10 + "1", True),
+            ("-" * 11 + "1", False),
+            ("2" + " ** 2" * 10, True),
+            ("2" + " ** 2" * 11, False),
+            ("-(" * 5 + "1" + ")" * 5, True),
+            ("-(" * 5 + "-1" + ")" * 5, False),
+            ("(" * 9 + "1" + ")" * 9 + " + " + "(" * 9 + "1" + ")" * 9, True),
+        ):
+            with self.subTest(exprstr):
+                if ok:
+                    check_source(exprstr, limits)
+                else:
+                    with self.assertRaises(ParseLimitExceeded):
+                        check_source(exprstr, limits)
+
+    def test_recursive_parsers_within_default_depth(self):
+        for exprstr in (nested_parens(200), unary_runs(100), "2" + " ** 2" * 199):
+            check_source(exprstr)
+            for pname, pfunc in PARSERS:
+                with self.subTest(pname, exprstr=exprstr[:20]):
+                    drive_parse(pfunc, exprstr, limits=Limits())
+
+    def test_server(self):
+        reply = evaluate_request({"expr": "9**9**9**9"})
+        self.assertIn("bits", reply["error"])
+        reply = evaluate_request({"expr": "(" * 300 + "1" + ")" * 300})
+        self.assertIn("Nested", reply["error"])
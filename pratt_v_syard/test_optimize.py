@@ -0,0 +1,111 @@
+"""
+Unittests for the optimizer pass
+"""
+
+import random
+import unittest
+
+from .compiled import compile_tree
+from .op_base import EvalVisitor, Lispish
+from .optimize import optimize
+from .parsers import PARSERS, drive_parse
+from .walker import walk
+
+ATOMS = ("0", "1", "2", "3", "4", "8", "7", "x", "y", "z", "(2 ** 5)")
+BINOPS = ("+", "-", "*", "/", "%", "**", "<<", ">>", "&", "|", "^")
+UNIOPS = ("-", "+", "~")
+ENVS = (
+    {"x": 5, "y": -3, "z": 0},
+    {"x": -7, "y": 2, "z": 13},
+    {"x": True, "y": False, "z": -1},
+    {"x": -2.5, "y": -0.0, "z": 3},
+    {"x": 6, "y": 0.5, "z": -4},
+)
+
+
+def random_expr(rng, depth):
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(ATOMS)
+    if rng.random() < 0.25:
+        op = rng.choice(UNIOPS)
+        return f"{op}{op}({random_expr(rng, depth - 1)})"
+    op = rng.choice(BINOPS)
+    if op in ("**", "<<"):
+        # Keep the numbers small
+        right = rng.choice(("0", "1", "2", "3", "x", "y", "-1"))
+    else:
+        right = random_expr(rng, depth - 1)
+    return f"({random_expr(rng, depth - 1)}) {op} ({right})"
+
+
+def outcome(func):
+    try:
+        value = func()
+    except (ArithmeticError, TypeError, ValueError) as err:
+        return (type(err), str(err))
+    return (type(value), repr(value))
+
+
+class TestOptimize(unittest.TestCase):
+    def assertSameResults(self, expr, env):
+        tree = drive_parse(PARSERS[0][1], expr)
+        optimized = optimize(tree)
+        expected = outcome(lambda: tree.accept(EvalVisitor(env)))
+        self.assertEqual(outcome(lambda: optimized.accept(EvalVisitor(env))), expected)
+        self.assertEqual(outcome(lambda: walk(optimized, EvalVisitor(env))), expected)
+        self.assertEqual(outcome(lambda: compile_tree(optimized)(env)), expected)
+
+    def test_fuzz(self):
+        rng = random.Random(15)
+        for _ in range(400):
+            expr = random_expr(rng, 4)
+            for env in ENVS:
+                with self.subTest(expr, env=env):
+                    self.assertSameResults(expr, env)
+
+    def test_pow_mod(self):
+        for expr in (
+            "x ** y % z",
+            "x ** 3 % z",
+            "(x + 1) ** (y * 2) % (z - 4)",
+        ):
+            for x in (-7, -1, 0, 3, 2.0, True):
+                for y in (-2, 0, 1, 5):
+                    for z in (-5, -1, 0, 1, 9, 9.5):
+                        env = {"x": x, "y": y, "z": z}
+                        with self.subTest(expr, env=env):
+                            self.assertSameResults(expr, env)
+
+    def test_rewrites(self):
+        for expr, expected in (
+            ("x ** 3 % 7", "(% (** x 3) 7)"),
+            ("(1 + 2) * 8", "(<< (+ 1 2) 3)"),
+            ("2 ** 70 * (1 - 4)", "(<< (- 1 4) 70)"),
+            ("(3 - 9) % 16", "(& (- 3 9) 15)"),
+            ("- -(1 - 4)", "(- 1 4)"),
+            ("~~(5 ^ 3)", "(^ 5 3)"),
+            ("+(2 << 3) + 0", "(<< 2 3)"),
+            ("1 * (2 | 3) ** 1 - 0", "(| 2 3)"),
+            # Not known to be ints
+            ("x * 8", "(* x 8)"),
+            ("~~x", "(_~ (_~ x))"),
+            ("(1 / 2) * 8", "(* (/ 1 2) 8)"),
+            ("(2 ** -1) * 4", "(* (** 2 (_- 1)) 4)"),
+            ("x + 0", "(+ x 0)"),
+            # Never a shift
+            ("8 / 2", "(/ 8 2)"),
+        ):
+            with self.subTest(expr):
+                tree = optimize(drive_parse(PARSERS[0][1], expr))
+                self.assertEqual(tree.accept(Lispish()), expected)
+
+    def test_pow_mod_skips_power(self):
+        tree = optimize(drive_parse(PARSERS[0][1], "7 ** (10 ** 30) % 1000003"))
+        self.assertEqual(tree.accept(EvalVisitor()), pow(7, 10**30, 1000003))
+
+    def test_leaves_tree_alone(self):
+        tree = drive_parse(PARSERS[0][1], "x ** 3 % 7 + (1 + 2) * 8")
+        before = tree.accept(Lispish())
+        optimize(tree)
+        self.assertEqual(tree.accept(Lispish()), before)
+        self.assertEqual(tree.accept(EvalVisitor({"x": 4})), 25)
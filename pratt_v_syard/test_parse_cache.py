@@ -0,0 +1,76 @@
+"""
+Unittests for the LRU parse cache
+"""
+
+import re
+import unittest
+
+from .dag import NodeInterner
+from .op_base import Frozen, Lispish, StreamLexer
+from .parse_cache import ParseCache
+from .parsers import PARSERS, drive_parse
+
+
+class TestParseCache(unittest.TestCase):
+    def test_hits_and_sharing(self):
+        cache = ParseCache()
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                first = drive_parse(pfunc, "-2**-3 + x", cache=cache)
+                second = drive_parse(pfunc, "-2**-3 + x", cache=cache)
+                self.assertIs(first, second)
+                self.assertEqual(first.accept(Lispish()), "(+ (_- (** 2 (_- 3))) x)")
+                self.assertIsInstance(first, Frozen)
+                with self.assertRaises(AttributeError):
+                    first.left = first.right
+        stats = cache.stats()
+        self.assertEqual((stats.hits, stats.misses), (len(PARSERS), len(PARSERS)))
+        self.assertEqual(stats.entries, len(PARSERS))
+
+    def test_lru_eviction(self):
+        cache = ParseCache(max_entries=2)
+        pfunc = PARSERS[0][1]
+        one = drive_parse(pfunc, "1", cache=cache)
+        drive_parse(pfunc, "2", cache=cache)
+        self.assertIs(drive_parse(pfunc, "1", cache=cache), one)
+        drive_parse(pfunc, "3", cache=cache)
+        self.assertEqual(cache.stats().evictions, 1)
+        self.assertIs(drive_parse(pfunc, "1", cache=cache), one)
+        drive_parse(pfunc, "2", cache=cache)
+        self.assertEqual(cache.stats().hits, 2)
+        self.assertEqual(cache.stats().misses, 4)
+
+    def test_source_chars_bound(self):
+        cache = ParseCache(max_entries=None, max_source_chars=10)
+        pfunc = PARSERS[0][1]
+        drive_parse(pfunc, "1 + 2", cache=cache)
+        drive_parse(pfunc, "3 + 4", cache=cache)
+        self.assertEqual(cache.stats().evictions, 0)
+        drive_parse(pfunc, "5", cache=cache)
+        self.assertEqual(cache.stats().evictions, 1)
+        drive_parse(pfunc, "1 + 2 + 3 + 4", cache=cache)
+        self.assertEqual(cache.stats().source_chars, 6)
+
+    def test_failures_not_cached(self):
+        cache = ParseCache()
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                for _ in range(2):
+                    with self.assertRaisesRegex(
+                        ValueError, re.escape("Expected operator at 6")
+                    ):
+                        drive_parse(pfunc, "4 + 5 9", cache=cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats().misses, 2 * len(PARSERS))
+
+    def test_streams_bypass(self):
+        cache = ParseCache()
+        tree = drive_parse(PARSERS[0][1], iter(["1 +", " 2"]), StreamLexer, cache=cache)
+        self.assertEqual(tree.accept(Lispish()), "(+ 1 2)")
+        self.assertEqual(len(cache), 0)
+
+    def test_custom_nodes_rejected(self):
+        with self.assertRaises(ValueError):
+            drive_parse(
+                PARSERS[0][1], "1", nodes=NodeInterner().nodes, cache=ParseCache()
+            )
@@ -2,19 +2,35 @@
 Simple unittest to test each parser error case and some standard tests
 """
 
+import random
 import re
 import unittest
 
 from .parsers import PARSERS, drive_parse
-from .op_base import Lispish
+from .op_base import GRAMMAR, BytesLexer, Lexer, Lispish, StreamLexer
+from .shunting_yard import validate
+
+
+def token_lexer(exprstr, grammar=GRAMMAR):
+    """
+    A BytesLexer over exprstr, so the parsers see Tokens
+    """
+    return BytesLexer(exprstr.encode(), grammar=grammar)
+
+
+LEXERS = (Lexer, StreamLexer, token_lexer)
 
 
 class TestParseErrors(unittest.TestCase):
     def do_error_test_case(self, inputstr, errorstr):
-        for (pname, pfunc) in PARSERS:
-            with self.subTest(pname, expr=inputstr):
-                with self.assertRaisesRegex(ValueError, re.escape(errorstr)):
-                    drive_parse(pfunc, inputstr)
+        for pname, pfunc in PARSERS:
+            for lexer_class in LEXERS:
+                with self.subTest(pname, expr=inputstr, lexer=lexer_class.__name__):
+                    with self.assertRaisesRegex(ValueError, re.escape(errorstr)):
+                        drive_parse(pfunc, inputstr, lexer_class)
+        with self.subTest("validate", expr=inputstr):
+            with self.assertRaisesRegex(ValueError, re.escape(errorstr)):
+                validate(inputstr)
 
     def test_expected_operator(self):
         self.do_error_test_case("4 + 5 9", "Expected operator at 6")
@@ -42,12 +58,42 @@ class TestParseErrors(unittest.TestCase):
     def test_unknown_unary_operator(self):
         self.do_error_test_case("4 + & 5", "Unknown unary operator & at 4")
 
+    def test_unrecognized_token(self):
+        self.do_error_test_case("4 + $", "Unrecognized token $ at 4")
+        self.do_error_test_case("4 + 12abc", "Unrecognized token 12abc at 4")
+
+    def test_variable_position(self):
+        self.do_error_test_case("4 + 5 x", "Expected operator at 6")
+        self.do_error_test_case("(x + y z", "Expected operator or right paren at 7")
+        self.do_error_test_case("x y", "Expected operator at 2")
+
+    def test_validate_matches_parse(self):
+        rng = random.Random(17)
+        pieces = ("1", "x", "(", ")", "+", "-", "~", "**", "*", "&", "$", "4x", " ")
+        for _ in range(2000):
+            inputstr = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 9)))
+            try:
+                drive_parse(PARSERS[0][1], inputstr)
+                expected = None
+            except (KeyError, ValueError) as err:
+                expected = (type(err), str(err))
+            with self.subTest(expr=inputstr):
+                try:
+                    self.assertIsNone(validate(inputstr))
+                    actual = None
+                except (KeyError, ValueError) as err:
+                    actual = (type(err), str(err))
+                self.assertEqual(actual, expected)
+
     def test_basic_success(self):
-        for (pname, pfunc) in PARSERS:
-            with self.subTest(pname):
-                actual = drive_parse(pfunc, "2**3**2").accept(Lispish())
-                self.assertEqual(actual, "(** 2 (** 3 2))")
-                actual = drive_parse(pfunc, "( 2   ** 3 ) ** 2").accept(Lispish())
-                self.assertEqual(actual, "(** (** 2 3) 2)")
-                actual = drive_parse(pfunc, "-2**-3").accept(Lispish())
-                self.assertEqual(actual, "(_- (** 2 (_- 3)))")
+        for pname, pfunc in PARSERS:
+            for lexer_class in LEXERS:
+                with self.subTest(pname, lexer=lexer_class.__name__):
+                    actual = drive_parse(pfunc, "2**3**2", lexer_class)
+                    self.assertEqual(actual.accept(Lispish()), "(** 2 (** 3 2))")
+                    actual = drive_parse(pfunc, "( 2   ** 3 ) ** 2", lexer_class)
+                    self.assertEqual(actual.accept(Lispish()), "(** (** 2 3) 2)")
+                    actual = drive_parse(pfunc, "-2**-3", lexer_class)
+                    self.assertEqual(actual.accept(Lispish()), "(_- (** 2 (_- 3)))")
+                    actual = drive_parse(pfunc, "x_1 * -(y + 2)", lexer_class)
+                    self.assertEqual(actual.accept(Lispish()), "(* x_1 (_- (+ y 2)))")
@@ -0,0 +1,80 @@
+"""
+Unittests for parsing expression files in place from bytes buffers
+"""
+
+import os
+import tempfile
+import unittest
+
+from .op_base import Lispish
+from .parsers import PARSERS, drive_parse
+from .records import parse_file, parse_records, record_spans
+from .test_grammar import CUSTOM
+
+LINES = ["1 + 2", "x * (3 - y)", "", "4 + 5 9", "2 ** -3 $", "  -(7) "]
+
+
+def outcome(strategy, exprstr):
+    try:
+        return drive_parse(strategy, exprstr).accept(Lispish())
+    except (KeyError, ValueError) as err:
+        return (type(err), str(err))
+
+
+def outcomes(results):
+    return [
+        (
+            (type(result.error), str(result.error))
+            if result.error
+            else result.tree.accept(Lispish())
+        )
+        for result in results
+    ]
+
+
+class TestRecords(unittest.TestCase):
+    def test_spans(self):
+        data = b"ab\n\r\ncd\r\n\nef"
+        self.assertEqual(
+            [data[start:end] for start, end in record_spans(data)],
+            [b"ab", b"", b"cd", b"", b"ef"],
+        )
+        self.assertEqual(list(record_spans(b"")), [])
+        self.assertEqual(list(record_spans(b"x\n")), [(0, 1)])
+
+    def test_matches_drive_parse(self):
+        data = "\n".join(LINES).encode()
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                results = list(parse_records(pfunc, memoryview(data)))
+                self.assertEqual(
+                    outcomes(results), [outcome(pfunc, line) for line in LINES]
+                )
+                self.assertEqual(
+                    [result.lineno for result in results], [1, 2, 3, 4, 5, 6]
+                )
+                self.assertEqual(results[3].start, data.index(b"4 + 5"))
+
+    def test_error_positions(self):
+        results = list(parse_records(PARSERS[0][1], b"1 + 1\r\n  (1 + 2\r\n3 4\r\n"))
+        self.assertEqual(
+            [str(result.error) for result in results[1:]],
+            ["Unclosed left paren beginning at 2", "Expected operator at 2"],
+        )
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "exprs.txt")
+            with open(path, "w", encoding="utf-8", newline="\r\n") as file:
+                file.write("\n".join(LINES) + "\n")
+            results = list(parse_file(PARSERS[1][1], path))
+            # The trees don't need the mapping once it is closed
+            self.assertEqual(
+                outcomes(results), [outcome(PARSERS[1][1], line) for line in LINES]
+            )
+            open(path, "wb").close()
+            self.assertEqual(list(parse_file(PARSERS[1][1], path)), [])
+
+    def test_grammar(self):
+        results = parse_records(PARSERS[0][1], b"7 mod 4 // 2\n!0", grammar=CUSTOM)
+        self.assertEqual(outcomes(results), ["(// (mod 7 4) 2)", "(_! 0)"])
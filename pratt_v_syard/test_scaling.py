@@ -0,0 +1,146 @@
+"""
+Scaling tests: time every parser, the lexers and the visitors on inputs of
+doubling size for each benchmark shape, fit the growth exponent, and fail
+anything that grows faster than n log n.
+
+These are the slow tier and take a few minutes, so they only run with
+RUN_SLOW_TESTS set: `RUN_SLOW_TESTS=1 python -m unittest
+pratt_v_syard.test_scaling`
+"""
+
+import gc
+import io
+import math
+import os
+import unittest
+
+from .benchmarks import best_time
+from .benchmarks.suite import SHAPES, lex
+from .op_base import BytesLexer, EvalVisitor, Lispish, StreamLexer
+from .parsers import PARSERS, drive_parse
+from .walker import walk
+
+SEED = 0
+# The parsers are slow enough that their sizes stop earlier; a quadratic
+# term with a small constant, like copying strings, can take until tens of
+# thousands of operators to show
+SIZES = tuple(60 * 2**i for i in range(11))
+PARSER_SIZES = SIZES[:8]
+REPEAT = 5
+# How far above the n log n exponent over the same sizes a fit may land
+# before it counts as superlinearithmic; quadratic growth fits near 2
+TOLERANCE = 0.3
+MIN_POINTS = 3
+# The exponent is fitted to the largest this many sizes, where fixed costs
+# no longer hide how the time grows
+FIT_POINTS = 4
+
+LEXERS = {
+    "Lexer": lambda exprstr: list(lex(exprstr)),
+    "BytesLexer": lambda exprstr: list(BytesLexer(exprstr.encode())),
+    "StreamLexer": lambda exprstr: list(StreamLexer(exprstr)),
+    "StreamLexer, chunked": lambda exprstr: list(
+        StreamLexer(io.StringIO(exprstr), chunk_size=4096)
+    ),
+}
+# The shapes each visitor is timed on. Elsewhere the values EvalVisitor
+# computes grow with the input (or it raises), and big-int arithmetic
+# costs more than linear in their size whatever the visitor does
+VISITORS = {
+    "Lispish": (Lispish, tuple(SHAPES)),
+    "EvalVisitor": (EvalVisitor, ("left_chain", "pow_tower")),
+}
+
+
+def growth_exponent(sizes, times):
+    """
+    The least-squares slope of log(time) against log(size)
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(time) for time in times]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum(
+        (x - mean_x) ** 2 for x in xs
+    )
+
+
+def quiet_time(func):
+    """
+    best_time with the garbage collector off, as timeit does
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        return best_time(func, REPEAT)
+    finally:
+        gc.enable()
+
+
+@unittest.skipUnless(os.environ.get("RUN_SLOW_TESTS"), "set RUN_SLOW_TESTS to run")
+class TestScaling(unittest.TestCase):
+    def assertScales(self, shape, time_for_size, all_sizes=SIZES):
+        """
+        time_for_size(exprstr) times one component on an expression of the
+        given shape; sizes from the first one that hits the recursion limit
+        on are dropped
+        """
+        sizes = []
+        times = []
+        for size in all_sizes:
+            exprstr = SHAPES[shape](size, SEED)
+            try:
+                times.append(time_for_size(exprstr))
+            except RecursionError:
+                break
+            sizes.append(size)
+        self.assertGreaterEqual(len(sizes), MIN_POINTS, "too few sizes fit")
+        sizes = sizes[-FIT_POINTS:]
+        times = times[-FIT_POINTS:]
+        exponent = growth_exponent(sizes, times)
+        limit = growth_exponent(sizes, [size * math.log(size) for size in sizes])
+        self.assertLessEqual(
+            exponent,
+            limit + TOLERANCE,
+            f"grows like n ** {exponent:.2f} over sizes {sizes[0]}-{sizes[-1]}",
+        )
+
+    def test_lexers(self):
+        for shape in SHAPES:
+            for name, lex_all in LEXERS.items():
+                with self.subTest(name, shape=shape):
+                    self.assertScales(
+                        shape, lambda exprstr: quiet_time(lambda: lex_all(exprstr))
+                    )
+
+    def test_parsers(self):
+        def time_parse(strategy):
+            def time_for_size(exprstr):
+                # Lex up front so only the parse is timed
+                lexers = [lex(exprstr) for _ in range(REPEAT)]
+                return quiet_time(lambda: strategy(lexers.pop()))
+
+            return time_for_size
+
+        for shape in SHAPES:
+            for pname, strategy in PARSERS:
+                with self.subTest(pname, shape=shape):
+                    self.assertScales(shape, time_parse(strategy), PARSER_SIZES)
+
+    def test_visitors(self):
+        strategy = dict(PARSERS)["Shunting Yard"]
+
+        def time_visit(make_visitor, use_walk):
+            def time_for_size(exprstr):
+                tree = drive_parse(strategy, exprstr)
+                if use_walk:
+                    return quiet_time(lambda: walk(tree, make_visitor()))
+                return quiet_time(lambda: tree.accept(make_visitor()))
+
+            return time_for_size
+
+        for name, (make_visitor, shapes) in VISITORS.items():
+            for shape in shapes:
+                for use_walk in (False, True):
+                    with self.subTest(name, shape=shape, walk=use_walk):
+                        self.assertScales(shape, time_visit(make_visitor, use_walk))
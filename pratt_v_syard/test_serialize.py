@@ -0,0 +1,166 @@
+"""
+Unittests for the binary tree format
+"""
+
+import io
+import unittest
+
+from .benchmarks.shapes import BINOPS, random_mix, unary_runs
+from .op_base import BinopNode, EvalVisitor, Lispish, ValNode, VarNode
+from .parsers import PARSERS, drive_parse
+from .serialize import (
+    HEADER_SIZE,
+    MAGIC,
+    Dumper,
+    LazyTree,
+    Loader,
+    dump_all,
+    dumps,
+    load,
+    load_all,
+    loads,
+)
+from .test_grammar import CUSTOM
+from .walker import walk
+
+EXPRS = (
+    "42",
+    "x",
+    "2**3**2",
+    "-2**-3",
+    "1 + 2 * 3 - ~4 % 3 << 2 | 7 ^ 5 & 3",
+    "x * (y - x) + x / y ** z",
+    "123456789 * 300 - 9223372036854775807 + 9223372036854775808",
+    "-(-(-128))",
+)
+
+
+def lispish(root):
+    return walk(root, Lispish())
+
+
+class TestSerialize(unittest.TestCase):
+    def check_round_trip(self, tree, grammar=None):
+        kwargs = {} if grammar is None else {"grammar": grammar}
+        data = dumps(tree, **kwargs)
+        expected = lispish(tree)
+        self.assertEqual(lispish(loads(data, **kwargs)), expected)
+        lazy = LazyTree(data, **kwargs)
+        self.assertEqual(lispish(lazy.node()), expected)
+        self.assertEqual(lazy.end, len(data))
+        return data
+
+    def test_parsers(self):
+        for pname, pfunc in PARSERS:
+            for expr in EXPRS:
+                with self.subTest(pname, expr=expr):
+                    self.check_round_trip(drive_parse(pfunc, expr))
+
+    def test_random(self):
+        for seed in range(20):
+            for expr in (random_mix(30, seed, BINOPS), unary_runs(30, seed)):
+                with self.subTest(expr):
+                    self.check_round_trip(drive_parse(PARSERS[0][1], expr))
+
+    def test_values(self):
+        for val in (
+            0,
+            127,
+            128,
+            2**63 - 1,
+            2**63,
+            -1,
+            -(2**63),
+            -(2**63) - 1,
+            3**100,
+            -(7**90),
+            0.5,
+            -1e300,
+            float("inf"),
+        ):
+            with self.subTest(val):
+                tree = BinopNode("+", None, ValNode(val), VarNode("é"))
+                loaded = loads(self.check_round_trip(tree))
+                self.assertEqual(loaded.left.val, val)
+                self.assertIs(type(loaded.left.val), type(val))
+                self.assertEqual(LazyTree(dumps(tree)).node().left.val, val)
+        with self.assertRaises(ValueError):
+            dumps(ValNode("1"))
+
+    def test_repeated_variables(self):
+        tree = drive_parse(PARSERS[0][1], "x + y * x - y + x")
+        data = self.check_round_trip(tree)
+        self.assertEqual(data.count(b"x"), 1)
+        env = {"x": 3, "y": 5}
+        self.assertEqual(
+            LazyTree(data).node().accept(EvalVisitor(env)),
+            tree.accept(EvalVisitor(env)),
+        )
+
+    def test_deep_tree(self):
+        tree = drive_parse(PARSERS[0][1], " + ".join(["1"] * 20000))
+        data = dumps(tree)
+        self.assertEqual(len(data), HEADER_SIZE + 3 * 20000)
+        self.assertEqual(walk(loads(data), EvalVisitor()), 20000)
+        self.assertEqual(walk(LazyTree(data).node(), EvalVisitor()), 20000)
+
+    def test_grammar(self):
+        tree = drive_parse(PARSERS[0][1], "7 mod 4 // !0", grammar=CUSTOM)
+        data = self.check_round_trip(tree, CUSTOM)
+        self.assertEqual(loads(data, grammar=CUSTOM).accept(EvalVisitor()), 3)
+        self.assertEqual(LazyTree(data, grammar=CUSTOM).node().accept(EvalVisitor()), 3)
+        with self.assertRaisesRegex(ValueError, "different operator table"):
+            loads(data)
+        with self.assertRaisesRegex(ValueError, "isn't in the grammar"):
+            dumps(tree)
+
+    def test_bad_data(self):
+        data = dumps(drive_parse(PARSERS[0][1], "1 + 2 * x"))
+        for bad, message in (
+            (b"", "Not a serialized tree"),
+            (b"\x80\x04" + data, "Not a serialized tree"),
+            (MAGIC + b"\x01", "Truncated"),
+            (MAGIC + b"\x02" + data[len(MAGIC) + 1 :], "Unsupported format version"),
+            (data[:-1], "Truncated"),
+            (data[:-3], "Truncated"),
+            (data[:HEADER_SIZE] + b"\x00", "Corrupt"),
+            (data[:HEADER_SIZE] + b"\x10\x00", "corrupt"),
+            (data[:HEADER_SIZE] + b"\x0b\x00", "Bad opcode"),
+        ):
+            for func in (loads, LazyTree):
+                with self.subTest(bad, func=func):
+                    with self.assertRaisesRegex(ValueError, message):
+                        func(bad)
+
+    def test_streams(self):
+        trees = [drive_parse(PARSERS[0][1], expr) for expr in EXPRS]
+        trees.append(drive_parse(PARSERS[0][1], random_mix(2000, 0, BINOPS)))
+        expected = [lispish(tree) for tree in trees]
+
+        out = io.BytesIO()
+        dumper = Dumper(out, chunk_size=7)
+        for tree in trees:
+            dumper.dump(tree)
+        dumper.flush()
+        data = out.getvalue()
+        self.assertEqual(
+            [lispish(tree) for tree in Loader(io.BytesIO(data), chunk_size=5)],
+            expected,
+        )
+
+        out = io.BytesIO()
+        dump_all(trees, out)
+        self.assertEqual(out.getvalue(), data)
+        self.assertEqual(
+            [lispish(tree) for tree in load_all(io.BytesIO(data))], expected
+        )
+        self.assertEqual(lispish(load(io.BytesIO(data))), expected[0])
+
+        lazy = []
+        start = None
+        while start != len(data):
+            lazy.append(LazyTree(data, start))
+            start = lazy[-1].end
+        self.assertEqual([lispish(tree.node()) for tree in lazy], expected)
+
+        self.assertEqual(list(load_all(io.BytesIO(dumps(trees[0])[:HEADER_SIZE]))), [])
@@ -0,0 +1,92 @@
+"""
+Unittests for the parse/evaluate server and its client
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from .parsers import PARSERS
+from .server import Client, handle_line, make_executor, start_server
+
+
+class TestHandleLine(unittest.TestCase):
+    def reply(self, request):
+        return json.loads(handle_line(json.dumps(request).encode()))
+
+    def test_modes(self):
+        request = {"id": 3, "expr": "x * (1 + 2)", "env": {"x": 2}}
+        self.assertEqual(
+            self.reply(request), {"id": 3, "lispish": "(* x (+ 1 2))", "value": 6}
+        )
+        self.assertEqual(self.reply(dict(request, mode="value")), {"id": 3, "value": 6})
+        self.assertEqual(
+            self.reply(dict(request, mode="lispish")),
+            {"id": 3, "lispish": "(* x (+ 1 2))"},
+        )
+
+    def test_every_parser(self):
+        for pname, _ in PARSERS:
+            with self.subTest(pname):
+                reply = self.reply({"id": 0, "expr": "-2 ** 2", "parser": pname})
+                self.assertEqual(
+                    reply, {"id": 0, "lispish": "(_- (** 2 2))", "value": -4}
+                )
+
+    def test_errors(self):
+        for request, error in (
+            ({"id": 1, "expr": "4 + 5 9"}, "Expected operator at 6"),
+            ({"id": 1, "expr": "1 / 0"}, "division by zero"),
+            ({"id": 1, "expr": "y"}, "Unbound variable y"),
+            ({"id": 1, "expr": "1", "parser": "Nope"}, "Unknown parser Nope"),
+            ({"id": 1, "expr": "1", "mode": "all"}, "Unknown mode all"),
+            ({"id": 1}, "Request has no expr string"),
+        ):
+            with self.subTest(request):
+                self.assertEqual(self.reply(request), {"id": 1, "error": error})
+        reply = json.loads(handle_line(b"[1, 2]"))
+        self.assertIsNone(reply["id"])
+        self.assertTrue(reply["error"].startswith("Bad request"))
+
+    def test_unencodable_values(self):
+        self.assertEqual(
+            self.reply({"id": 0, "expr": "(-8) ** (1 / 2)", "mode": "value"})["value"][-2:],
+            "j)",
+        )
+        self.assertIn("error", self.reply({"id": 0, "expr": "7 ** 9999"}))
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def check_server(self, server, **address):
+        async with server:
+            async with await Client.connect(**address) as client:
+                replies = await asyncio.gather(
+                    *(client.request(f"{i} * 2", mode="value") for i in range(50))
+                )
+                self.assertEqual(
+                    [reply["value"] for reply in replies], list(range(0, 100, 2))
+                )
+                reply = await client.request("1 +", PARSERS[5][0])
+                self.assertEqual(reply["error"], "Unexpected EOF")
+
+    async def test_tcp(self):
+        server = await start_server("127.0.0.1", 0, max_concurrent=4)
+        port = server.sockets[0].getsockname()[1]
+        await self.check_server(server, host="127.0.0.1", port=port)
+
+    async def test_process_pool(self):
+        executor = make_executor(1)
+        try:
+            server = await start_server("127.0.0.1", 0, executor=executor)
+            port = server.sockets[0].getsockname()[1]
+            await self.check_server(server, host="127.0.0.1", port=port)
+        finally:
+            executor.shutdown()
+
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"), "No Unix sockets")
+    async def test_unix(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "server.sock")
+            await self.check_server(await start_server(path=path), path=path)
@@ -0,0 +1,93 @@
+"""
+Unittests for variables and the evaluators that bind them
+"""
+
+import unittest
+
+from .compiled import compile_tree
+from .dag import MemoEvalVisitor, NodeInterner, parse_dag
+from .flat_tree import FlatTree, parse_flat
+from .op_base import EvalVisitor, Lispish
+from .parsers import PARSERS, drive_parse
+from .test_grammar import CUSTOM
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EXPR = "(x + 3) * y % 7 - -x << 2"
+ENV = {"x": 5, "y": 11}
+EXPECTED = ((5 + 3) * 11 % 7 - -5) << 2
+
+
+class TestVariables(unittest.TestCase):
+    def test_evaluators(self):
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                tree = drive_parse(pfunc, EXPR)
+                self.assertEqual(tree.accept(EvalVisitor(ENV)), EXPECTED)
+                self.assertEqual(
+                    parse_dag(pfunc, EXPR).accept(MemoEvalVisitor(ENV)), EXPECTED
+                )
+                self.assertEqual(parse_flat(pfunc, EXPR).evaluate(ENV), EXPECTED)
+                self.assertEqual(compile_tree(tree)(ENV), EXPECTED)
+                flat = FlatTree.from_node(tree)
+                self.assertEqual(flat.names, ["x", "y"])
+                self.assertEqual(flat.lispish(), tree.accept(Lispish()))
+                self.assertEqual(flat.node().accept(EvalVisitor(ENV)), EXPECTED)
+
+    def test_unbound(self):
+        tree = drive_parse(PARSERS[0][1], "x + y")
+        for evaluate in (
+            lambda: tree.accept(EvalVisitor({"x": 1})),
+            lambda: FlatTree.from_node(tree).evaluate({"x": 1}),
+            lambda: compile_tree(tree)({"x": 1}),
+        ):
+            with self.assertRaisesRegex(ValueError, "Unbound variable y"):
+                evaluate()
+        with self.assertRaisesRegex(ValueError, "Unbound variable x"):
+            compile_tree(tree)()
+
+    def test_interned(self):
+        interner = NodeInterner()
+        tree = parse_dag(PARSERS[0][1], "x * x", interner=interner)
+        self.assertIs(tree.left, tree.right)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    def test_columns(self):
+        # pylint:disable=import-outside-toplevel
+        from .vectorized import VectorEvalVisitor
+
+        xs = numpy.arange(-50, 50)
+        ys = numpy.arange(100) * 3 + 1
+        for pname, pfunc in PARSERS:
+            with self.subTest(pname):
+                tree = drive_parse(pfunc, EXPR + " | ~y ^ x & 12")
+                actual = tree.accept(VectorEvalVisitor({"x": xs, "y": ys}))
+                expected = [
+                    tree.accept(EvalVisitor({"x": int(x), "y": int(y)}))
+                    for (x, y) in zip(xs, ys)
+                ]
+                self.assertEqual(actual.tolist(), expected)
+
+    def test_true_division(self):
+        # pylint:disable=import-outside-toplevel
+        from .vectorized import VectorEvalVisitor
+
+        tree = drive_parse(PARSERS[0][1], "x / 4 + 2 ** 3")
+        actual = tree.accept(VectorEvalVisitor({"x": [1, 2, 3]}))
+        self.assertEqual(actual.tolist(), [8.25, 8.5, 8.75])
+
+    def test_grammar(self):
+        # pylint:disable=import-outside-toplevel
+        from .vectorized import VectorEvalVisitor
+
+        with self.assertRaisesRegex(ValueError, "Can't vectorize operators _!"):
+            VectorEvalVisitor({}, grammar=CUSTOM)
+        grammar = CUSTOM.subset([name for name in CUSTOM.names if name != "_!"])
+        tree = drive_parse(PARSERS[0][1], "x // 3 mod 2 - x", grammar=grammar)
+        actual = tree.accept(VectorEvalVisitor({"x": [4, 7, 9]}, grammar=grammar))
+        self.assertEqual(actual.tolist(), [-3, -7, -8])
@@ -0,0 +1,80 @@
+"""
+Unittests for the non-recursive walker
+"""
+
+import unittest
+
+from .dag import MemoEvalVisitor, parse_dag
+from .flat_tree import parse_flat
+from .op_base import EvalVisitor, Lispish, NodeVisitor
+from .parsers import PARSERS, drive_parse
+from .walker import walk
+
+EXPRS = ("2**3**2", "-2**-3", "x * (1 + 2 * 3 - ~4 % 3 << 2 | 7 ^ 5 & 3) / y")
+ENV = {"x": 3, "y": 4}
+
+
+class DepthVisitor(NodeVisitor):
+    "A visitor without fold methods"
+
+    def visit_binop(self, binop_node):
+        return 1 + max(binop_node.left.accept(self), binop_node.right.accept(self))
+
+    def visit_uniop(self, uniop_node):
+        return 1 + uniop_node.right.accept(self)
+
+    def visit_val(self, val_node):
+        return 1
+
+    def visit_var(self, var_node):
+        return 1
+
+
+class LoudLispish(Lispish):
+    "Overrides visit_binop without a matching fold_binop"
+
+    def visit_binop(self, binop_node):
+        return super().visit_binop(binop_node).upper()
+
+
+class TestWalker(unittest.TestCase):
+    def test_matches_accept(self):
+        for pname, pfunc in PARSERS:
+            for expr in EXPRS:
+                with self.subTest(pname, expr=expr):
+                    tree = drive_parse(pfunc, expr)
+                    for make_visitor in (
+                        lambda: EvalVisitor(ENV),
+                        Lispish,
+                        DepthVisitor,
+                        LoudLispish,
+                    ):
+                        self.assertEqual(
+                            walk(tree, make_visitor()), tree.accept(make_visitor())
+                        )
+
+    def test_flat_and_dag(self):
+        expr = EXPRS[-1]
+        expected = drive_parse(PARSERS[0][1], expr).accept(EvalVisitor(ENV))
+        flat = parse_flat(PARSERS[0][1], expr)
+        self.assertEqual(walk(flat.node(), EvalVisitor(ENV)), expected)
+        dag = parse_dag(PARSERS[0][1], expr)
+        self.assertEqual(walk(dag, MemoEvalVisitor(ENV), shared=True), expected)
+
+    def test_deep_trees(self):
+        depth = 20000
+        tree = drive_parse(PARSERS[0][1], "1 - (" * depth + "1" + ")" * depth)
+        with self.assertRaises(RecursionError):
+            tree.accept(EvalVisitor())
+        self.assertEqual(walk(tree, EvalVisitor()), 1)
+        self.assertEqual(walk(tree, DepthVisitor()), depth + 1)
+        self.assertTrue(walk(tree, Lispish()).endswith("(- 1 1)" + ")" * (depth - 1)))
+        # Lispish writes a whole tree without recursing, through accept() too,
+        # and the folds walk uses for shared trees give the same text
+        self.assertEqual(tree.accept(Lispish()), walk(tree, Lispish()))
+        self.assertEqual(walk(tree, Lispish(), shared=True), walk(tree, Lispish()))
+
+    def test_errors_propagate(self):
+        tree = drive_parse(PARSERS[0][1], "1 + 2 % (3 - 3)")
+        with self.assertRaises(ZeroDivisionError):
+            walk(tree, EvalVisitor())
@@ -0,0 +1,82 @@
+"""
+Column-wise evaluation of a parsed expression with NumPy.
+
+Variables are bound to arrays, so a single pass over the tree evaluates
+the expression for every row at once. Results follow NumPy's rules rather
+than Python's where the two differ: integers are fixed width and can
+overflow, and an integer raised to a negative integer power is an error.
+"""
+import operator
+
+import numpy as np
+
+from .op_base import GRAMMAR, NodeVisitor
+
+# The ufunc for each operator function, keyed like compiled.BINOP_SYNTAX
+UFUNCS = {
+    operator.or_: np.bitwise_or,
+    operator.xor: np.bitwise_xor,
+    operator.and_: np.bitwise_and,
+    operator.rshift: np.right_shift,
+    operator.lshift: np.left_shift,
+    operator.add: np.add,
+    operator.sub: np.subtract,
+    operator.mul: np.multiply,
+    operator.truediv: np.true_divide,
+    operator.floordiv: np.floor_divide,
+    operator.mod: np.remainder,
+    operator.pos: np.positive,
+    operator.neg: np.negative,
+    operator.inv: np.invert,
+    operator.pow: np.power,
+}
+
+
+def grammar_ufuncs(grammar):
+    """
+    The ufunc for each of grammar's operators, by name, or a ValueError
+    naming the operators whose functions have no ufunc
+    """
+    missing = [
+        name for (name, func) in zip(grammar.names, grammar.funcs) if func not in UFUNCS
+    ]
+    if missing:
+        raise ValueError(f"Can't vectorize operators {', '.join(missing)}")
+    return {name: UFUNCS[func] for (name, func) in zip(grammar.names, grammar.funcs)}
+
+
+class VectorEvalVisitor(NodeVisitor):
+    """
+    A visitor that evaluates a tree with variables bound to NumPy arrays
+    (or anything np.asarray accepts) in env, for trees parsed with grammar
+    """
+
+    def __init__(self, env, grammar=GRAMMAR):
+        self.env = {name: np.asarray(column) for (name, column) in env.items()}
+        self.ufuncs = grammar_ufuncs(grammar)
+
+    def visit_binop(self, binop_node):
+        return self.ufuncs[binop_node.name](
+            binop_node.left.accept(self), binop_node.right.accept(self)
+        )
+
+    def visit_uniop(self, uniop_node):
+        return self.ufuncs[uniop_node.name](uniop_node.right.accept(self))
+
+    def fold_binop(self, binop_node, left, right):
+        return self.ufuncs[binop_node.name](left, right)
+
+    def fold_uniop(self, uniop_node, right):
+        return self.ufuncs[uniop_node.name](right)
+
+    def visit_val(self, val_node):
+        return val_node.val
+
+    def visit_var(self, var_node):
+        try:
+            return self.env[var_node.name]
+        except KeyError:
+            raise ValueError(f"Unbound variable {var_node.name}") from None
+
+    def visit_other(self, node):
+        raise ValueError(f"Can't evaluate {node}")
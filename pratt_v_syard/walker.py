@@ -0,0 +1,190 @@
+"""
+Run a NodeVisitor over a tree with an explicit stack instead of recursion.
+
+Memory use is bounded by the depth of the tree rather than by the C stack,
+so trees that the parsers can build but that are too deep for accept()
+can still be walked. That is all walk is for: it is slower than accept(),
+about 1.7-1.8x for visitors with fold methods and 5-6x for the others
+(see benchmarks/walker.py), since a Python function call costs less than
+the stack bookkeeping done here in Python. Use accept() on trees known to
+be shallow.
+
+Children are always visited before their parent. A visitor class that
+defines fold_binop/fold_uniop next to its visit_binop/visit_uniop is
+handed the children's results directly. Any other visitor has its
+visit_binop/visit_uniop called unchanged, on a copy of the node whose
+children just return their already computed results from accept().
+
+A visitor class whose visit_binop and visit_uniop come from a class that
+sets flat_visits, like Lispish, already handles a whole tree without
+recursing, so walk just calls accept().
+"""
+from .op_base import BinopNode, UniopNode, ValNode, VarNode, Node
+
+BINOP, UNIOP, VAL, VAR, OTHER = range(5)
+
+
+class Result(Node):
+    """
+    Stands in for an already visited child
+    """
+
+    __slots__ = ("result",)
+
+    def __init__(self, result):
+        self.result = result
+
+    def accept(self, visitor):
+        return self.result
+
+
+def _proxy_binop(visitor, binop_node, left, right):
+    return visitor.visit_binop(
+        BinopNode(binop_node.name, binop_node.opfunc, Result(left), Result(right))
+    )
+
+
+def _proxy_uniop(visitor, uniop_node, right):
+    return visitor.visit_uniop(
+        UniopNode(uniop_node.name, uniop_node.opfunc, Result(right))
+    )
+
+
+def _fold_for(visitor_class, visit_name, fold_name, proxy):
+    for cls in visitor_class.__mro__:
+        if visit_name in cls.__dict__:
+            return cls.__dict__.get(fold_name, proxy)
+    return proxy
+
+
+_kinds = {}
+_folds = {}
+_flat = {}
+
+
+def node_kind(node_class):
+    try:
+        return _kinds[node_class]
+    except KeyError:
+        pass
+    for base, kind in (
+        (BinopNode, BINOP),
+        (UniopNode, UNIOP),
+        (ValNode, VAL),
+        (VarNode, VAR),
+    ):
+        if issubclass(node_class, base):
+            break
+    else:
+        kind = OTHER
+    _kinds[node_class] = kind
+    return kind
+
+
+def folds(visitor_class):
+    """
+    The (binop, uniop) functions that combine a node with its children's
+    results for visitor_class
+    """
+    try:
+        return _folds[visitor_class]
+    except KeyError:
+        pass
+    retval = _folds[visitor_class] = (
+        _fold_for(visitor_class, "visit_binop", "fold_binop", _proxy_binop),
+        _fold_for(visitor_class, "visit_uniop", "fold_uniop", _proxy_uniop),
+    )
+    return retval
+
+
+def visits_flat(visitor_class):
+    """
+    Whether visitor_class's visit_binop and visit_uniop both come from
+    classes that set flat_visits
+    """
+    try:
+        return _flat[visitor_class]
+    except KeyError:
+        pass
+    flat = True
+    for visit_name in ("visit_binop", "visit_uniop"):
+        for cls in visitor_class.__mro__:
+            if visit_name in cls.__dict__:
+                flat = flat and cls.__dict__.get("flat_visits", False)
+                break
+    _flat[visitor_class] = flat
+    return flat
+
+
+def walk(root, visitor, shared=False):
+    """
+    The equivalent of root.accept(visitor), without recursion, so it
+    works on trees of any depth, but slower.
+
+    With shared=True each distinct node object is visited once, which
+    suits the DAGs built by dag.NodeInterner.
+    """
+    if not shared and visits_flat(type(visitor)):
+        return root.accept(visitor)
+    fold_binop, fold_uniop = folds(type(visitor))
+    kinds = _kinds
+    memo = {} if shared else None
+    results = []
+    push = results.append
+    # A None on todo means the node on top of parents has all its
+    # children's results on top of results
+    parents = []
+    todo = [root]
+    while todo:
+        node = todo.pop()
+        if node is None:
+            node = parents.pop()
+            if kinds[type(node)] == BINOP:
+                right = results.pop()
+                result = fold_binop(visitor, node, results.pop(), right)
+            else:
+                result = fold_uniop(visitor, node, results.pop())
+        elif memo is not None and node in memo:
+            push(memo[node])
+            continue
+        else:
+            kind = kinds.get(type(node))
+            if kind is None:
+                kind = node_kind(type(node))
+            if kind == BINOP:
+                left = node.left
+                right = node.right
+                if (
+                    kinds.get(type(left)) == VAL
+                    and kinds.get(type(right)) == VAL
+                    and memo is None
+                ):
+                    # Fold leaf pairs, the bottom half of a balanced tree,
+                    # without a round trip through todo
+                    push(
+                        fold_binop(
+                            visitor,
+                            node,
+                            visitor.visit_val(left),
+                            visitor.visit_val(right),
+                        )
+                    )
+                    continue
+                parents.append(node)
+                todo += (None, right, left)
+                continue
+            if kind == UNIOP:
+                parents.append(node)
+                todo += (None, node.right)
+                continue
+            if kind == VAL:
+                result = visitor.visit_val(node)
+            elif kind == VAR:
+                result = visitor.visit_var(node)
+            else:
+                result = node.accept(visitor)
+        if memo is not None:
+            memo[node] = result
+        push(result)
+    assert len(results) == 1, f"Results should have length 1, was {results}"
+    return results[0]